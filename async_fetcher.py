@@ -0,0 +1,389 @@
+"""
+Module for fetching several OWID source files concurrently.
+
+Sources are downloaded at the same time from an asyncio event loop. Each
+download runs in a worker thread that streams the response body straight into
+pandas.read_csv, so parsing a file overlaps with its own download and with the
+downloads of the other sources. HTTP connections are kept alive and shared
+through a pool, so several files from the same host reuse one TLS connection.
+
+Every source gets its own timeout and a bounded number of retries with
+exponential backoff for transient failures (timeouts, dropped connections,
+HTTP 429 and 5xx). Failures are reported as FetchError subclasses in the
+result of each source rather than as empty DataFrames.
+
+Usage:
+    python async_fetcher.py [SOURCE ...]
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config import DATA_SOURCES, FETCH_BACKOFF, FETCH_MAX_CONNECTIONS, FETCH_RETRIES, FETCH_TIMEOUT
+from instrumentation import traced
+from schema import COVID_SCHEMA, read_csv_options
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 3
+
+
+class FetchError(Exception):
+    """
+    A source could not be fetched.
+
+    Parameters:
+    source (str): Name of the source
+    message (str): Description of the failure
+    """
+    retryable = False
+
+    def __init__(self, source, message):
+        super().__init__(f"{source}: {message}")
+        self.source = source
+
+
+class FetchTimeoutError(FetchError):
+    """The source did not deliver a complete response within its timeout."""
+    retryable = True
+
+
+class FetchConnectionError(FetchError):
+    """The connection to the source failed or was dropped."""
+    retryable = True
+
+
+class HTTPStatusError(FetchError):
+    """The server answered with a status other than 200."""
+
+    def __init__(self, source, status, reason=''):
+        super().__init__(source, f"HTTP {status} {reason}".strip())
+        self.status = status
+        self.retryable = status == 429 or status >= 500
+
+
+class ParseError(FetchError):
+    """The source was downloaded but could not be parsed as CSV."""
+
+
+Source = namedtuple('Source', ['name', 'url', 'timeout', 'read_options'])
+Source.__new__.__defaults__ = (FETCH_TIMEOUT, None)
+
+# Sources read with a declared schema when no read_options are given
+SOURCE_SCHEMAS = {'covid': COVID_SCHEMA}
+
+FetchResult = namedtuple('FetchResult', ['source', 'data', 'error', 'attempts', 'seconds'])
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections, keyed by scheme, host and port.
+
+    Parameters:
+    max_idle_per_host (int): Idle connections kept per host; extra ones are closed
+    ssl_context (ssl.SSLContext): Context for HTTPS connections; None uses the default
+    """
+
+    def __init__(self, max_idle_per_host=FETCH_MAX_CONNECTIONS, ssl_context=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.ssl_context = ssl_context
+        self.stats = {'created': 0, 'reused': 0}
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, host, port, timeout):
+        """
+        Get an idle connection to a host, or a new one.
+
+        Returns:
+        tuple: (pool key, http.client.HTTPConnection)
+        """
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.stats['reused'] += 1
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return key, conn
+            self.stats['created'] += 1
+        if scheme == 'https':
+            return key, http.client.HTTPSConnection(host, port, timeout=timeout, context=self.ssl_context)
+        return key, http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def release(self, key, conn):
+        """Return a connection whose response was read completely."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+
+
+def default_read_options(name):
+    """
+    Get the pandas.read_csv options a named source is read with by default.
+
+    Parameters:
+    name (str): Name of the source
+
+    Returns:
+    dict: read_csv keyword arguments for sources in SOURCE_SCHEMAS, else None
+    """
+    schema = SOURCE_SCHEMAS.get(name)
+    return read_csv_options(schema) if schema else None
+
+
+def _as_sources(sources):
+    if hasattr(sources, 'items'):
+        return [Source(name, url, FETCH_TIMEOUT, default_read_options(name)) for name, url in sources.items()]
+    return [source if isinstance(source, Source) else Source(*source) for source in sources]
+
+
+def _parse(source, stream):
+    try:
+        return pd.read_csv(stream, **(source.read_options or {}))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise ParseError(source.name, f"invalid CSV ({e})") from e
+
+
+def _read_local(source, url):
+    path = urllib.request.url2pathname(urllib.parse.urlsplit(url).path) if url.startswith('file:') else url
+    try:
+        with open(path, 'rb') as f:
+            return _parse(source, f)
+    except FileNotFoundError as e:
+        raise FetchError(source.name, f"file not found: {path}") from e
+
+
+class _Attempt:
+    """
+    Cancellation handle shared by one download attempt and its worker thread.
+
+    Cancelling shuts down the attempt's socket, which wakes a worker blocked
+    in recv at once; the worker also checks the flag between reads.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def attach(self, sock):
+        """Register the socket the attempt is reading from (None when it is done)."""
+        with self._lock:
+            self._sock = sock
+
+    def check(self, source):
+        if self.cancelled.is_set():
+            raise FetchTimeoutError(source.name, "cancelled after the timeout")
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _CancellableBody(io.RawIOBase):
+    """Response body that stops with FetchTimeoutError once its attempt is cancelled."""
+
+    def __init__(self, response, attempt, source):
+        self.response = response
+        self.attempt = attempt
+        self.source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.attempt.check(self.source)
+        return self.response.readinto(buffer)
+
+
+def _download(pool, source, attempt):
+    """Download and parse one source in the calling (worker) thread."""
+    url = source.url
+    for _ in range(MAX_REDIRECTS + 1):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ('http', 'https'):
+            return _read_local(source, url)
+
+        attempt.check(source)
+        key, conn = pool.acquire(parsed.scheme, parsed.hostname, parsed.port, source.timeout)
+        reusable = False
+        response = None
+        try:
+            path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+            conn.request('GET', path, headers={'Accept': 'text/csv, */*'})
+            # The response keeps reading from this socket even if the connection drops it (Connection: close)
+            attempt.attach(conn.sock)
+            attempt.check(source)
+            response = conn.getresponse()
+            if response.status != 200:
+                response.read()
+                reusable = not response.will_close
+                location = response.getheader('Location')
+                if response.status in REDIRECT_STATUSES and location:
+                    url = urllib.parse.urljoin(url, location)
+                    continue
+                raise HTTPStatusError(source.name, response.status, response.reason)
+            # read_csv pulls the body from the socket as it arrives, until the attempt is cancelled
+            df = _parse(source, io.BufferedReader(_CancellableBody(response, attempt, source)))
+            response.read()
+            reusable = not response.will_close
+            return df
+        except socket.timeout as e:
+            raise FetchTimeoutError(source.name, f"read timed out after {source.timeout}s") from e
+        except (http.client.HTTPException, OSError) as e:
+            attempt.check(source)
+            raise FetchConnectionError(source.name, f"{type(e).__name__}: {e}") from e
+        finally:
+            attempt.attach(None)
+            if reusable and not attempt.cancelled.is_set():
+                pool.release(key, conn)
+            else:
+                if response is not None:
+                    response.close()
+                conn.close()
+    raise FetchConnectionError(source.name, f"more than {MAX_REDIRECTS} redirects")
+
+
+class AsyncFetcher:
+    """
+    Concurrent fetcher for CSV sources over a shared connection pool.
+
+    Parameters:
+    max_connections (int): Maximum number of downloads in flight
+    retries (int): Retries after the first attempt for transient failures
+    backoff (float): Delay before the first retry in seconds; doubled for each further retry
+    pool (ConnectionPool): Pool to use; None creates one
+    """
+
+    def __init__(self, max_connections=FETCH_MAX_CONNECTIONS, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF,
+                 pool=None):
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = pool or ConnectionPool(max_connections)
+
+    async def fetch_all(self, sources):
+        """
+        Fetch several sources concurrently.
+
+        Parameters:
+        sources (dict or list): Mapping of name to URL, or Source tuples; mapped sources named in
+            SOURCE_SCHEMAS are read with their schema
+
+        Returns:
+        dict: Source name -> FetchResult, in the order of the sources
+        """
+        sources = _as_sources(sources)
+        semaphore = asyncio.Semaphore(self.max_connections)
+        # Extra workers absorb attempts abandoned on timeout while they unwind
+        executor = ThreadPoolExecutor(max_workers=2 * self.max_connections)
+        try:
+            results = await asyncio.gather(*(self.fetch(source, semaphore, executor) for source in sources))
+        finally:
+            executor.shutdown(wait=False)
+        return {result.source.name: result for result in results}
+
+    async def fetch(self, source, semaphore, executor):
+        """
+        Fetch one source, retrying transient failures with exponential backoff.
+
+        Returns:
+        FetchResult: The DataFrame, or the FetchError of the last attempt
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            handle = _Attempt()
+            async with semaphore:
+                future = loop.run_in_executor(executor, _download, self.pool, source, handle)
+                try:
+                    data = await asyncio.wait_for(future, source.timeout)
+                    return FetchResult(source, data, None, attempt, time.perf_counter() - start)
+                except asyncio.TimeoutError:
+                    # Stop the worker too, so it does not keep the connection and thread busy
+                    handle.cancel()
+                    error = FetchTimeoutError(source.name, f"no complete response within {source.timeout}s")
+                except FetchError as e:
+                    error = e
+            if not error.retryable or attempt > self.retries:
+                return FetchResult(source, None, error, attempt, time.perf_counter() - start)
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+
+@traced()
+def fetch_sources(sources=None, raise_errors=False, **kwargs):
+    """
+    Fetch several sources concurrently from synchronous code.
+
+    Parameters:
+    sources (dict or list): Mapping of name to URL, or Source tuples; None fetches DATA_SOURCES
+    raise_errors (bool): Raise the first failure instead of returning it in the results
+    **kwargs: Arguments passed to AsyncFetcher
+
+    Returns:
+    dict: Source name -> FetchResult
+    """
+    fetcher = AsyncFetcher(**kwargs)
+    try:
+        results = asyncio.run(fetcher.fetch_all(DATA_SOURCES if sources is None else sources))
+    finally:
+        fetcher.pool.close()
+    if raise_errors:
+        for result in results.values():
+            if result.error is not None:
+                raise result.error
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', help=f"Sources to fetch (default: all of {', '.join(DATA_SOURCES)})")
+    parser.add_argument('--timeout', type=float, default=FETCH_TIMEOUT)
+    parser.add_argument('--retries', type=int, default=FETCH_RETRIES)
+    args = parser.parse_args()
+
+    names = args.sources or list(DATA_SOURCES)
+    unknown = [name for name in names if name not in DATA_SOURCES]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+    sources = [Source(name, DATA_SOURCES[name], args.timeout, default_read_options(name)) for name in names]
+    for name, result in fetch_sources(sources, retries=args.retries).items():
+        if result.error is None:
+            print(f"{name}: {len(result.data):,} rows in {result.seconds:.1f}s ({result.attempts} attempt(s))")
+        else:
+            print(f"{name}: failed after {result.attempts} attempt(s): {result.error}")
+
+
+if __name__ == "__main__":
+    main()
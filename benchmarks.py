@@ -0,0 +1,655 @@
+"""
+Benchmarks for the COVID-19 visualization pipeline.
+
+Usage:
+    python benchmarks.py ingest [--url URL]
+    python benchmarks.py index [--locations N] [--days N]
+    python benchmarks.py suite [--scales 1 10] [--output FILE] [--compare FILE]
+    python benchmarks.py downsample [--days N]
+    python benchmarks.py startup [--repeat N] [--budget SECONDS]
+    python benchmarks.py backends [--locations N] [--days N]
+    python benchmarks.py export [--days N] [--formats png svg pdf]
+    python benchmarks.py service [--target HOST:PORT] [--connections N] [--requests N] [--revalidate]
+
+The service load test starts a local query service on synthetic data unless
+--target points at a running one.
+
+The suite runs every pipeline stage on synthetic OWID-shaped data (see
+synthetic_data.py), so it needs no network and is reproducible. Results are
+written as JSON tagged with the git commit; --compare prints the ratio of each
+stage against a previous results file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+from config import (CHART_SIZES, DATA_URL, DASHBOARD_CHART_WIDTH, STARTUP_BUDGET_SECONDS, STARTUP_DEFERRED_MODULES,
+                    STARTUP_MODULES)
+from data_fetcher import CovidDataset, fetch_covid_data, filter_country_data, filter_continent_data
+from data_processor import (LocationDateIndex, get_latest_data_by_country, calculate_continent_deaths,
+                            pivot_continent_data)
+from downsampling import METHODS, axes_points, downsample_series, reduction_ratio
+from instrumentation import memory_tracing
+from query_backend import BACKENDS, get_backend
+from query_service import ServiceClient
+from render_cache import get_render_cache, set_render_cache
+from schema import COVID_SCHEMA, read_csv_options
+from snapshot_cache import SnapshotCache
+from synthetic_data import generate_owid_data, write_owid_csv
+from render_engine import new_figure, render_bytes
+from visualizer import create_deaths_by_continent_chart, create_cases_comparison_chart
+
+# Scale 1 approximates the size of the published file: ~250 locations x ~1000 days
+BASE_LOCATIONS = 250
+BASE_DAYS = 1000
+
+
+def measure(func, *args, **kwargs):
+    """
+    Measure the wall time and peak traced memory of a call.
+
+    The call is made twice: once untraced for timing and once under
+    tracemalloc for the memory peak, so tracing overhead does not skew the time.
+    Memory is traced through instrumentation.memory_tracing, so an active
+    tracer keeps tracing after the call.
+
+    Parameters:
+    func (callable): Function to measure
+    *args, **kwargs: Arguments passed to the function
+
+    Returns:
+    tuple: (result, seconds, peak_bytes); peak_bytes is None when a tracer overlapped the call
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    del result
+
+    with memory_tracing() as traced_peak:
+        result = func(*args, **kwargs)
+        peak = traced_peak()
+    return result, seconds, peak
+
+
+def _megabytes(n_bytes):
+    return n_bytes / 1e6 if n_bytes is not None else None
+
+
+def bench_ingest(url=DATA_URL):
+    """
+    Compare loading the full-width frame against the schema-projected frame.
+
+    Parameters:
+    url (str): URL or path of the CSV file to load
+
+    Returns:
+    dict: Load time, peak memory and frame memory for each variant
+    """
+    results = {}
+    for name, schema in (('full', None), ('schema', COVID_SCHEMA)):
+        df, seconds, peak = measure(fetch_covid_data, url, use_cache=False, schema=schema)
+        results[name] = {
+            'seconds': seconds,
+            'peak_mb': _megabytes(peak),
+            'frame_mb': df.memory_usage(deep=True).sum() / 1e6,
+            'columns': df.shape[1],
+        }
+    return results
+
+
+def _best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_index(n_locations=2000, n_days=1000):
+    """
+    Compare LocationDateIndex lookups against the groupby implementation.
+
+    Parameters:
+    n_locations (int): Number of synthetic countries
+    n_days (int): Number of days per country
+
+    Returns:
+    dict: Best-of-five timings in seconds for each operation
+    """
+    raw = generate_owid_data(n_locations, n_days, n_columns=14, nan_fraction=0)
+    df = CovidDataset(raw).countries.sample(frac=1, random_state=0)
+    as_of = df['date'].min() + pd.Timedelta(days=n_days // 2)
+
+    def groupby_latest():
+        return df.loc[df.groupby('location', observed=True)['date'].idxmax()]
+
+    def groupby_as_of():
+        subset = df[df['date'] <= as_of]
+        return subset.loc[subset.groupby('location', observed=True)['date'].idxmax()]
+
+    index = LocationDateIndex(df)
+    return {
+        'rows': {'count': len(df)},
+        'build': {'seconds': _best_of(lambda: LocationDateIndex(df))},
+        'latest': {'groupby': _best_of(groupby_latest), 'index': _best_of(index.latest)},
+        'as_of': {'groupby': _best_of(groupby_as_of), 'index': _best_of(lambda: index.as_of(as_of))},
+    }
+
+
+def bench_backends(n_locations=BASE_LOCATIONS, n_days=BASE_DAYS, repeat=3):
+    """
+    Compare the query backends on the aggregates of the standard charts.
+
+    Each backend starts from the same Parquet snapshot: pandas reads it whole
+    and partitions it, the query engines scan only what each query needs.
+
+    Parameters:
+    n_locations (int): Number of synthetic countries
+    n_days (int): Number of days per country
+    repeat (int): Number of timed runs; the best is kept
+
+    Returns:
+    dict: Per-backend best time in seconds of the latest rows, continent means and pivot
+    """
+    def pandas_queries(cache, csv_path):
+        # A cache hit: the snapshot is read whole, with its categorical columns restored
+        dataset = CovidDataset(cache.load(csv_path, read_csv_options(COVID_SCHEMA)))
+        latest_data = get_latest_data_by_country(dataset.countries)
+        return calculate_continent_deaths(latest_data), pivot_continent_data(dataset.continents())
+
+    def engine_queries(engine):
+        return engine.continent_means(), engine.continent_pivot()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_owid_csv(os.path.join(tmp, 'owid.csv'), n_locations=n_locations, n_days=n_days)
+        cache = SnapshotCache(tmp)
+        path = cache.snapshot_path(csv_path, read_csv_options(COVID_SCHEMA))
+        results['pandas'] = {'seconds': _best_of(lambda: pandas_queries(cache, csv_path), repeat)}
+        for name in BACKENDS[1:]:
+            try:
+                engine = get_backend(name, path)
+            except ImportError as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            results[name] = {'seconds': _best_of(lambda: engine_queries(engine), repeat)}
+    for row in results.values():
+        row['speedup'] = results['pandas']['seconds'] / row['seconds']
+    return results
+
+
+def bench_downsample(n_days=20000, repeat=3):
+    """
+    Measure what downsampling saves on the Europe/Asia cases chart.
+
+    Each method is compared with plotting every point: Matplotlib render time
+    for the static chart, and Plotly serialization time and payload size for
+    the dashboard's time-series traces.
+
+    Parameters:
+    n_days (int): Length of the synthetic series
+    repeat (int): Number of timed runs; the best is kept
+
+    Returns:
+    dict: Per-method points, reduction ratio, timings and payload sizes
+    """
+    import plotly.graph_objects as go
+
+    raw = generate_owid_data(12, n_days, n_columns=14, nan_fraction=0)
+    df_pivot = pivot_continent_data(CovidDataset(raw).continents())
+    _, ax = new_figure(CHART_SIZES['cases_comparison'])
+    chart_points = axes_points(ax)
+
+    def plotly_payload(method):
+        fig = go.Figure()
+        for continent in ('Europe', 'Asia'):
+            series = downsample_series(df_pivot[continent], DASHBOARD_CHART_WIDTH, method)
+            fig.add_trace(go.Scatter(x=series.index, y=series.values, mode='lines', name=continent))
+        return fig.to_json()
+
+    results = {}
+    previous_cache = get_render_cache()
+    set_render_cache(None)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, 'cases.png')
+            for method in (None,) + METHODS:
+                points = sum(len(downsample_series(df_pivot[c], chart_points, method)) for c in ('Europe', 'Asia'))
+                results[method or 'full'] = {
+                    'points': points,
+                    'reduction': reduction_ratio(2 * len(df_pivot), points),
+                    'matplotlib_seconds': _best_of(
+                        lambda: create_cases_comparison_chart(df_pivot, filename, downsample=method), repeat),
+                    'plotly_seconds': _best_of(lambda: plotly_payload(method), repeat),
+                    'plotly_kb': len(plotly_payload(method)) / 1e3,
+                }
+    finally:
+        set_render_cache(previous_cache)
+
+    full = results['full']
+    for method in METHODS:
+        for key, saving in [('matplotlib_seconds', 'matplotlib_time_saving'),
+                            ('plotly_seconds', 'plotly_time_saving'), ('plotly_kb', 'plotly_payload_saving')]:
+            results[method][saving] = reduction_ratio(full[key], results[method][key])
+    return results
+
+
+def bench_export(n_days=BASE_DAYS, formats=('png', 'svg', 'pdf'), repeat=3):
+    """
+    Compare exporting a chart in several formats from one chart call with one call per format.
+
+    Parameters:
+    n_days (int): Length of the synthetic series of the cases chart
+    formats (sequence): Output formats
+    repeat (int): Number of timed runs; the best is kept
+
+    Returns:
+    dict: Seconds and output size for each approach
+    """
+    raw = generate_owid_data(12, n_days, n_columns=14, nan_fraction=0)
+    df_pivot = pivot_continent_data(CovidDataset(raw).continents())
+
+    def per_format():
+        return {fmt: render_bytes(create_cases_comparison_chart, df_pivot, formats=(fmt,))[fmt] for fmt in formats}
+
+    def shared_figure():
+        return render_bytes(create_cases_comparison_chart, df_pivot, formats=formats)
+
+    results = {}
+    for name, func in [('per_format', per_format), ('shared_figure', shared_figure)]:
+        results[name] = {'seconds': _best_of(func, repeat), 'kb': sum(map(len, func().values())) / 1e3}
+    results['shared_figure']['time_saving'] = reduction_ratio(results['per_format']['seconds'],
+                                                              results['shared_figure']['seconds'])
+    return results
+
+
+async def _load_test(host, port, targets, connections, n_requests, revalidate):
+    """Send n_requests over `connections` keep-alive connections; return latencies by target, statuses and seconds."""
+    latencies = {target: [] for target in targets}
+    statuses = {}
+
+    async def worker(first):
+        client = ServiceClient(host, port)
+        etags = {}
+        try:
+            for i in range(first, n_requests, connections):
+                target = targets[i % len(targets)]
+                headers = {'If-None-Match': etags[target]} if revalidate and target in etags else None
+                start = time.perf_counter()
+                status, response_headers, _ = await client.get(target, headers)
+                latencies[target].append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if 'etag' in response_headers:
+                    etags[target] = response_headers['etag']
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(connections)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def _service_targets(host, port, timeout):
+    """Wait until the service answers, then pick a query mix with one of its locations."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        client = ServiceClient(host, port)
+        try:
+            status, _, body = await client.get('/latest?columns=location')
+            if status == 200:
+                break
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+        finally:
+            await client.close()
+        await asyncio.sleep(0.2)
+    location = json.loads(body)[0]['location']
+    return [f"/latest?{urllib.parse.urlencode({'location': location})}", '/latest', '/continents', '/series']
+
+
+def _latency_row(latencies, seconds=None):
+    millis = np.asarray(latencies) * 1e3
+    row = {'requests': len(millis), 'p50_ms': float(np.percentile(millis, 50)),
+           'p99_ms': float(np.percentile(millis, 99)), 'max_ms': float(millis.max())}
+    if seconds is not None:
+        row['throughput_rps'] = len(millis) / seconds
+    return row
+
+
+def bench_service(target=None, connections=8, n_requests=2000, revalidate=False,
+                  n_locations=BASE_LOCATIONS, n_days=BASE_DAYS, startup_timeout=120):
+    """
+    Load-test the query service: latency percentiles and throughput over keep-alive connections.
+
+    Parameters:
+    target (str): HOST:PORT of a running service; None starts one on synthetic data
+    connections (int): Concurrent client connections
+    n_requests (int): Total requests, spread over the connections and a mix of endpoints
+    revalidate (bool): Send the last ETag of each query in If-None-Match (measures 304 responses)
+    n_locations (int): Locations of the synthetic data of a started service
+    n_days (int): Days of the synthetic data of a started service
+    startup_timeout (float): Seconds to wait for the service to answer
+
+    Returns:
+    dict: p50/p99/max latency per endpoint, plus overall throughput and status counts
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if target is None:
+            csv_path = write_owid_csv(os.path.join(tmp, 'owid.csv'), n_locations=n_locations, n_days=n_days)
+            with socket.socket() as sock:
+                sock.bind(('127.0.0.1', 0))
+                port = sock.getsockname()[1]
+            host = '127.0.0.1'
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_service.py')
+            process = subprocess.Popen([sys.executable, script, '--source', csv_path, '--no-cache', '--reload', '0',
+                                        '--host', host, '--port', str(port)], stdout=subprocess.DEVNULL)
+        else:
+            host, _, port = target.rpartition(':')
+            port = int(port)
+        try:
+            targets = asyncio.run(_service_targets(host, port, startup_timeout))
+            latencies, statuses, seconds = asyncio.run(
+                _load_test(host, port, targets, connections, n_requests, revalidate))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    results = {target: _latency_row(values) for target, values in latencies.items()}
+    results['all'] = _latency_row([value for values in latencies.values() for value in values], seconds)
+    results['all'].update({f"status_{status}": count for status, count in sorted(statuses.items())})
+    return results
+
+
+# Run in a fresh interpreter: time one import and list the deferred libraries it loaded
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeat=5, deferred=STARTUP_DEFERRED_MODULES):
+    """
+    Measure the import time of a module in fresh interpreters.
+
+    Parameters:
+    module (str): Module to import
+    repeat (int): Number of interpreters started; the best time is kept
+    deferred (list): Libraries to report if the import loads them
+
+    Returns:
+    dict: Best import time in seconds and the deferred libraries loaded
+    """
+    code = _IMPORT_PROBE.format(module=module, deferred=list(deferred))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {'seconds': min(run['seconds'] for run in runs), 'loaded': runs[0]['loaded']}
+
+
+def bench_startup(modules=STARTUP_MODULES, repeat=5, budget=STARTUP_BUDGET_SECONDS):
+    """
+    Check the import time of the command-line entry points against a budget.
+
+    Every entry point needs pandas, so the budget applies to the time spent
+    beyond importing pandas; an entry point also fails when it loads one of
+    STARTUP_DEFERRED_MODULES at import.
+
+    Parameters:
+    modules (list): Modules to import
+    repeat (int): Fresh interpreters per module; the best time is kept
+    budget (float): Allowed import time beyond pandas in seconds
+
+    Returns:
+    dict: Per-module import time, time beyond pandas, deferred libraries loaded and verdict
+    """
+    baseline = measure_import('pandas', repeat)['seconds']
+    results = {'pandas': {'seconds': baseline, 'overhead': 0.0, 'loaded': '', 'ok': True}}
+    for module in modules:
+        result = measure_import(module, repeat)
+        overhead = max(result['seconds'] - baseline, 0.0)
+        results[module] = {
+            'seconds': result['seconds'],
+            'overhead': overhead,
+            'loaded': ' '.join(result['loaded']),
+            'ok': overhead <= budget and not result['loaded'],
+        }
+    return results
+
+
+def _profile_stage(func, args, repeat):
+    """Best-of-`repeat` wall time plus the traced memory peak of one call."""
+    result, seconds, peak = measure(func, *args)
+    if repeat > 1:
+        seconds = min(seconds, _best_of(lambda: func(*args), repeat - 1))
+    return result, {'seconds': seconds, 'peak_mb': _megabytes(peak)}
+
+
+def bench_stages(path, output_dir, repeat=3):
+    """
+    Time and memory-profile each pipeline stage on a local CSV file.
+
+    Parameters:
+    path (str): Path of the CSV file
+    output_dir (str): Directory for the rendered charts
+    repeat (int): Number of timed runs per stage; the best is kept
+
+    Returns:
+    dict: Per-stage seconds, peak traced memory in MB and row counts
+    """
+    stages = {}
+
+    def run(name, func, *args):
+        result, stats = _profile_stage(func, args, repeat)
+        rows = len(result) if hasattr(result, '__len__') and not isinstance(result, str) else None
+        stages[name] = dict(stats, rows_out=rows)
+        return result
+
+    df = run('fetch_covid_data', lambda p: fetch_covid_data(p, use_cache=False), path)
+    df_countries = run('filter_country_data', filter_country_data, df)
+    latest_data = run('get_latest_data_by_country', get_latest_data_by_country, df_countries)
+    continent_deaths = run('calculate_continent_deaths', calculate_continent_deaths, latest_data)
+    df_continents = run('filter_continent_data', filter_continent_data, df)
+    df_pivot = run('pivot_continent_data', pivot_continent_data, df_continents)
+
+    # Rendering is measured without the render cache, which would turn repeats into hits
+    previous_cache = get_render_cache()
+    set_render_cache(None)
+    try:
+        run('create_deaths_by_continent_chart', create_deaths_by_continent_chart, continent_deaths,
+            os.path.join(output_dir, 'deaths.png'))
+        run('create_cases_comparison_chart', create_cases_comparison_chart, df_pivot,
+            os.path.join(output_dir, 'cases.png'))
+    finally:
+        set_render_cache(previous_cache)
+    return stages
+
+
+def run_suite(scales=(1,), n_days=BASE_DAYS, repeat=3, data_dir=None):
+    """
+    Run the per-stage benchmarks at several data sizes.
+
+    Parameters:
+    scales (sequence): Multiples of BASE_LOCATIONS to generate data for
+    n_days (int): Days per location
+    repeat (int): Number of timed runs per stage
+    data_dir (str): Directory to keep generated CSV files in for reuse; a
+        temporary directory if None
+
+    Returns:
+    dict: Environment metadata and results per scale
+    """
+    results = {'meta': _environment(), 'results': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for scale in scales:
+            n_locations = int(BASE_LOCATIONS * scale)
+            path = os.path.join(data_dir, f'synthetic_{n_locations}x{n_days}.csv')
+            if not os.path.exists(path):
+                write_owid_csv(path, n_locations=n_locations, n_days=n_days)
+            stages = bench_stages(path, tmp, repeat)
+            results['results'][str(scale)] = {'locations': n_locations, 'days': n_days, 'stages': stages}
+    return results
+
+
+def compare_results(current, baseline):
+    """
+    Compute the time ratio of each stage against a baseline run.
+
+    Parameters:
+    current (dict): Results from run_suite
+    baseline (dict): Earlier results from run_suite
+
+    Returns:
+    dict: {scale: {stage: current seconds / baseline seconds}}
+    """
+    ratios = {}
+    for scale, result in current['results'].items():
+        base = baseline['results'].get(scale)
+        if not base:
+            continue
+        ratios[scale] = {
+            stage: stats['seconds'] / base['stages'][stage]['seconds']
+            for stage, stats in result['stages'].items()
+            if stage in base['stages'] and base['stages'][stage]['seconds'] > 0
+        }
+    return ratios
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    import matplotlib
+    import numpy
+    return {
+        'commit': commit or None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': numpy.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def _print_table(results):
+    width = max((len(name) for name in results), default=0)
+    for name, row in results.items():
+        print(f"{name:>{width}}: " + ", ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in row.items()
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help="Full-width vs schema-projected load")
+    ingest.add_argument('--url', default=DATA_URL)
+
+    index = subparsers.add_parser('index', help="LocationDateIndex vs groupby lookups")
+    index.add_argument('--locations', type=int, default=2000)
+    index.add_argument('--days', type=int, default=1000)
+
+    suite = subparsers.add_parser('suite', help="Per-stage timings and memory on synthetic data")
+    suite.add_argument('--scales', type=float, nargs='+', default=[1])
+    suite.add_argument('--days', type=int, default=BASE_DAYS)
+    suite.add_argument('--repeat', type=int, default=3)
+    suite.add_argument('--data-dir', help="Keep generated CSV files here for reuse")
+    suite.add_argument('--output', help="Write the JSON results to this file")
+    suite.add_argument('--compare', help="JSON results of an earlier run to compare against")
+
+    downsample = subparsers.add_parser('downsample', help="Render time and payload with and without downsampling")
+    downsample.add_argument('--days', type=int, default=20000)
+    downsample.add_argument('--repeat', type=int, default=3)
+
+    startup = subparsers.add_parser('startup', help="Import time of the entry points against a budget")
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--budget', type=float, default=STARTUP_BUDGET_SECONDS,
+                         help="Allowed import time beyond pandas in seconds")
+
+    backends = subparsers.add_parser('backends', help="pandas vs embedded query engines on the chart aggregates")
+    backends.add_argument('--locations', type=int, default=BASE_LOCATIONS)
+    backends.add_argument('--days', type=int, default=BASE_DAYS)
+    backends.add_argument('--repeat', type=int, default=3)
+
+    export = subparsers.add_parser('export', help="Multi-format export from one chart call vs one call per format")
+    export.add_argument('--days', type=int, default=BASE_DAYS)
+    export.add_argument('--formats', nargs='+', default=['png', 'svg', 'pdf'])
+    export.add_argument('--repeat', type=int, default=3)
+
+    service = subparsers.add_parser('service', help="Latency percentiles and throughput of the query service")
+    service.add_argument('--target', help="HOST:PORT of a running service (default: start one on synthetic data)")
+    service.add_argument('--connections', type=int, default=8)
+    service.add_argument('--requests', type=int, default=2000)
+    service.add_argument('--revalidate', action='store_true', help="Send If-None-Match with the last ETag")
+    service.add_argument('--locations', type=int, default=BASE_LOCATIONS)
+    service.add_argument('--days', type=int, default=BASE_DAYS)
+
+    args = parser.parse_args()
+    if args.command == 'ingest':
+        _print_table(bench_ingest(args.url))
+    elif args.command == 'index':
+        _print_table(bench_index(args.locations, args.days))
+    elif args.command == 'downsample':
+        _print_table(bench_downsample(args.days, args.repeat))
+    elif args.command == 'backends':
+        _print_table(bench_backends(args.locations, args.days, args.repeat))
+    elif args.command == 'export':
+        _print_table(bench_export(args.days, args.formats, args.repeat))
+    elif args.command == 'service':
+        _print_table(bench_service(args.target, args.connections, args.requests, args.revalidate,
+                                   args.locations, args.days))
+    elif args.command == 'startup':
+        results = bench_startup(repeat=args.repeat, budget=args.budget)
+        _print_table(results)
+        if not all(row['ok'] for row in results.values()):
+            sys.exit(f"Startup budget of {args.budget:.2f}s beyond pandas exceeded, or a deferred library was imported")
+    elif args.command == 'suite':
+        results = run_suite([_scale_label(scale) for scale in args.scales], args.days, args.repeat, args.data_dir)
+        for scale, result in results['results'].items():
+            print(f"scale {scale} ({result['locations']} locations x {result['days']} days)")
+            _print_table(result['stages'])
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+            print(f"Time ratio against {baseline['meta'].get('commit')} (<1 is faster)")
+            for scale, ratios in compare_results(results, baseline).items():
+                print(f"scale {scale}")
+                _print_table({stage: {'ratio': ratio} for stage, ratio in ratios.items()})
+
+
+def _scale_label(scale):
+    return int(scale) if float(scale).is_integer() else scale
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Batch generator for per-location chart packs.
+
+The dataset is parsed once and partitioned by location in a single groupby.
+Each location's (small) time series is then sent to a process pool that
+renders its trend charts (cases, deaths, vaccination by default) into
+<output-dir>/<location>/<chart>.png. Charts that already exist are skipped, and
+every file is written under a temporary name and renamed when complete, so an
+interrupted run can simply be restarted.
+
+Usage:
+    python chart_pack.py [--url URL] [--output-dir DIR] [--processes N]
+                         [--charts cases deaths vaccination] [--locations NAME ...] [--force]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from config import CHART_PACK_DIR, DATA_URL, LOCATION_CHARTS
+from data_fetcher import load_dataset
+from instrumentation import traced
+from render_engine import ChartJob, render_jobs
+from visualizer import create_location_trend_chart
+
+
+def location_slug(location):
+    """
+    Turn a location name into a directory name.
+
+    Parameters:
+    location (str): Location name, e.g. "Cote d'Ivoire"
+
+    Returns:
+    str: Lower-case name with runs of other characters replaced by underscores
+    """
+    return re.sub(r'\W+', '_', str(location)).strip('_').lower()
+
+
+def chart_path(output_dir, location, chart):
+    """Get the path of one chart of a location's pack."""
+    return os.path.join(output_dir, location_slug(location), f"{chart}.png")
+
+
+def render_location_pack(location, df_location, output_dir, charts):
+    """
+    Render the missing charts of one location.
+
+    Runs in a worker process, so it only receives the location's own rows.
+
+    Parameters:
+    location (str): Location name
+    df_location (pandas.DataFrame): The location's metrics indexed by date
+    output_dir (str): Root directory of the chart pack
+    charts (tuple): Names of LOCATION_CHARTS entries to render
+
+    Returns:
+    tuple: (location, list of paths written)
+    """
+    written = []
+    for chart in charts:
+        path = chart_path(output_dir, location, chart)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        metric, label = LOCATION_CHARTS[chart]
+        # Keep the .png suffix on the temporary file so Matplotlib infers the format
+        tmp = f"{path[:-4]}.{os.getpid()}.tmp.png"
+        try:
+            create_location_trend_chart(df_location[metric], f"{label} in {location}", label, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        written.append(path)
+    return location, written
+
+
+@traced()
+def plan_chart_pack(frame, output_dir=CHART_PACK_DIR, charts=tuple(LOCATION_CHARTS), locations=None, force=False):
+    """
+    Partition the data by location and build a job for every incomplete pack.
+
+    Parameters:
+    frame (pandas.DataFrame): Rows of every location
+    output_dir (str): Root directory of the chart pack
+    charts (tuple): Names of LOCATION_CHARTS entries to render
+    locations (list): Locations to include; None includes all of them
+    force (bool): Re-render charts that already exist
+
+    Returns:
+    tuple: (list of ChartJob, number of locations whose pack is already complete)
+    """
+    charts = tuple(charts)
+    metrics = sorted({LOCATION_CHARTS[chart][0] for chart in charts})
+    rows = frame[['location', 'date'] + metrics]
+    if locations is not None:
+        rows = rows[rows['location'].isin(list(locations))]
+
+    jobs, complete = [], 0
+    for location, df_location in rows.groupby('location', observed=True, sort=True):
+        missing = charts if force else tuple(
+            chart for chart in charts if not os.path.exists(chart_path(output_dir, location, chart)))
+        if not missing:
+            complete += 1
+            continue
+        if force:
+            for chart in missing:
+                path = chart_path(output_dir, location, chart)
+                if os.path.exists(path):
+                    os.remove(path)
+        series = df_location.drop(columns='location').sort_values('date').set_index('date')
+        jobs.append(ChartJob(render_location_pack, (str(location), series, output_dir, missing)))
+    return jobs, complete
+
+
+def build_chart_pack(frame, output_dir=CHART_PACK_DIR, charts=tuple(LOCATION_CHARTS), locations=None,
+                     processes=None, force=False, progress=None):
+    """
+    Render the chart pack of every location.
+
+    Parameters:
+    frame (pandas.DataFrame): Rows of every location
+    output_dir (str): Root directory of the chart pack
+    charts (tuple): Names of LOCATION_CHARTS entries to render
+    locations (list): Locations to include; None includes all of them
+    processes (int): Number of worker processes; None uses one per CPU
+    force (bool): Re-render charts that already exist
+    progress (callable): Called as progress(done, total, result) after each location
+
+    Returns:
+    dict: Counts of locations rendered and skipped and of charts written
+    """
+    jobs, complete = plan_chart_pack(frame, output_dir, charts, locations, force)
+    results = render_jobs(jobs, processes, progress)
+    return {
+        'locations_rendered': len(results),
+        'locations_skipped': complete,
+        'charts_written': sum(len(written) for _, written in results),
+    }
+
+
+def _print_progress(done, total, result):
+    location, written = result
+    print(f"[{done:>{len(str(total))}}/{total}] {location}: {len(written)} chart(s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=DATA_URL)
+    parser.add_argument('--output-dir', default=CHART_PACK_DIR)
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--charts', nargs='+', choices=list(LOCATION_CHARTS), default=list(LOCATION_CHARTS))
+    parser.add_argument('--locations', nargs='+', help="Only these locations (default: all)")
+    parser.add_argument('--force', action='store_true', help="Re-render charts that already exist")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.url)
+    if dataset.empty:
+        sys.exit("Could not load data to generate the chart pack.")
+
+    start = time.perf_counter()
+    summary = build_chart_pack(dataset.frame, args.output_dir, args.charts, args.locations, args.processes,
+                               args.force, _print_progress)
+    print(f"Rendered {summary['charts_written']} chart(s) for {summary['locations_rendered']} location(s) "
+          f"in {time.perf_counter() - start:.1f}s; {summary['locations_skipped']} location(s) already complete. "
+          f"Output: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
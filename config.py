@@ -6,33 +6,139 @@ import os
 
 # Data source configuration
 DATA_URL = "https://raw.githubusercontent.com/owid/covid-19-data/master/public/data/owid-covid-data.csv"
+FETCH_TIMEOUT = 60
+
+# Companion OWID files fetched concurrently by async_fetcher
+OWID_DATA_ROOT = "https://raw.githubusercontent.com/owid/covid-19-data/master/public/data"
+DATA_SOURCES = {
+    'covid': DATA_URL,
+    'vaccinations': f"{OWID_DATA_ROOT}/vaccinations/vaccinations.csv",
+    'hospitalizations': f"{OWID_DATA_ROOT}/hospitalizations/covid-hospitalizations.csv",
+    'testing': f"{OWID_DATA_ROOT}/testing/covid-testing-all-observations.csv",
+}
+FETCH_MAX_CONNECTIONS = 4
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+
+# Snapshot cache configuration
+CACHE_DIR = "cache"
+USE_SNAPSHOT_CACHE = True
+# Rows per Parquet row group of a snapshot; bounded so query filters can skip groups by their statistics
+SNAPSHOT_ROW_GROUP_SIZE = 65536
+
+# Engine for the script's filters and aggregations: 'pandas' (in memory), 'arrow' (pyarrow datasets)
+# or 'duckdb' (SQL, needs the optional duckdb package); see query_backend.py
+QUERY_BACKEND = 'pandas'
+# Worker threads of the query engine; None uses every core. DuckDB caps its
+# connection at this count; Arrow can only switch threading off (1) per query,
+# since its CPU pool is shared by the whole process
+QUERY_THREADS = None
+
+# Streaming ingest configuration (rows per chunk)
+STREAM_CHUNKSIZE = 100000
+
+# Memory-mapped dataset shared by dashboard worker processes (snapshots kept on disk)
+SHARED_DATASET_DIR = os.path.join(CACHE_DIR, "shared")
+SHARED_DATASET_KEEP = 2
+
+# Incremental ingest state
+INCREMENTAL_STATE_PATH = os.path.join(CACHE_DIR, "incremental_state.pkl")
 
 # Visualization configuration
 CHART_COLORS = {
     'deaths_by_continent': '#1f77b4',
     'cases_comparison': ['#ff7f0e', '#2ca02c'],
     'vaccination_scatter': '#d62728',
-    'case_progression': ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+    'case_progression': ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b'],
+    'location_trend': '#1f77b4'
 }
 
 CHART_SIZES = {
     'deaths_by_continent': (12, 6),
     'cases_comparison': (14, 7),
     'vaccination_scatter': (12, 8),
-    'case_progression': (14, 8)
+    'case_progression': (14, 8),
+    'location_trend': (10, 5)
 }
 
+# Per-location chart pack: chart name -> (metric, axis label)
+LOCATION_CHARTS = {
+    'cases': ('new_cases_smoothed', 'Smoothed New Cases'),
+    'deaths': ('new_deaths_smoothed', 'Smoothed New Deaths'),
+    'vaccination': ('people_fully_vaccinated_per_hundred', 'People Fully Vaccinated per Hundred'),
+}
+
+# Downsampling of long time series before plotting: 'lttb', 'minmax' or None for every point
+DOWNSAMPLE_METHOD = 'lttb'
+DOWNSAMPLE_POINTS_PER_PIXEL = 1
+
 # Dashboard configuration
 DASHBOARD_TITLE = "COVID-19 Data Visualization Dashboard"
 DASHBOARD_LAYOUT = "wide"
+DASHBOARD_FILTER_CACHE_SIZE = 32
+# Built Plotly figures kept per process, keyed by figure, dataset version, filter state and options
+DASHBOARD_FIGURE_CACHE_SIZE = 64
+# Traces with at least this many points are drawn with WebGL in the 'auto' rendering mode
+DASHBOARD_WEBGL_MIN_POINTS = 1000
+# Assumed plot width in pixels when downsampling dashboard time series
+DASHBOARD_CHART_WIDTH = 1600
+# Smoothing offered for dashboard time series: label -> trailing window in days (None: OWID's 7-day columns)
+DASHBOARD_SMOOTHING_WINDOWS = {'7-day (OWID)': None, '14-day': 14, '28-day': 28}
+# Rows per page offered by the Data Explorer
+DASHBOARD_PAGE_SIZES = [50, 100, 500, 1000]
+# Continent statistics shown on the dashboard: (column, statistic), computed in one pass.
+# Statistics: 'mean', 'median', 'sum', 'weighted_mean' (by population) or 'q<fraction>'
+CONTINENT_STATISTICS = [
+    ('total_cases_per_million', 'mean'),
+    ('total_cases_per_million', 'weighted_mean'),
+    ('total_cases_per_million', 'median'),
+    ('total_cases_per_million', 'q0.9'),
+    ('total_deaths_per_million', 'mean'),
+    ('total_deaths_per_million', 'weighted_mean'),
+    ('total_deaths_per_million', 'median'),
+    ('total_deaths_per_million', 'q0.9'),
+    ('people_fully_vaccinated_per_hundred', 'weighted_mean'),
+    ('people_fully_vaccinated_per_hundred', 'median'),
+    ('total_cases', 'sum'),
+    ('total_deaths', 'sum'),
+    ('population', 'sum'),
+]
+
+# Startup budget: import time of a command-line entry point beyond importing pandas, in seconds
+STARTUP_BUDGET_SECONDS = 0.25
+# Command-line entry points checked against the startup budget
+STARTUP_MODULES = ['covid_visualization', 'enhanced_covid_visualization', 'chart_pack', 'create_sample_viz',
+                   'async_fetcher', 'shared_dataset', 'incremental', 'synthetic_data', 'query_service']
+# Libraries the entry points must not import until they are used
+STARTUP_DEFERRED_MODULES = ['matplotlib', 'plotly', 'streamlit']
+
+# Read-only HTTP/JSON query service (query_service.py)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+# Seconds between checks of the source for a new snapshot; None disables hot-reload
+SERVICE_RELOAD_INTERVAL = 30
+# Encoded responses kept, keyed by endpoint and query parameters
+SERVICE_CACHE_SIZE = 256
+# Seconds an idle keep-alive connection stays open
+SERVICE_KEEPALIVE_TIMEOUT = 15
+
+# Rows serialized per chunk when exporting data
+EXPORT_CHUNKSIZE = 50000
 
 # File paths
+# Created when the first chart is saved (see render_engine.save_figure), not at import
 OUTPUT_DIR = "output"
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
 
 # Chart filenames
 DEATHS_CHART_FILENAME = os.path.join(OUTPUT_DIR, "deaths_per_million_by_continent.png")
 CASES_CHART_FILENAME = os.path.join(OUTPUT_DIR, "new_cases_smoothed_europe_asia.png")
 VACCINATION_CHART_FILENAME = os.path.join(OUTPUT_DIR, "vaccination_vs_deaths_scatter.png")
-PROGRESSION_CHART_FILENAME = os.path.join(OUTPUT_DIR, "case_progression_by_continent.png")
\ No newline at end of file
+PROGRESSION_CHART_FILENAME = os.path.join(OUTPUT_DIR, "case_progression_by_continent.png")
+
+# Output directory of the per-location chart pack
+CHART_PACK_DIR = os.path.join(OUTPUT_DIR, "chart_pack")
+
+# Render cache for chart files keyed by the content of their inputs
+RENDER_CACHE_ENABLED = True
+RENDER_CACHE_DIR = os.path.join(OUTPUT_DIR, ".render_cache")
+RENDER_CACHE_MAX_BYTES = 200 * 1024 * 1024
\ No newline at end of file
@@ -1,33 +1,83 @@
 """
 Main application for generating COVID-19 visualizations.
 """
-from data_fetcher import fetch_covid_data, filter_country_data, filter_continent_data
-from data_processor import get_latest_data_by_country, calculate_continent_deaths, pivot_continent_data
-from visualizer import create_deaths_by_continent_chart, create_cases_comparison_chart
-
-
-def main():
-    # Fetch data
-    df = fetch_covid_data()
-    
-    if not df.empty:
-        # Process country data for deaths visualization
-        df_countries = filter_country_data(df)
-        latest_data = get_latest_data_by_country(df_countries)
-        continent_deaths = calculate_continent_deaths(latest_data)
-        
-        # Process continent data for cases visualization
-        df_continents = filter_continent_data(df)
-        df_pivot = pivot_continent_data(df_continents)
-        
-        # Generate visualizations
-        deaths_chart = create_deaths_by_continent_chart(continent_deaths)
-        cases_chart = create_cases_comparison_chart(df_pivot)
-        
-        print(f"Visualizations created: '{deaths_chart}', '{cases_chart}'")
+import argparse
+
+from config import QUERY_BACKEND, STREAM_CHUNKSIZE
+from data_fetcher import stream_covid_partitions
+from data_processor import reduce_streamed_partitions
+from instrumentation import add_profiling_arguments, profile_run
+from pipeline import build_covid_pipeline
+from query_backend import BACKENDS, get_backend
+
+CHARTS = ['deaths_chart', 'cases_chart']
+
+
+def load_inputs(streaming=False, chunksize=STREAM_CHUNKSIZE, backend=QUERY_BACKEND):
+    """
+    Start a run of the visualization pipeline with its input data loaded.
+
+    Parameters:
+    streaming (bool): Read the source in chunks instead of loading it whole
+    chunksize (int): Number of rows per chunk when streaming
+    backend (str): Query backend, one of query_backend.BACKENDS; ignored when streaming
+
+    Returns:
+    PipelineRun: Run of build_covid_pipeline(), or None if the data could not be loaded
+    """
+    if backend != 'pandas' and not streaming:
+        try:
+            # The engine scans the snapshot itself, so the dataset is never loaded into pandas
+            return build_covid_pipeline(get_backend(backend)).start()
+        except ImportError as e:
+            print(f"{e}; using pandas instead.")
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return None
+
+    pipeline = build_covid_pipeline()
+    if streaming:
+        try:
+            latest_data, df_continents = reduce_streamed_partitions(stream_covid_partitions(chunksize=chunksize))
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return None
+        # The streamed reduction stands in for the dataset, which is then never loaded
+        return pipeline.start({'latest_data': latest_data, 'continents': df_continents})
+
+    # Fetch data, parsing and partitioning it once
+    run = pipeline.start()
+    if run['dataset'].empty:
+        return None
+    return run
+
+
+def main(streaming=False, chunksize=STREAM_CHUNKSIZE, charts=None, backend=QUERY_BACKEND):
+    run = load_inputs(streaming, chunksize, backend)
+
+    if run is not None and not run['latest_data'].empty:
+        # Only the steps the requested charts depend on run, each once; charts render in parallel
+        created = run.compute(charts or run.pipeline.charts)
+        print(f"Visualizations created: {', '.join(repr(path) for path in created.values())}")
     else:
         print("Could not load data to generate visualizations.")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate COVID-19 visualizations.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Read the data in chunks to bound peak memory")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNKSIZE,
+                        help="Rows per chunk when streaming")
+    parser.add_argument('--backend', choices=BACKENDS, default=QUERY_BACKEND,
+                        help="Engine for the filters and aggregations (default: %(default)s)")
+    parser.add_argument('--charts', nargs='+', choices=CHARTS, default=None,
+                        help="Charts to create (default: all)")
+    add_profiling_arguments(parser)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    with profile_run(args.profile, args.chrome_trace):
+        main(streaming=args.stream, chunksize=args.chunksize, charts=args.charts, backend=args.backend)
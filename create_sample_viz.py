@@ -1,9 +1,7 @@
 """
 Create a sample visualization using our modular approach.
 """
-import pandas as pd
-import matplotlib.pyplot as plt
-from data_fetcher import fetch_covid_data, filter_country_data
+from data_fetcher import load_dataset
 from data_processor import get_latest_data_by_country, calculate_continent_deaths
 from visualizer import create_deaths_by_continent_chart
 
@@ -12,15 +10,14 @@ def main():
     
     # Fetch data
     print("1. Fetching data...")
-    df = fetch_covid_data()
+    dataset = load_dataset()
     
-    if not df.empty:
-        print(f"   Data fetched successfully. Shape: {df.shape}")
+    if not dataset.empty:
+        print(f"   Data fetched successfully. Shape: {dataset.frame.shape}")
         
         # Process data
         print("2. Processing data...")
-        df_countries = filter_country_data(df)
-        latest_data = get_latest_data_by_country(df_countries)
+        latest_data = get_latest_data_by_country(dataset.countries)
         continent_deaths = calculate_continent_deaths(latest_data)
         
         print("3. Creating visualization...")
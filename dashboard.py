@@ -1,13 +1,20 @@
 """
 Interactive COVID-19 dashboard using Streamlit.
 """
+import json
+import os
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from data_fetcher import fetch_covid_data, filter_country_data
-from data_processor import get_latest_data_by_country, calculate_continent_deaths
-from visualizer import create_deaths_by_continent_chart, create_cases_comparison_chart
+from data_fetcher import load_dataset
+from config import DASHBOARD_PAGE_SIZES, DASHBOARD_SMOOTHING_WINDOWS, DOWNSAMPLE_METHOD
+from dashboard_figures import (RENDER_MODES, TIME_SERIES_TRACES, FigureCache, continent_deaths_figure,
+                               gdp_scatter_figure, time_series_figure)
+from dashboard_state import DashboardData, get_page, page_count, prepare_dashboard_frame, smoothed_column
+from data_export import EXPORT_FORMATS, export_file
+from downsampling import reduction_ratio
+from instrumentation import Tracer, stage
+from shared_dataset import SharedDatasetStore
 
 
 # Set page configuration
@@ -18,14 +25,70 @@ st.set_page_config(
 )
 
 
-@st.cache_data
-def load_data():
-    """Load and cache the COVID-19 data."""
-    df = fetch_covid_data()
-    return df
+# Time-series granularity label -> aggregate cube frequency
+GRANULARITIES = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'M'}
+
+
+# Snapshot shared by every dashboard process on this host
+shared_store = SharedDatasetStore()
+
+
+def publish_snapshot():
+    """Load the data and publish it as the shared snapshot; None if it could not be loaded."""
+    dataset = load_dataset()
+    if dataset.empty:
+        return None
+    return shared_store.publish(prepare_dashboard_frame(dataset.countries))
+
+
+@st.cache_resource(max_entries=1)
+def load_dashboard_data(version):
+    """Map a shared snapshot and build its indexes once per process and snapshot version."""
+    return DashboardData(shared_store.open(version))
+
+
+def _read_export(path):
+    """Read a finished export into memory and remove its temporary file."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+@st.cache_resource
+def figure_cache():
+    """Built figures shared by every session of this process."""
+    return FigureCache()
+
+
+def show_profile(tracer):
+    """Show the stages recorded during this rerun in the sidebar."""
+    st.sidebar.subheader("Profile")
+    records = tracer.summary()
+    if not records:
+        st.sidebar.caption("No uncached stages ran in this rerun.")
+        return
+    table = pd.DataFrame(records)
+    table['name'] = ['\u00a0\u00a0' * depth + name for depth, name in zip(table['depth'], table['name'])]
+    st.sidebar.dataframe(table.set_index('name')[['wall_seconds', 'cpu_seconds', 'peak_mb', 'rows']])
+    events = json.dumps({'traceEvents': tracer.chrome_trace_events(), 'displayTimeUnit': 'ms'})
+    st.sidebar.download_button("Download Chrome trace", events, file_name="dashboard_trace.json",
+                               mime="application/json")
 
 
 def main():
+    # Profiling is opt-in per rerun; cached loaders only show up on the run that fills them
+    profile = st.sidebar.checkbox("Profile this run", help="Record stage timings and memory for this rerun")
+    if not profile:
+        render_dashboard()
+        return
+    with Tracer() as tracer:
+        render_dashboard()
+    show_profile(tracer)
+
+
+def render_dashboard():
     # Title and description
     st.title("📊 COVID-19 Data Visualization Dashboard")
     st.markdown("""
@@ -35,9 +98,11 @@ def main():
     
     # Load data
     with st.spinner("Loading data..."):
-        df = load_data()
+        # A newly published snapshot changes the version, which swaps the mapped data on the next rerun
+        version = shared_store.current_version() or publish_snapshot()
+        data = load_dashboard_data(version) if version else None
     
-    if df.empty:
+    if data is None:
         st.error("Failed to load data. Please try again later.")
         return
     
@@ -45,24 +110,26 @@ def main():
     st.sidebar.header("Filters")
     
     # Date range selector
-    min_date = df['date'].min().date()
-    max_date = df['date'].max().date()
+    min_date = data.min_date.date()
+    max_date = data.max_date.date()
     
     start_date = st.sidebar.date_input("Start date", min_date, min_value=min_date, max_value=max_date)
     end_date = st.sidebar.date_input("End date", max_date, min_value=min_date, max_value=max_date)
     
-    # Filter data by date range
-    df_filtered = df[(df['date'].dt.date >= start_date) & (df['date'].dt.date <= end_date)]
-    
-    # Filter for country data only
-    df_countries = filter_country_data(df_filtered)
-    
     # Continent selector
-    continents = ['All'] + sorted(df_countries['continent'].dropna().unique().tolist())
+    continents = ['All'] + data.continents
     selected_continent = st.sidebar.selectbox("Select continent", continents)
     
-    if selected_continent != 'All':
-        df_countries = df_countries[df_countries['continent'] == selected_continent]
+    render_mode = st.sidebar.selectbox("Chart rendering", RENDER_MODES,
+                                       help="'auto' draws large scatter and line charts with WebGL")
+    
+    # Date-range slice and aggregates for this selection, cached per filter state
+    with stage('filter_state'):
+        state = data.filter_state(start_date, end_date, selected_continent)
+    df_countries = state.df_countries
+    # Figures are reused for a selection seen before; the version key drops them when new data is published
+    state_key = data.filter_key(start_date, end_date, selected_continent)
+    figures = figure_cache()
     
     # Main content
     tab1, tab2, tab3 = st.tabs(["Overview", "Visualizations", "Data Explorer"])
@@ -71,7 +138,7 @@ def main():
         st.header("Data Overview")
         
         # Key metrics
-        latest_data = get_latest_data_by_country(df_countries)
+        latest_data = state.latest_data
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -92,21 +159,19 @@ def main():
         
         # Deaths by continent chart
         st.subheader("Average Deaths per Million by Continent")
-        continent_deaths = calculate_continent_deaths(latest_data)
+        continent_deaths = state.continent_deaths
         
         if not continent_deaths.empty:
-            fig = px.bar(
-                x=continent_deaths.index,
-                y=continent_deaths.values,
-                labels={'x': 'Continent', 'y': 'Average Deaths per Million'},
-                color=continent_deaths.values,
-                color_continuous_scale='blues'
-            )
-            fig.update_layout(
-                xaxis_tickangle=-45,
-                height=500
-            )
+            fig = figures.get('continent_deaths', version, state_key, lambda: continent_deaths_figure(continent_deaths))
             st.plotly_chart(fig, use_container_width=True)
+        
+        # Continent statistics, computed in one pass with the deaths chart above
+        st.subheader("Continent Statistics")
+        if not state.continent_stats.empty:
+            continent_stats = state.continent_stats.copy()
+            continent_stats.columns = [f"{column} ({statistic.replace('_', ' ')})"
+                                       for column, statistic in continent_stats.columns]
+            st.dataframe(continent_stats.style.format('{:,.1f}'), use_container_width=True)
     
     with tab2:
         st.header("Interactive Visualizations")
@@ -114,74 +179,72 @@ def main():
         # Time series chart
         st.subheader("COVID-19 Cases Over Time")
         
-        # Aggregate data by date
-        daily_data = df_countries.groupby('date').agg({
-            'new_cases_smoothed': 'sum',
-            'new_deaths_smoothed': 'sum'
-        }).reset_index()
-        
-        # Create time series chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=daily_data['date'],
-            y=daily_data['new_cases_smoothed'],
-            mode='lines',
-            name='New Cases (Smoothed)',
-            line=dict(color='blue')
-        ))
-        fig.add_trace(go.Scatter(
-            x=daily_data['date'],
-            y=daily_data['new_deaths_smoothed'],
-            mode='lines',
-            name='New Deaths (Smoothed)',
-            line=dict(color='red')
-        ))
-        fig.update_layout(
-            title="Global COVID-19 Cases and Deaths Over Time",
-            xaxis_title="Date",
-            yaxis_title="Count",
-            height=600
-        )
+        # Sums by date from the aggregate cube, rolled up on request
+        granularity = st.radio("Granularity", list(GRANULARITIES))
+        smoothing = st.selectbox("Smoothing", list(DASHBOARD_SMOOTHING_WINDOWS))
+        window = DASHBOARD_SMOOTHING_WINDOWS[smoothing]
+        if GRANULARITIES[granularity] == 'D':
+            daily_data = state.daily_data
+        else:
+            daily_data = data.cube.totals(start_date, end_date, selected_continent, GRANULARITIES[granularity])
+        
+        # Create time series chart, downsampled to the plot width
+        columns = {metric: smoothed_column(metric, window) for metric, _, _ in TIME_SERIES_TRACES}
+        fig, points_in, points_out = figures.get(
+            'time_series', version, state_key,
+            lambda: time_series_figure(daily_data.set_index('date'), columns, smoothing, render_mode),
+            granularity, smoothing, render_mode)
         st.plotly_chart(fig, use_container_width=True)
+        if points_out < points_in:
+            st.caption(f"Plotted {points_out:,} of {points_in:,} points "
+                       f"({reduction_ratio(points_in, points_out):.0%} fewer, {DOWNSAMPLE_METHOD} downsampling)")
         
         # Scatter plot: GDP vs Cases
         st.subheader("Total Cases vs GDP per Capita")
         scatter_data = latest_data.dropna(subset=['gdp_per_capita', 'total_cases_per_million'])
         
         if not scatter_data.empty:
-            fig = px.scatter(
-                scatter_data,
-                x='gdp_per_capita',
-                y='total_cases_per_million',
-                color='continent',
-                hover_name='location',
-                size='population',
-                log_x=True,
-                size_max=60
-            )
-            fig.update_layout(
-                title="Total Cases per Million vs GDP per Capita",
-                xaxis_title="GDP per Capita (log scale)",
-                yaxis_title="Total Cases per Million",
-                height=600
-            )
+            fig = figures.get('gdp_scatter', version, state_key, lambda: gdp_scatter_figure(scatter_data, render_mode),
+                              render_mode)
             st.plotly_chart(fig, use_container_width=True)
     
     with tab3:
         st.header("Data Explorer")
         st.markdown("Explore the raw data used in this dashboard.")
         
-        # Display data table
-        st.dataframe(df_countries, use_container_width=True)
-        
-        # Download button
-        csv = df_countries.to_csv(index=False)
-        st.download_button(
-            label="Download filtered data as CSV",
-            data=csv,
-            file_name="covid_data_filtered.csv",
-            mime="text/csv"
-        )
+        # Column selection and server-side pagination: only one page is sent to the browser
+        all_columns = list(df_countries.columns)
+        columns = st.multiselect("Columns", all_columns, default=all_columns)
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Rows per page", DASHBOARD_PAGE_SIZES)
+        n_pages = page_count(len(df_countries), page_size)
+        with col2:
+            # Keyed on the selection size so a narrower selection starts again at page 1
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1,
+                                   key=f"explorer_page_{page_size}_{len(df_countries)}")
+        st.caption(f"Page {int(page):,} of {n_pages:,} ({len(df_countries):,} rows in the current selection)")
+        st.dataframe(get_page(df_countries, int(page), page_size, columns or None), use_container_width=True)
+        
+        # Export is only built when requested, chunk by chunk into a temporary file
+        export_format = st.selectbox("Export format", list(EXPORT_FORMATS))
+        extension, mime = EXPORT_FORMATS[export_format]
+        export_key = (version, state_key, export_format, tuple(columns))
+        if st.button("Prepare download"):
+            with st.spinner("Exporting..."):
+                path = export_file(df_countries, export_format, columns or None)
+                # Streamlit serves downloads from memory, so the finished export is held as bytes
+                # in the session (replacing any earlier one) and no file is left behind
+                st.session_state['export'] = {'key': export_key, 'data': _read_export(path)}
+        # Kept in the session so the button survives reruns until the selection changes
+        prepared = st.session_state.get('export')
+        if prepared is not None and prepared['key'] == export_key:
+            st.download_button(
+                label=f"Download filtered data ({len(prepared['data']) / 1e6:.1f} MB)",
+                data=prepared['data'],
+                file_name=f"covid_data_filtered.{extension}",
+                mime=mime
+            )
 
 
 if __name__ == "__main__":
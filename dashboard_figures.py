@@ -0,0 +1,155 @@
+"""
+Plotly figures of the dashboard, built once per filter state.
+
+Building a figure (and downsampling its series) costs more than sending it,
+so built figures are kept in an LRU cache keyed by figure id, dataset version,
+filter state and display options. Returning to a selection seen before reuses
+its figures instead of rebuilding them.
+
+Large scatter and line traces can be drawn with WebGL (Scattergl) instead of
+SVG, which keeps them responsive in the browser when they have many points.
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+from config import DASHBOARD_CHART_WIDTH, DASHBOARD_FIGURE_CACHE_SIZE, DASHBOARD_WEBGL_MIN_POINTS, DOWNSAMPLE_METHOD
+from dashboard_state import LRUCache
+from downsampling import downsample_series
+from instrumentation import traced
+
+# Rendering modes offered by the dashboard: 'auto' switches to WebGL from DASHBOARD_WEBGL_MIN_POINTS points
+RENDER_MODES = ('auto', 'svg', 'webgl')
+
+# Time-series traces: daily metric, legend label, color
+TIME_SERIES_TRACES = [('new_cases', 'New Cases', 'blue'), ('new_deaths', 'New Deaths', 'red')]
+
+
+def use_webgl(n_points, render_mode='auto'):
+    """
+    Decide whether a trace is drawn with WebGL.
+
+    Parameters:
+    n_points (int): Number of points in the trace
+    render_mode (str): One of RENDER_MODES
+
+    Returns:
+    bool: True for WebGL, False for SVG
+    """
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {render_mode!r}; expected one of {RENDER_MODES}")
+    if render_mode == 'auto':
+        return n_points >= DASHBOARD_WEBGL_MIN_POINTS
+    return render_mode == 'webgl'
+
+
+class FigureCache:
+    """
+    Bounded cache of built figures.
+
+    Figures are keyed by (figure id, dataset version, filter state, options);
+    callers must not modify a figure they get from the cache. The figures are
+    held in a dashboard_state.LRUCache, which is safe to share between the
+    sessions that get this cache through st.cache_resource.
+
+    Parameters:
+    maxsize (int): Maximum number of figures kept
+    """
+
+    def __init__(self, maxsize=DASHBOARD_FIGURE_CACHE_SIZE):
+        self.cache = LRUCache(maxsize)
+
+    def get(self, figure_id, version, state_key, build, *options):
+        """
+        Get a figure, building it on a miss.
+
+        Parameters:
+        figure_id (str): Name of the figure
+        version (str): Dataset version the figure is built from
+        state_key (tuple): Filter state, as returned by DashboardData.filter_key
+        build (callable): Zero-argument function building the figure
+        *options: Display options the figure depends on (granularity, render mode, ...)
+
+        Returns:
+        object: The cached or newly built figure
+        """
+        return self.cache.get_or_compute((figure_id, version, state_key) + options, build)
+
+
+@traced()
+def continent_deaths_figure(continent_deaths):
+    """Bar chart of average deaths per million by continent."""
+    fig = px.bar(
+        x=continent_deaths.index,
+        y=continent_deaths.values,
+        labels={'x': 'Continent', 'y': 'Average Deaths per Million'},
+        color=continent_deaths.values,
+        color_continuous_scale='blues'
+    )
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        height=500
+    )
+    return fig
+
+
+@traced()
+def time_series_figure(daily_series, columns, smoothing, render_mode='auto'):
+    """
+    Line chart of smoothed new cases and deaths, downsampled to the plot width.
+
+    Parameters:
+    daily_series (pandas.DataFrame): Sums indexed by date
+    columns (dict): Daily metric -> column of daily_series holding its smoothed values
+    smoothing (str): Label of the smoothing window, shown in the legend
+    render_mode (str): One of RENDER_MODES
+
+    Returns:
+    tuple: (plotly.graph_objects.Figure, points before downsampling, points plotted)
+    """
+    fig = go.Figure()
+    points_in = points_out = 0
+    for metric, label, color in TIME_SERIES_TRACES:
+        column = columns.get(metric)
+        if column not in daily_series:
+            continue
+        series = downsample_series(daily_series[column], DASHBOARD_CHART_WIDTH, DOWNSAMPLE_METHOD)
+        points_in += len(daily_series)
+        points_out += len(series)
+        trace = go.Scattergl if use_webgl(len(series), render_mode) else go.Scatter
+        fig.add_trace(trace(
+            x=series.index,
+            y=series.values,
+            mode='lines',
+            name=f"{label} ({smoothing} average)",
+            line=dict(color=color)
+        ))
+    fig.update_layout(
+        title="Global COVID-19 Cases and Deaths Over Time",
+        xaxis_title="Date",
+        yaxis_title="Count",
+        height=600
+    )
+    return fig, points_in, points_out
+
+
+@traced()
+def gdp_scatter_figure(scatter_data, render_mode='auto'):
+    """Bubble chart of total cases per million against GDP per capita, one bubble per country."""
+    fig = px.scatter(
+        scatter_data,
+        x='gdp_per_capita',
+        y='total_cases_per_million',
+        color='continent',
+        hover_name='location',
+        size='population',
+        log_x=True,
+        size_max=60,
+        render_mode='webgl' if use_webgl(len(scatter_data), render_mode) else 'svg'
+    )
+    fig.update_layout(
+        title="Total Cases per Million vs GDP per Capita",
+        xaxis_title="GDP per Capita (log scale)",
+        yaxis_title="Total Cases per Million",
+        height=600
+    )
+    return fig
@@ -0,0 +1,275 @@
+"""
+Module for computing and caching the data behind each dashboard filter state.
+
+This module has no Streamlit dependency so it can be used and tested on its own.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from config import CONTINENT_STATISTICS, DASHBOARD_FILTER_CACHE_SIZE, DASHBOARD_SMOOTHING_WINDOWS
+from data_processor import ContinentDateCube, LocationDateIndex, compute_continent_statistics
+from timeseries_metrics import add_derived_metrics
+
+
+DEATHS_MEAN = ('total_deaths_per_million', 'mean')
+
+# Daily metrics charted over time, smoothed by OWID (7 days) or by a window of DASHBOARD_SMOOTHING_WINDOWS
+TIME_SERIES_METRICS = ('new_cases', 'new_deaths')
+
+FilterState = namedtuple('FilterState', ['df_countries', 'latest_data', 'continent_deaths', 'continent_stats',
+                                         'daily_data'])
+
+
+def smoothed_column(metric, window=None):
+    """
+    Get the column holding a daily metric smoothed over a window.
+
+    Parameters:
+    metric (str): Daily metric, e.g. 'new_cases'
+    window (int): Window in days; None for OWID's own 7-day smoothing
+
+    Returns:
+    str: Column name, e.g. 'new_cases_smoothed' or 'new_cases_rolling_14'
+    """
+    return f"{metric}_smoothed" if window is None else f"{metric}_rolling_{window}"
+
+
+def page_count(n_rows, page_size):
+    """
+    Get the number of pages needed to show a number of rows.
+
+    Parameters:
+    n_rows (int): Number of rows
+    page_size (int): Rows per page
+
+    Returns:
+    int: Number of pages, at least 1
+    """
+    return max(-(-n_rows // page_size), 1)
+
+
+def get_page(df, page, page_size, columns=None):
+    """
+    Get one page of rows, restricted to the selected columns.
+
+    Only the requested rows and columns are copied, so the cost depends on the
+    page size rather than on the size of the selection.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to page through
+    page (int): Page number, starting at 1; clamped to the valid range
+    page_size (int): Rows per page
+    columns (list): Columns to show; None shows all of them
+
+    Returns:
+    pandas.DataFrame: The rows of the page
+    """
+    page = min(max(page, 1), page_count(len(df), page_size))
+    start = (page - 1) * page_size
+    rows = df.iloc[start:start + page_size]
+    return rows if columns is None else rows[list(columns)]
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry.
+
+    Safe to share between threads (Streamlit sessions share it through
+    st.cache_resource). Values are computed outside the lock, so a slow miss
+    does not hold up other keys; concurrent misses of one key may each compute
+    it, and the first value stored is returned to all of them.
+
+    Parameters:
+    maxsize (int): Maximum number of entries kept
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get_or_compute(self, key, compute):
+        """
+        Get the value stored for a key, computing and storing it on a miss.
+
+        Parameters:
+        key (hashable): Cache key
+        compute (callable): Zero-argument function producing the value
+
+        Returns:
+        object: The cached or freshly computed value
+        """
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            value = self._data.setdefault(key, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def smoothing_specs(columns):
+    """
+    Get the derived-metric specs of the custom smoothing windows.
+
+    Parameters:
+    columns (sequence): Columns of the country rows
+
+    Returns:
+    list: ('rolling_mean', metric, window) specs for the daily metrics present
+    """
+    windows = [window for window in DASHBOARD_SMOOTHING_WINDOWS.values() if window is not None]
+    return [('rolling_mean', metric, window) for metric in TIME_SERIES_METRICS if metric in columns
+            for window in windows]
+
+
+def prepare_dashboard_frame(df_countries, reset_index=True):
+    """
+    Sort country rows by date, the order DashboardData works on, and add the smoothed columns it charts.
+
+    Publishing this frame as a shared snapshot stores the derived columns in
+    the mapped file, so dashboard workers use it without computing (and
+    copying) anything.
+
+    Parameters:
+    df_countries (pandas.DataFrame): DataFrame containing country-level data
+    reset_index (bool): Replace the index with a range index
+
+    Returns:
+    pandas.DataFrame: Rows in date order (stable within a date)
+    """
+    order = np.argsort(df_countries['date'].to_numpy(), kind='stable')
+    frame = df_countries.take(order)
+    frame = frame.reset_index(drop=True) if reset_index else frame
+    return add_derived_metrics(frame, smoothing_specs(frame.columns))
+
+
+class DashboardData:
+    """
+    Country-level rows sorted by date, with the indexes the dashboard filters on.
+
+    Date ranges are sliced with a binary search on the sorted dates, the
+    latest row per country comes from a LocationDateIndex and time series come
+    from a ContinentDateCube, so a filter change never builds per-row Python
+    objects or re-runs a full groupby. The result of each (date range,
+    continent) selection is kept in a bounded LRU cache.
+
+    Parameters:
+    df_countries (pandas.DataFrame): DataFrame containing country-level data
+    cache_size (int): Number of filter states to keep
+    """
+
+    def __init__(self, df_countries, cache_size=DASHBOARD_FILTER_CACHE_SIZE):
+        dates = df_countries['date']
+        # A frame that is already date-sorted (e.g. a shared memory-mapped snapshot) is used without a copy
+        frame = df_countries if dates.is_monotonic_increasing else prepare_dashboard_frame(df_countries, False)
+        # Custom smoothing windows are computed per location once and aggregated like OWID's columns;
+        # a prepared frame (e.g. a shared snapshot) already has them and is used as is
+        self.frame = add_derived_metrics(frame, smoothing_specs(frame.columns))
+        windows = [window for window in DASHBOARD_SMOOTHING_WINDOWS.values() if window is not None]
+        self.index = LocationDateIndex(self.frame)
+        series = [smoothed_column(metric, window) for metric in TIME_SERIES_METRICS
+                  for window in [None] + windows]
+        self.cube = ContinentDateCube(self.frame, [column for column in series if column in self.frame.columns])
+        self.cache = LRUCache(cache_size)
+        self._dates = self.frame['date'].to_numpy()
+        self.min_date = self.frame['date'].min()
+        self.max_date = self.frame['date'].max()
+        self.continents = sorted(self.frame['continent'].dropna().unique().tolist())
+        # Statistics of columns the data has, plus the mean deaths behind the continent chart
+        self.statistics = [(column, statistic) for column, statistic in CONTINENT_STATISTICS
+                           if column in self.frame.columns
+                           and (statistic != 'weighted_mean' or 'population' in self.frame.columns)]
+        if DEATHS_MEAN not in self.statistics:
+            self.statistics.append(DEATHS_MEAN)
+
+    def slice_dates(self, start_date, end_date):
+        """
+        Get the rows dated between two days, both inclusive.
+
+        Parameters:
+        start_date (datetime.date): First day of the range
+        end_date (datetime.date): Last day of the range
+
+        Returns:
+        pandas.DataFrame: Positional slice of the date-sorted rows
+        """
+        lo, hi = self._date_bounds(start_date, end_date)
+        return self.frame.iloc[lo:hi]
+
+    def filter_state(self, start_date, end_date, continent='All'):
+        """
+        Get the filtered rows and derived aggregates for a filter selection.
+
+        Parameters:
+        start_date (datetime.date): First day of the range
+        end_date (datetime.date): Last day of the range
+        continent (str): Continent to keep, or 'All'
+
+        Returns:
+        FilterState: Filtered country rows, latest row per country, mean deaths
+            per million by continent, CONTINENT_STATISTICS by continent and
+            daily smoothed totals
+        """
+        key = self.filter_key(start_date, end_date, continent)
+        return self.cache.get_or_compute(key, lambda: self._compute_state(start_date, end_date, continent))
+
+    @staticmethod
+    def filter_key(start_date, end_date, continent='All'):
+        """
+        Get the hashable key of a filter selection.
+
+        Parameters:
+        start_date (datetime.date): First day of the range
+        end_date (datetime.date): Last day of the range
+        continent (str): Continent to keep, or 'All'
+
+        Returns:
+        tuple: Normalized (start, end, continent)
+        """
+        return pd.Timestamp(start_date), pd.Timestamp(end_date), continent
+
+    def _compute_state(self, start_date, end_date, continent):
+        df_countries = self.slice_dates(start_date, end_date)
+        # Latest row within the range is the latest as of its end, if it is not before its start
+        latest_data = self.index.as_of(end_date)
+        latest_data = latest_data[latest_data['date'] >= pd.Timestamp(start_date)]
+        if continent != 'All':
+            df_countries = df_countries[df_countries['continent'] == continent]
+            latest_data = latest_data[latest_data['continent'] == continent]
+
+        daily_data = self.cube.totals(start_date, end_date, continent)
+        # Every continent statistic, including the mean deaths chart, comes from one grouped pass
+        continent_stats = compute_continent_statistics(latest_data, self.statistics)
+        continent_deaths = (continent_stats[DEATHS_MEAN].rename('total_deaths_per_million')
+                            .sort_values(ascending=False))
+        return FilterState(df_countries, latest_data, continent_deaths, continent_stats, daily_data)
+
+    def _date_bounds(self, start_date, end_date):
+        start = pd.Timestamp(start_date).to_datetime64()
+        end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).to_datetime64()
+        return (np.searchsorted(self._dates, start, side='left'),
+                np.searchsorted(self._dates, end, side='left'))
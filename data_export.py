@@ -0,0 +1,151 @@
+"""
+Module for exporting filtered COVID-19 data as CSV, compressed CSV or Parquet.
+
+Exports are written chunk by chunk to a binary file object, so the full
+uncompressed text of a large selection never exists in memory at once: each
+chunk is serialized, compressed into the output and released before the next.
+export_file writes to a temporary file, so not even the finished export is
+held in memory while it is built.
+"""
+import gzip
+import io
+import os
+import tempfile
+
+from config import EXPORT_CHUNKSIZE
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'csv.gz': ('csv.gz', 'application/gzip'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def _chunks(df, chunksize):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def write_csv(df, fileobj, chunksize=EXPORT_CHUNKSIZE):
+    """
+    Write a DataFrame as UTF-8 CSV, one chunk at a time.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fileobj (file): Binary file object to write to; it is left open
+    chunksize (int): Rows serialized per chunk
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    df.iloc[:0].to_csv(text, index=False)
+    for chunk in _chunks(df, chunksize):
+        chunk.to_csv(text, index=False, header=False)
+        text.flush()
+    # Detach so closing the wrapper does not close the caller's file object
+    text.detach()
+
+
+def write_csv_gz(df, fileobj, chunksize=EXPORT_CHUNKSIZE):
+    """
+    Write a DataFrame as gzip-compressed CSV, one chunk at a time.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fileobj (file): Binary file object to write to; it is left open
+    chunksize (int): Rows serialized per chunk
+    """
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as compressed:
+        write_csv(df, compressed, chunksize)
+
+
+def write_parquet(df, fileobj, chunksize=EXPORT_CHUNKSIZE):
+    """
+    Write a DataFrame as Parquet with one row group per chunk.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fileobj (file): Binary file object to write to; it is left open
+    chunksize (int): Rows per row group
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for chunk in _chunks(df, chunksize):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_export(df, fileobj, fmt, columns=None, chunksize=EXPORT_CHUNKSIZE):
+    """
+    Write the selected columns of a DataFrame in an export format.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fileobj (file): Binary file object to write to
+    fmt (str): One of EXPORT_FORMATS
+    columns (list): Columns to export; None exports all of them
+    chunksize (int): Rows serialized per chunk
+
+    Returns:
+    file: The file object written to
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(EXPORT_FORMATS)}")
+    if columns is not None:
+        df = df[list(columns)]
+    if fmt == 'csv':
+        write_csv(df, fileobj, chunksize)
+    elif fmt == 'csv.gz':
+        write_csv_gz(df, fileobj, chunksize)
+    else:
+        write_parquet(df, fileobj, chunksize)
+    return fileobj
+
+
+def export_bytes(df, fmt, columns=None, chunksize=EXPORT_CHUNKSIZE):
+    """
+    Export a DataFrame to an in-memory buffer.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fmt (str): One of EXPORT_FORMATS
+    columns (list): Columns to export; None exports all of them
+    chunksize (int): Rows serialized per chunk
+
+    Returns:
+    bytes: The export
+    """
+    buffer = io.BytesIO()
+    write_export(df, buffer, fmt, columns, chunksize)
+    return buffer.getvalue()
+
+
+def export_file(df, fmt, columns=None, chunksize=EXPORT_CHUNKSIZE, directory=None):
+    """
+    Export a DataFrame to a temporary file, one chunk at a time.
+
+    Only building the export is streamed: Streamlit serves downloads from
+    memory, so the dashboard reads the finished file once and removes it.
+
+    Parameters:
+    df (pandas.DataFrame): Rows to export
+    fmt (str): One of EXPORT_FORMATS
+    columns (list): Columns to export; None exports all of them
+    chunksize (int): Rows serialized per chunk
+    directory (str): Directory of the file; None uses the system temporary directory
+
+    Returns:
+    str: Path of the export; the caller removes it when done
+    """
+    extension, _ = EXPORT_FORMATS.get(fmt, (None, None))
+    if extension is None:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(EXPORT_FORMATS)}")
+    fd, path = tempfile.mkstemp(suffix=f".{extension}", prefix='covid_export_', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_export(df, f, fmt, columns, chunksize)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
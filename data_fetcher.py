@@ -1,27 +1,76 @@
 """
 Module for fetching COVID-19 data from Our World in Data.
 """
+import numpy as np
 import pandas as pd
+from instrumentation import traced
+from config import DATA_URL, USE_SNAPSHOT_CACHE, STREAM_CHUNKSIZE
+from schema import COVID_SCHEMA, read_csv_options
+from snapshot_cache import get_default_cache
 
 
-def fetch_covid_data(url="https://raw.githubusercontent.com/owid/covid-19-data/master/public/data/owid-covid-data.csv"):
+@traced()
+def fetch_covid_data(url=DATA_URL, use_cache=USE_SNAPSHOT_CACHE, cache=None, schema=COVID_SCHEMA):
     """
     Fetch COVID-19 data from Our World in Data.
     
     Parameters:
     url (str): URL to the CSV file containing COVID-19 data
+    use_cache (bool): Whether to go through the on-disk snapshot cache
+    cache (SnapshotCache): Cache to use instead of the default one
+    schema (dict): Columns to load and their dtypes; None loads every column as-is
     
     Returns:
     pandas.DataFrame: DataFrame containing the fetched data
     """
+    read_options = read_csv_options(schema) if schema else {}
     try:
-        df = pd.read_csv(url)
+        if use_cache:
+            return (cache or get_default_cache()).load(url, read_options)
+        df = pd.read_csv(url, **read_options)
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
         return pd.DataFrame()
 
 
+def iter_covid_data(url=DATA_URL, chunksize=STREAM_CHUNKSIZE, schema=COVID_SCHEMA):
+    """
+    Read COVID-19 data from Our World in Data in chunks.
+    
+    Parameters:
+    url (str): URL to the CSV file containing COVID-19 data
+    chunksize (int): Number of rows per chunk
+    schema (dict): Columns to load and their dtypes; None loads every column as-is
+    
+    Yields:
+    pandas.DataFrame: Consecutive chunks of the data
+    """
+    read_options = read_csv_options(schema) if schema else {}
+    with pd.read_csv(url, chunksize=chunksize, **read_options) as reader:
+        yield from reader
+
+
+def stream_covid_partitions(url=DATA_URL, chunksize=STREAM_CHUNKSIZE, schema=COVID_SCHEMA):
+    """
+    Stream the data chunk by chunk, split into country and continent rows.
+    
+    Only one raw chunk is held in memory at a time, so peak memory is bounded
+    by the chunk size rather than the file size.
+    
+    Parameters:
+    url (str): URL to the CSV file containing COVID-19 data
+    chunksize (int): Number of rows per chunk
+    schema (dict): Columns to load and their dtypes; None loads every column as-is
+    
+    Yields:
+    tuple: (df_countries, df_continents) filtered from each chunk
+    """
+    for chunk in iter_covid_data(url, chunksize, schema):
+        yield filter_country_data(chunk), filter_continent_data(chunk)
+
+
+@traced()
 def filter_country_data(df):
     """
     Filter the DataFrame to include only country-level data.
@@ -33,15 +82,16 @@ def filter_country_data(df):
     pandas.DataFrame: Filtered DataFrame containing only country-level data
     """
     if not df.empty:
-        # Convert 'date' column to datetime
-        df['date'] = pd.to_datetime(df['date'])
-        
         # Filter out aggregate data (rows for continents, etc.)
         df_countries = df[df['continent'].notna()].copy()
+        
+        # Convert 'date' column to datetime on the copy so the caller's frame is untouched
+        df_countries['date'] = _to_datetime(df_countries['date'])
         return df_countries
     return df
 
 
+@traced()
 def filter_continent_data(df):
     """
     Filter the DataFrame to include only continent-level data.
@@ -53,10 +103,85 @@ def filter_continent_data(df):
     pandas.DataFrame: Filtered DataFrame containing only continent-level data
     """
     if not df.empty:
-        # Convert 'date' column to datetime
-        df['date'] = pd.to_datetime(df['date'])
-        
         # Filter for continent data
-        df_continents = df[df['continent'].isna() & df['location'].isin(['Europe', 'Asia'])]
+        df_continents = df[df['continent'].isna() & df['location'].isin(['Europe', 'Asia'])].copy()
+        
+        # Convert 'date' column to datetime
+        df_continents['date'] = _to_datetime(df_continents['date'])
         return df_continents
-    return df
\ No newline at end of file
+    return df
+
+
+def _to_datetime(dates):
+    """Parse a date column unless it is already datetime."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates)
+
+
+class CovidDataset:
+    """
+    COVID-19 data with dates parsed once and rows partitioned in a single pass.
+    
+    Rows are reordered once so that country-level rows come first and aggregate
+    rows (continents, World, income groups, ...) follow. Both partitions are then
+    positional slices of the same frame, so handing them out costs no copy.
+    Consumers must treat the partitions as read-only.
+    
+    Parameters:
+    df (pandas.DataFrame): Raw COVID-19 data; it is not modified
+    """
+
+    @traced('partition_dataset')
+    def __init__(self, df):
+        if df.empty:
+            self.frame = df
+            self.n_countries = 0
+        else:
+            is_aggregate = df['continent'].isna().to_numpy()
+            # Stable sort keeps the original row order within each partition
+            self.frame = df.take(np.argsort(is_aggregate, kind='stable'))
+            self.frame['date'] = _to_datetime(self.frame['date'])
+            self.n_countries = int(len(is_aggregate) - is_aggregate.sum())
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def countries(self):
+        """pandas.DataFrame: Country-level rows"""
+        return self.frame.iloc[:self.n_countries]
+
+    @property
+    def aggregates(self):
+        """pandas.DataFrame: Aggregate rows (continents, World, income groups, ...)"""
+        return self.frame.iloc[self.n_countries:]
+
+    def continents(self, locations=('Europe', 'Asia')):
+        """
+        Get the aggregate rows for the given continents.
+        
+        Parameters:
+        locations (sequence): Continent names to select
+        
+        Returns:
+        pandas.DataFrame: Continent-level rows for the requested continents
+        """
+        aggregates = self.aggregates
+        return aggregates[aggregates['location'].isin(list(locations))]
+
+
+@traced()
+def load_dataset(url=DATA_URL, **kwargs):
+    """
+    Fetch COVID-19 data and wrap it in a CovidDataset.
+    
+    Parameters:
+    url (str): URL to the CSV file containing COVID-19 data
+    **kwargs: Additional arguments passed to fetch_covid_data
+    
+    Returns:
+    CovidDataset: The partitioned dataset (empty if the data could not be loaded)
+    """
+    return CovidDataset(fetch_covid_data(url, **kwargs))
\ No newline at end of file
@@ -1,25 +1,355 @@
 """
 Module for processing COVID-19 data.
 """
+import numpy as np
 import pandas as pd
+from instrumentation import traced
 
 
-def get_latest_data_by_country(df_countries):
+# Month-end resampling alias; pandas 2.2 renamed 'M' to 'ME' and later releases reject 'M'
+MONTH_END_FREQ = 'ME' if tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2) else 'M'
+
+
+class LocationDateIndex:
+    """
+    Prebuilt index over country rows ordered by (location, date).
+    
+    The rows are sorted once; afterwards "latest row per country" and "latest
+    row per country as of a date" are answered with one vectorized binary
+    search per location instead of a full groupby. Dates are compared at day
+    resolution and, as with idxmax, the first row wins when a country has
+    several rows for the same day. Rows without a location or date are ignored.
+    
+    Parameters:
+    df_countries (pandas.DataFrame): DataFrame containing country-level data;
+        it is referenced, not copied, and must not be modified afterwards
+    """
+
+    def __init__(self, df_countries):
+        self.frame = df_countries
+        codes, self.locations = pd.factorize(df_countries['location'], sort=True)
+        days = df_countries['date'].to_numpy(dtype='datetime64[D]')
+        valid = (codes >= 0) & ~np.isnat(days)
+        days = days[valid].astype(np.int64)
+        codes = codes[valid].astype(np.int64)
+
+        self._first_day = days.min() if len(days) else 0
+        # Day offsets fit in [0, span]; one spare slot keeps clipped targets inside a group
+        self._span = (days.max() - self._first_day + 2) if len(days) else 2
+        keys = codes * self._span + (days - self._first_day)
+        order = np.argsort(keys, kind='stable')
+        self._positions = np.flatnonzero(valid)[order]
+        self._keys = keys[order]
+
+        sorted_codes = self._keys // self._span
+        self._starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+        self._ends = np.append(self._starts[1:], len(sorted_codes)) if len(sorted_codes) else self._starts
+        self._group_codes = sorted_codes[self._starts]
+
+    def latest(self):
+        """
+        Get the latest row for each country.
+        
+        Returns:
+        pandas.DataFrame: DataFrame with the latest data for each country
+        """
+        return self._take(self._ends - 1)
+
+    def as_of(self, date):
+        """
+        Get the latest row for each country on or before a date.
+        
+        Parameters:
+        date (str, datetime.date or pandas.Timestamp): Cut-off date (inclusive)
+        
+        Returns:
+        pandas.DataFrame: DataFrame with one row per country that has data on or
+            before the date
+        """
+        day = pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64)
+        offset = np.clip(day - self._first_day, -1, self._span - 1)
+        found = np.searchsorted(self._keys, self._group_codes * self._span + offset, side='right') - 1
+        return self._take(found[found >= self._starts])
+
+    def _take(self, found):
+        # Step back to the first row of the matched day so ties resolve like idxmax
+        first = np.searchsorted(self._keys, self._keys[found], side='left')
+        return self.frame.iloc[self._positions[first]]
+
+
+class ContinentDateCube:
+    """
+    Metric sums by continent and date, built once from country rows.
+    
+    Daily sums are stored as one date x continent frame per metric, together
+    with the global daily total and the weekly and monthly rollups of both, so
+    charts read time series from here instead of re-grouping country rows.
+    Date-range queries slice the sorted dates with a binary search.
+    
+    Parameters:
+    df_countries (pandas.DataFrame): DataFrame containing country-level data
+    metrics (sequence): Columns to aggregate
+    """
+
+    # Rollup frequency -> resample rule
+    FREQUENCIES = {'D': None, 'W': 'W-SUN', 'M': MONTH_END_FREQ}
+
+    def __init__(self, df_countries, metrics=('new_cases_smoothed', 'new_deaths_smoothed')):
+        self.metrics = list(metrics)
+        grouped = df_countries.groupby(['date', 'continent'], observed=True)
+        sums = grouped[self.metrics].sum()
+        # Row counts tell apart a zero sum from a continent without rows on that date
+        self.row_counts = grouped.size().unstack('continent', fill_value=0)
+        self.dates = pd.DatetimeIndex(self.row_counts.index)
+        self.continents = [str(continent) for continent in self.row_counts.columns]
+        self.row_counts.columns = self.continents
+
+        self._by_continent = {'D': {}}
+        self._totals = {'D': {}}
+        for metric in self.metrics:
+            daily = sums[metric].unstack('continent', fill_value=0)
+            daily.columns = [str(continent) for continent in daily.columns]
+            self._by_continent['D'][metric] = daily
+            self._totals['D'][metric] = daily.sum(axis=1).rename(metric)
+        for freq, rule in self.FREQUENCIES.items():
+            if rule is not None:
+                self._by_continent[freq] = {metric: frame.resample(rule).sum()
+                                            for metric, frame in self._by_continent['D'].items()}
+                self._totals[freq] = {metric: series.resample(rule).sum()
+                                      for metric, series in self._totals['D'].items()}
+
+    @property
+    def empty(self):
+        return len(self.dates) == 0
+
+    def by_continent(self, metric, freq='D'):
+        """
+        Get a metric by date and continent.
+        
+        Parameters:
+        metric (str): Aggregated column
+        freq (str): 'D' for daily sums, 'W' for weekly or 'M' for monthly rollups
+        
+        Returns:
+        pandas.DataFrame: Sums with dates (period ends for rollups) as index and continents as columns
+        """
+        return self._by_continent[freq][metric]
+
+    def total(self, metric, freq='D'):
+        """
+        Get the global total of a metric over all continents.
+        
+        Parameters:
+        metric (str): Aggregated column
+        freq (str): 'D' for daily sums, 'W' for weekly or 'M' for monthly rollups
+        
+        Returns:
+        pandas.Series: Sums with dates (period ends for rollups) as index
+        """
+        return self._totals[freq][metric]
+
+    def totals(self, start_date=None, end_date=None, continent='All', freq='D'):
+        """
+        Get the sums of every metric for a date range and continent selection.
+        
+        Parameters:
+        start_date (datetime.date): First day of the range, or None for the first date
+        end_date (datetime.date): Last day of the range, or None for the last date
+        continent (str): Continent to keep, or 'All' for the global total
+        freq (str): 'D' for daily sums, 'W' for weekly or 'M' for monthly rollups
+        
+        Returns:
+        pandas.DataFrame: A 'date' column followed by one column per metric
+        """
+        if start_date is None and end_date is None and continent == 'All':
+            frame = pd.DataFrame(self._totals[freq])
+        else:
+            lo = 0 if start_date is None else self.dates.searchsorted(pd.Timestamp(start_date), side='left')
+            hi = (len(self.dates) if end_date is None
+                  else self.dates.searchsorted(pd.Timestamp(end_date) + pd.Timedelta(days=1), side='left'))
+            if continent == 'All':
+                frame = pd.DataFrame({metric: self._totals['D'][metric].iloc[lo:hi] for metric in self.metrics})
+            elif continent in self.row_counts:
+                present = self.row_counts[continent].iloc[lo:hi].to_numpy() > 0
+                frame = pd.DataFrame({metric: self._by_continent['D'][metric][continent].iloc[lo:hi][present]
+                                      for metric in self.metrics})
+            else:
+                frame = pd.DataFrame({metric: pd.Series(dtype='float64', index=pd.DatetimeIndex([]))
+                                      for metric in self.metrics})
+            if self.FREQUENCIES[freq] is not None:
+                frame = frame.resample(self.FREQUENCIES[freq]).sum()
+        return frame.rename_axis('date').reset_index()
+
+
+@traced()
+def get_latest_data_by_country(df_countries, index=None):
     """
     Get the latest data for each country.
     
     Parameters:
     df_countries (pandas.DataFrame): DataFrame containing country-level data
+    index (LocationDateIndex): Prebuilt index over df_countries to answer from
     
     Returns:
     pandas.DataFrame: DataFrame with the latest data for each country
     """
+    if index is not None:
+        return index.latest()
     if not df_countries.empty:
-        latest_data = df_countries.loc[df_countries.groupby('location')['date'].idxmax()]
+        latest_data = df_countries.loc[df_countries.groupby('location', observed=True)['date'].idxmax()]
         return latest_data
     return df_countries
 
 
+def reduce_latest_by_country(latest_data, df_countries):
+    """
+    Fold a chunk of country-level rows into a running latest-per-country frame.
+    
+    Parameters:
+    latest_data (pandas.DataFrame): Latest data for each country seen so far
+    df_countries (pandas.DataFrame): New chunk of country-level data
+    
+    Returns:
+    pandas.DataFrame: DataFrame with the latest data for each country
+    """
+    candidate = get_latest_data_by_country(df_countries)
+    if latest_data.empty:
+        return candidate
+    if candidate.empty:
+        return latest_data
+    return get_latest_data_by_country(pd.concat([latest_data, candidate]))
+
+
+@traced()
+def reduce_streamed_partitions(partitions):
+    """
+    Consume streamed (df_countries, df_continents) chunks in a single pass.
+    
+    Only the latest row per country and the continent rows are retained, so
+    the raw country rows never need to be held in memory together.
+    
+    Parameters:
+    partitions (iterable): Iterable of (df_countries, df_continents) chunks,
+        e.g. from data_fetcher.stream_covid_partitions
+    
+    Returns:
+    tuple: (latest_data, df_continents) ready for calculate_continent_deaths
+        and pivot_continent_data
+    """
+    latest_data = pd.DataFrame()
+    continent_chunks = []
+    categorical_columns = None
+    for df_countries, df_continents in partitions:
+        if categorical_columns is None:
+            categorical_columns = [col for col, dtype in df_countries.dtypes.items()
+                                   if isinstance(dtype, pd.CategoricalDtype)]
+        latest_data = reduce_latest_by_country(latest_data, df_countries)
+        if not df_continents.empty:
+            continent_chunks.append(df_continents)
+
+    df_continents = pd.concat(continent_chunks) if continent_chunks else pd.DataFrame()
+    # Chunks carry their own category sets, so concatenation falls back to object dtype
+    for col in categorical_columns or []:
+        if col in latest_data:
+            latest_data[col] = latest_data[col].astype('category')
+        if col in df_continents:
+            df_continents[col] = df_continents[col].astype('category')
+    return latest_data, df_continents
+
+
+def _parse_statistic(statistic):
+    """Map a statistic name to (kind, quantile): 'median' is q0.5 and 'q0.9' the 90th percentile."""
+    if statistic in ('mean', 'sum', 'weighted_mean'):
+        return statistic, None
+    if statistic == 'median':
+        return 'quantile', 0.5
+    if statistic.startswith('q'):
+        try:
+            q = float(statistic[1:])
+        except ValueError:
+            q = None
+        if q is not None and 0 <= q <= 1:
+            return 'quantile', q
+    raise ValueError(f"Unknown statistic {statistic!r}; expected mean, median, sum, weighted_mean or q<0..1>")
+
+
+@traced()
+def compute_continent_statistics(latest_data, specs, weight='population', by='continent'):
+    """
+    Compute several statistics per continent in one grouped pass.
+    
+    The rows are grouped once: all requested columns are gathered into one
+    float64 matrix in group order, and sums, counts and weighted sums of every
+    column come from a single segmented reduction over it. Each column that
+    needs a median or quantile is additionally sorted once within the groups,
+    however many quantiles are requested for it. Missing values are skipped,
+    as in pandas.
+    
+    Parameters:
+    latest_data (pandas.DataFrame): DataFrame with the latest data for each country
+    specs (list): (column, statistic) pairs; statistic is 'mean', 'median',
+        'sum', 'weighted_mean' (weighted by `weight`) or 'q<fraction>', e.g. 'q0.9'
+    weight (str): Column holding the weights of 'weighted_mean'
+    by (str): Column to group by
+    
+    Returns:
+    pandas.DataFrame: One row per group and one column per spec, labelled (column, statistic)
+    """
+    specs = [tuple(spec) for spec in specs]
+    parsed = [(column, statistic) + _parse_statistic(statistic) for column, statistic in specs]
+    columns = sorted({column for column, _ in specs})
+    position = {column: j for j, column in enumerate(columns)}
+
+    codes, groups = pd.factorize(latest_data[by], sort=True)
+    keep = codes >= 0
+    order = np.argsort(codes[keep], kind='stable')
+    codes = codes[keep][order]
+    starts = np.searchsorted(codes, np.arange(len(groups)))
+    index = pd.Index(groups, name=by)
+    result_columns = pd.MultiIndex.from_tuples(specs, names=['column', 'statistic'])
+    if not len(codes):
+        return pd.DataFrame(index=index[:0], columns=result_columns, dtype='float64')
+
+    values = latest_data[columns].to_numpy(dtype=np.float64)[keep][order]
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    if any(kind == 'weighted_mean' for _, _, kind, _ in parsed):
+        weights = latest_data[weight].to_numpy(dtype=np.float64)[keep][order][:, None]
+        weighted = valid & ~np.isnan(weights)
+        weighted_sums = np.add.reduceat(np.where(weighted, values * weights, 0.0), starts, axis=0)
+        weight_totals = np.add.reduceat(np.where(weighted, weights, 0.0), starts, axis=0)
+
+    sorted_columns = {}
+    results = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for column, statistic, kind, q in parsed:
+            j = position[column]
+            if kind == 'sum':
+                results.append(sums[:, j])
+            elif kind == 'mean':
+                results.append(np.where(counts[:, j] > 0, sums[:, j] / counts[:, j], np.nan))
+            elif kind == 'weighted_mean':
+                results.append(np.where(weight_totals[:, j] > 0, weighted_sums[:, j] / weight_totals[:, j], np.nan))
+            else:
+                if j not in sorted_columns:
+                    # Sort by group, then value; NaN sorts last within each group
+                    sorted_columns[j] = values[np.lexsort((values[:, j], codes)), j]
+                results.append(_grouped_quantile(sorted_columns[j], starts, counts[:, j], q))
+    return pd.DataFrame(np.column_stack(results), index=index, columns=result_columns)
+
+
+def _grouped_quantile(sorted_values, starts, counts, q):
+    """Linearly interpolated quantile per group, as pandas computes it."""
+    position = np.maximum(counts - 1, 0) * q
+    lower = np.floor(position).astype(np.intp)
+    upper = np.ceil(position).astype(np.intp)
+    low = sorted_values[starts + lower]
+    high = sorted_values[starts + upper]
+    return np.where(counts > 0, low + (high - low) * (position - lower), np.nan)
+
+
+@traced()
 def calculate_continent_deaths(latest_data):
     """
     Calculate the mean of total_deaths_per_million for each continent.
@@ -31,22 +361,25 @@ def calculate_continent_deaths(latest_data):
     pandas.Series: Series with continents as index and mean deaths per million as values
     """
     if not latest_data.empty:
-        continent_deaths = latest_data.groupby('continent')['total_deaths_per_million'].mean().sort_values(ascending=False)
-        return continent_deaths
+        statistics = compute_continent_statistics(latest_data, [('total_deaths_per_million', 'mean')])
+        continent_deaths = statistics[('total_deaths_per_million', 'mean')].rename('total_deaths_per_million')
+        return continent_deaths.sort_values(ascending=False)
     return pd.Series()
 
 
-def pivot_continent_data(df_continents):
+@traced()
+def pivot_continent_data(df_continents, values='new_cases_smoothed'):
     """
     Pivot the continent data for easier plotting.
     
     Parameters:
     df_continents (pandas.DataFrame): DataFrame containing continent-level data
+    values (str): Column to pivot, e.g. a metric derived with timeseries_metrics
     
     Returns:
     pandas.DataFrame: Pivoted DataFrame with dates as index and continents as columns
     """
     if not df_continents.empty:
-        df_pivot = df_continents.pivot(index='date', columns='location', values='new_cases_smoothed')
+        df_pivot = df_continents.pivot(index='date', columns='location', values=values)
         return df_pivot
     return pd.DataFrame()
\ No newline at end of file
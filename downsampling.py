@@ -0,0 +1,161 @@
+"""
+Module for shape-preserving downsampling of long time series before plotting.
+
+A line chart cannot show more distinct points than it has horizontal pixels, so
+series are reduced to about one point per pixel before they are drawn or sent
+to the browser. Two methods are available:
+
+- 'lttb' (largest triangle three buckets) keeps, in each bucket, the point that
+  forms the largest triangle with its selected neighbours, which follows the
+  visual shape of the line closely.
+- 'minmax' keeps the minimum and maximum of each bucket, so every peak and
+  trough survives exactly.
+
+The first and last points are always kept. Missing values are skipped.
+"""
+import numpy as np
+import pandas as pd
+
+from config import DOWNSAMPLE_POINTS_PER_PIXEL
+from instrumentation import stage
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Select points with the largest-triangle-three-buckets algorithm.
+
+    Parameters:
+    x (numpy.ndarray): Increasing x values as floats
+    y (numpy.ndarray): Finite y values
+    n_out (int): Number of points to keep
+
+    Returns:
+    numpy.ndarray: Sorted positions of the kept points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # Average of each bucket, used as the third vertex for the bucket before it
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1])[1:]
+    avg_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1])[1:]
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        prev_x, prev_y = x[a], y[a]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((prev_x - avg_x[i]) * (y[start:end] - prev_y)
+                      - (prev_x - x[start:end]) * (avg_y[i] - prev_y))
+        a = start + area.argmax()
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Select the minimum and maximum of equal-width buckets.
+
+    Parameters:
+    y (numpy.ndarray): Finite y values
+    n_out (int): Approximate number of points to keep (two per bucket)
+
+    Returns:
+    numpy.ndarray: Sorted positions of the kept points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n) * n_buckets // n
+    # Sorting by bucket, then value puts each bucket's min first and max last
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket, np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+
+def downsample_indices(x, y, n_out, method='lttb'):
+    """
+    Select the points of a series to plot.
+
+    Parameters:
+    x (numpy.ndarray): Increasing x values as floats
+    y (numpy.ndarray): y values, possibly with NaN
+    n_out (int): Target number of points
+    method (str): 'lttb' or 'minmax'
+
+    Returns:
+    numpy.ndarray: Sorted positions into x and y of the kept, non-missing points
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {METHODS}")
+    valid = np.flatnonzero(np.isfinite(y))
+    if len(valid) <= n_out:
+        return valid
+    if method == 'lttb':
+        kept = lttb_indices(x[valid], y[valid], n_out)
+    else:
+        kept = minmax_indices(y[valid], n_out)
+    return valid[kept]
+
+
+def downsample_series(series, max_points, method='lttb'):
+    """
+    Reduce a series indexed by date (or number) to about max_points points.
+
+    Parameters:
+    series (pandas.Series): Values with an increasing index
+    max_points (int): Target number of points; None keeps every point
+    method (str): 'lttb' or 'minmax'; None keeps every point
+
+    Returns:
+    pandas.Series: The kept points, in order
+    """
+    if method is None or max_points is None or len(series) <= max_points:
+        return series
+    with stage('downsample') as handle:
+        index = series.index
+        if pd.api.types.is_datetime64_any_dtype(index):
+            x = index.asi8.astype(np.float64)
+        else:
+            x = np.asarray(index, dtype=np.float64)
+        y = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        result = series.iloc[downsample_indices(x, y, int(max_points), method)]
+        handle.set_rows(len(result))
+        return result
+
+
+def axes_points(ax, points_per_pixel=DOWNSAMPLE_POINTS_PER_PIXEL):
+    """
+    Get the number of points a Matplotlib axes can resolve horizontally.
+
+    Parameters:
+    ax (matplotlib.axes.Axes): Axes the series will be drawn on
+    points_per_pixel (float): Points to keep per pixel of axes width
+
+    Returns:
+    int: Target number of points
+    """
+    return max(int(ax.get_window_extent().width * points_per_pixel), 3)
+
+
+def reduction_ratio(n_in, n_out):
+    """
+    Get the fraction of points removed by downsampling.
+
+    Parameters:
+    n_in (int): Number of points before downsampling
+    n_out (int): Number of points after downsampling
+
+    Returns:
+    float: 0 when nothing was removed, close to 1 for large reductions
+    """
+    return 1 - n_out / n_in if n_in else 0.0
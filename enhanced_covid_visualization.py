@@ -1,190 +1,236 @@
 """
 Enhanced COVID-19 visualization script with additional chart types.
 """
+import argparse
+from operator import attrgetter
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+from data_fetcher import fetch_covid_data, CovidDataset
+from config import DOWNSAMPLE_METHOD
+from data_processor import ContinentDateCube, calculate_continent_deaths, get_latest_data_by_country
+from downsampling import axes_points, downsample_series
+from instrumentation import add_profiling_arguments, profile_run, traced
+from pipeline import Pipeline
+from render_engine import new_figure, save_figure
+
+
+DEATHS_FILENAME = 'deaths_per_million_by_continent_enhanced.png'
+CASES_FILENAME = 'new_cases_smoothed_europe_asia_enhanced.png'
+VACCINATION_FILENAME = 'vaccination_vs_deaths_scatter.png'
+PROGRESSION_FILENAME = 'case_progression_by_continent.png'
 
 
 def fetch_data():
     """Fetch COVID-19 data from Our World in Data."""
-    try:
-        df = pd.read_csv("https://raw.githubusercontent.com/owid/covid-19-data/master/public/data/owid-covid-data.csv")
+    return fetch_covid_data()
+
+
+def partition_data(df):
+    """Parse dates and partition the data once into country and aggregate rows."""
+    return CovidDataset(df)
+
+
+def preprocess_data(df):
+    """
+    Parse dates and keep the country rows, as a DataFrame.
+
+    Unlike before, the input's 'date' column is not converted in place. The
+    pipeline uses partition_data, which also keeps the aggregate rows.
+    """
+    if df.empty:
         return df
-    except Exception as e:
-        print(f"Error loading data: {e}")
+    return partition_data(df).countries
+
+
+@traced()
+def prepare_continent_deaths(latest_data):
+    """Calculate the mean of total_deaths_per_million for each continent."""
+    return calculate_continent_deaths(latest_data)
+
+
+@traced()
+def prepare_cases_pivot(df):
+    """Pivot the Europe and Asia smoothed new cases by date."""
+    # Use the continental data provided in the dataset
+    df_continents = df[df['continent'].isna() & df['location'].isin(['Europe', 'Asia'])]
+    return df_continents.pivot(index='date', columns='location', values='new_cases_smoothed')
+
+
+@traced()
+def prepare_vaccination_data(latest_data):
+    """Keep the countries with both vaccination and death rates."""
+    return latest_data.dropna(subset=['people_fully_vaccinated_per_hundred', 'total_deaths_per_million'])
+
+
+@traced()
+def prepare_case_progression(cube):
+    """Get the monthly smoothed new cases by continent from the aggregate cube."""
+    if cube.empty:
         return pd.DataFrame()
+    return cube.by_continent('new_cases_smoothed', 'M')
 
 
-def preprocess_data(df):
-    """Preprocess the data."""
-    if not df.empty:
-        # Convert 'date' column to datetime
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Filter out aggregate data (rows for continents, etc.)
-        df_countries = df[df['continent'].notna()].copy()
-        return df_countries
-    return df
-
-
-def create_deaths_by_continent_chart(df_countries):
-    """Create a bar chart showing average deaths per million by continent."""
-    # Get the latest data for each country
-    latest_data = df_countries.loc[df_countries.groupby('location')['date'].idxmax()]
-    # Calculate the mean of total_deaths_per_million for each continent
-    continent_deaths = latest_data.groupby('continent')['total_deaths_per_million'].mean().sort_values(ascending=False)
-
-    plt.figure(figsize=(12, 6))
-    bars = plt.bar(continent_deaths.index, continent_deaths.values, color='skyblue')
-    plt.title('Average Deaths per Million by Continent', fontsize=16)
-    plt.xlabel('Continent', fontsize=12)
-    plt.ylabel('Deaths per Million', fontsize=12)
-    plt.xticks(rotation=45)
-    
+def draw_deaths_by_continent_chart(continent_deaths, filename=DEATHS_FILENAME):
+    """Draw a bar chart of average deaths per million by continent."""
+    fig, ax = new_figure((12, 6))
+    bars = ax.bar([str(label) for label in continent_deaths.index], continent_deaths.values, color='skyblue')
+    ax.set_title('Average Deaths per Million by Continent', fontsize=16)
+    ax.set_xlabel('Continent', fontsize=12)
+    ax.set_ylabel('Deaths per Million', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)
+
     # Add value labels on bars
     for bar in bars:
         height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height,
-                 f'{height:.1f}',
-                 ha='center', va='bottom')
-    
-    plt.tight_layout()
-    plt.savefig('deaths_per_million_by_continent_enhanced.png')
-    plt.close()
-    
-    return 'deaths_per_million_by_continent_enhanced.png'
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.1f}',
+                ha='center', va='bottom')
 
+    return save_figure(fig, filename)
+
+
+def draw_cases_comparison_chart(df_pivot, filename=CASES_FILENAME, downsample=DOWNSAMPLE_METHOD):
+    """Draw a line chart of smoothed new cases in Europe and Asia."""
+    fig, ax = new_figure((14, 7))
+    for continent in ('Europe', 'Asia'):
+        series = downsample_series(df_pivot[continent], axes_points(ax), downsample)
+        ax.plot(series.index, series.values, label=continent, linewidth=2)
+    ax.set_title('Smoothed New Cases in Europe and Asia', fontsize=16)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Smoothed New Cases', fontsize=12)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    return save_figure(fig, filename)
+
+
+def draw_vaccination_scatter_plot(scatter_data, filename=VACCINATION_FILENAME):
+    """Draw a scatter plot of vaccination rates vs. death rates."""
+    fig, ax = new_figure((12, 8))
 
-def create_cases_comparison_chart(df):
-    """Create a line chart comparing smoothed new cases between Europe and Asia."""
-    # Use the continental data provided in the dataset
-    df_continents = df[df['continent'].isna() & df['location'].isin(['Europe', 'Asia'])]
-    
-    # Pivot the data to plot easily
-    df_pivot = df_continents.pivot(index='date', columns='location', values='new_cases_smoothed')
-
-    plt.figure(figsize=(14, 7))
-    plt.plot(df_pivot.index, df_pivot['Europe'], label='Europe', linewidth=2)
-    plt.plot(df_pivot.index, df_pivot['Asia'], label='Asia', linewidth=2)
-    plt.title('Smoothed New Cases in Europe and Asia', fontsize=16)
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Smoothed New Cases', fontsize=12)
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('new_cases_smoothed_europe_asia_enhanced.png')
-    plt.close()
-    
-    return 'new_cases_smoothed_europe_asia_enhanced.png'
-
-
-def create_vaccination_scatter_plot(df_countries):
-    """Create a scatter plot comparing vaccination rates vs. death rates."""
-    # Get the latest data for each country
-    latest_data = df_countries.loc[df_countries.groupby('location')['date'].idxmax()]
-    
-    # Filter out countries with missing data
-    scatter_data = latest_data.dropna(subset=['people_fully_vaccinated_per_hundred', 'total_deaths_per_million'])
-    
-    plt.figure(figsize=(12, 8))
-    
     if not scatter_data.empty:
-        plt.scatter(scatter_data['people_fully_vaccinated_per_hundred'], 
-                    scatter_data['total_deaths_per_million'], 
-                    alpha=0.6, 
-                    s=60)
-        
+        ax.scatter(scatter_data['people_fully_vaccinated_per_hundred'],
+                   scatter_data['total_deaths_per_million'],
+                   alpha=0.6,
+                   s=60)
+
         # Add trend line only if we have data
         if len(scatter_data) > 1:
-            z = np.polyfit(scatter_data['people_fully_vaccinated_per_hundred'], 
+            z = np.polyfit(scatter_data['people_fully_vaccinated_per_hundred'],
                            scatter_data['total_deaths_per_million'], 1)
             p = np.poly1d(z)
-            plt.plot(scatter_data['people_fully_vaccinated_per_hundred'], 
-                     p(scatter_data['people_fully_vaccinated_per_hundred']), 
-                     "r--", alpha=0.8)
-    
-    plt.title('Vaccination Rates vs. Death Rates by Country', fontsize=16)
-    plt.xlabel('People Fully Vaccinated per Hundred', fontsize=12)
-    plt.ylabel('Total Deaths per Million', fontsize=12)
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('vaccination_vs_deaths_scatter.png')
-    plt.close()
-    
-    return 'vaccination_vs_deaths_scatter.png'
+            ax.plot(scatter_data['people_fully_vaccinated_per_hundred'],
+                    p(scatter_data['people_fully_vaccinated_per_hundred']),
+                    "r--", alpha=0.8)
+
+    ax.set_title('Vaccination Rates vs. Death Rates by Country', fontsize=16)
+    ax.set_xlabel('People Fully Vaccinated per Hundred', fontsize=12)
+    ax.set_ylabel('Total Deaths per Million', fontsize=12)
+    ax.grid(True, alpha=0.3)
+
+    return save_figure(fig, filename)
+
+
+def draw_case_progression_area_chart(pivot_monthly, filename=PROGRESSION_FILENAME):
+    """Draw a stacked area chart of monthly case progression by continent."""
+    fig, ax = new_figure((14, 8))
+    ax.set_title('COVID-19 Case Progression by Continent', fontsize=16)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Smoothed New Cases', fontsize=12)
+
+    if pivot_monthly.empty:
+        # Create empty chart if no data
+        ax.text(0.5, 0.5, 'No data available', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+        return save_figure(fig, filename)
+
+    ax.stackplot(pivot_monthly.index,
+                 pivot_monthly.T.values,
+                 labels=[str(label) for label in pivot_monthly.columns],
+                 alpha=0.8)
+    ax.legend(loc='upper left')
+
+    return save_figure(fig, filename)
+
+
+def create_deaths_by_continent_chart(df_countries, latest_data=None):
+    """Create a bar chart showing average deaths per million by continent."""
+    # Get the latest data for each country unless it was already computed
+    if latest_data is None:
+        latest_data = get_latest_data_by_country(df_countries)
+    return draw_deaths_by_continent_chart(prepare_continent_deaths(latest_data))
+
+
+def create_cases_comparison_chart(df):
+    """Create a line chart comparing smoothed new cases between Europe and Asia."""
+    return draw_cases_comparison_chart(prepare_cases_pivot(df))
+
+
+def create_vaccination_scatter_plot(df_countries, latest_data=None):
+    """Create a scatter plot comparing vaccination rates vs. death rates."""
+    # Get the latest data for each country unless it was already computed
+    if latest_data is None:
+        latest_data = get_latest_data_by_country(df_countries)
+    return draw_vaccination_scatter_plot(prepare_vaccination_data(latest_data))
 
 
 def create_case_progression_area_chart(df_countries):
     """Create a stacked area chart for case progression by continent."""
-    # Group by continent and date, then sum new cases
-    continent_cases = df_countries.groupby(['continent', 'date'])['new_cases_smoothed'].sum().reset_index()
-    
-    if continent_cases.empty:
-        # Create empty chart if no data
-        plt.figure(figsize=(14, 8))
-        plt.title('COVID-19 Case Progression by Continent', fontsize=16)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Smoothed New Cases', fontsize=12)
-        plt.text(0.5, 0.5, 'No data available', horizontalalignment='center', verticalalignment='center', transform=plt.gca().transAxes)
-        plt.tight_layout()
-        plt.savefig('case_progression_by_continent.png')
-        plt.close()
-        return 'case_progression_by_continent.png'
-    
-    # Pivot the data
-    pivot_data = continent_cases.pivot(index='date', columns='continent', values='new_cases_smoothed').fillna(0)
-    
-    # Resample to monthly frequency for better visualization
-    pivot_monthly = pivot_data.resample('M').sum()
-    
-    plt.figure(figsize=(14, 8))
-    plt.stackplot(pivot_monthly.index, 
-                  pivot_monthly.T.values, 
-                  labels=pivot_monthly.columns,
-                  alpha=0.8)
-    
-    plt.title('COVID-19 Case Progression by Continent', fontsize=16)
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Smoothed New Cases', fontsize=12)
-    plt.legend(loc='upper left')
-    plt.tight_layout()
-    plt.savefig('case_progression_by_continent.png')
-    plt.close()
-    
-    return 'case_progression_by_continent.png'
-
-
-def main():
-    # Fetch and preprocess data
+    return draw_case_progression_area_chart(prepare_case_progression(ContinentDateCube(df_countries)))
+
+
+def build_pipeline():
+    """Declare every step of the enhanced charts with its inputs, so shared intermediates are computed once."""
+    return (Pipeline()
+            .add('raw', fetch_data)
+            .add('dataset', partition_data, ['raw'])
+            .add('countries', attrgetter('countries'), ['dataset'])
+            .add('aggregates', attrgetter('aggregates'), ['dataset'])
+            .add('latest_data', get_latest_data_by_country, ['countries'])
+            # Continent x date sums, built once for every time-series chart
+            .add('cube', ContinentDateCube, ['countries'])
+            .add('continent_deaths', prepare_continent_deaths, ['latest_data'])
+            .add('cases_pivot', prepare_cases_pivot, ['aggregates'])
+            .add('vaccination_data', prepare_vaccination_data, ['latest_data'])
+            .add('case_progression', prepare_case_progression, ['cube'])
+            # Charts render in worker processes, which only receive the small prepared inputs
+            .chart('deaths_chart', draw_deaths_by_continent_chart, ['continent_deaths'])
+            .chart('cases_chart', draw_cases_comparison_chart, ['cases_pivot'])
+            .chart('vaccination_chart', draw_vaccination_scatter_plot, ['vaccination_data'])
+            .chart('progression_chart', draw_case_progression_area_chart, ['case_progression']))
+
+
+CHARTS = build_pipeline().charts
+
+
+def main(processes=None, charts=None):
+    run = build_pipeline().start()
+
+    # Fetch data
     print("Fetching data...")
-    df = fetch_data()
-    
-    if not df.empty:
-        print("Preprocessing data...")
-        df_countries = preprocess_data(df)
-        
-        # Generate visualizations
-        print("Creating deaths by continent chart...")
-        deaths_chart = create_deaths_by_continent_chart(df_countries)
-        
-        print("Creating cases comparison chart...")
-        cases_chart = create_cases_comparison_chart(df)
-        
-        print("Creating vaccination scatter plot...")
-        vaccination_chart = create_vaccination_scatter_plot(df_countries)
-        
-        print("Creating case progression area chart...")
-        progression_chart = create_case_progression_area_chart(df_countries)
-        
+    if not run['raw'].empty:
+        # Only the steps the requested charts need run, each once
+        print("Preparing and rendering charts...")
+        created = run.compute(charts or CHARTS, processes)
+
         print(f"Visualizations created:")
-        print(f"  - {deaths_chart}")
-        print(f"  - {cases_chart}")
-        print(f"  - {vaccination_chart}")
-        print(f"  - {progression_chart}")
+        for chart in created.values():
+            print(f"  - {chart}")
     else:
         print("Could not load data to generate visualizations.")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the enhanced COVID-19 visualizations.")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Worker processes for rendering (1 renders in this process)")
+    parser.add_argument('--charts', nargs='+', choices=CHARTS, default=None,
+                        help="Charts to create (default: all)")
+    add_profiling_arguments(parser)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    with profile_run(args.profile, args.chrome_trace):
+        main(processes=args.processes, charts=args.charts)
@@ -0,0 +1,221 @@
+"""
+Module for incrementally maintaining the chart aggregates as new days arrive.
+
+Our World in Data mostly appends new dates to the existing file. Instead of
+recomputing everything, the state below remembers the last processed date per
+location and, on each run, only folds the newer rows into the stored latest
+row per country, the per-continent sums behind calculate_continent_deaths and
+the Europe/Asia pivot behind the cases chart. Revisions of already processed
+dates are not picked up; run with --verify to compare against a full recompute.
+
+Usage:
+    python incremental.py [--url URL] [--state PATH] [--verify]
+"""
+import argparse
+import os
+import pickle
+
+import pandas as pd
+
+from config import DATA_URL, INCREMENTAL_STATE_PATH, STREAM_CHUNKSIZE
+from data_fetcher import CovidDataset, fetch_covid_data, iter_covid_data
+from data_processor import calculate_continent_deaths, get_latest_data_by_country, pivot_continent_data
+
+PIVOT_LOCATIONS = ('Europe', 'Asia')
+
+
+class IncrementalAggregates:
+    """
+    Chart aggregates that can be updated with only the rows newer than those seen.
+    """
+
+    def __init__(self):
+        self.watermarks = {}
+        self.latest_data = pd.DataFrame()
+        self.continent_sums = pd.Series(dtype='float64')
+        self.continent_counts = pd.Series(dtype='int64')
+        self.df_pivot = pd.DataFrame()
+        self.rows_ingested = 0
+
+    @property
+    def continent_deaths(self):
+        """pandas.Series: Mean total_deaths_per_million per continent, as calculate_continent_deaths"""
+        # A continent whose countries all lack a value has a NaN mean, as with groupby().mean()
+        means = self.continent_sums / self.continent_counts.replace(0, float('nan'))
+        return means.sort_values(ascending=False).rename('total_deaths_per_million').rename_axis('continent')
+
+    def apply(self, chunk):
+        """
+        Fold the rows of a chunk that are newer than the last processed date of their location.
+
+        Parameters:
+        chunk (pandas.DataFrame): Raw COVID-19 rows; rows already processed are ignored
+
+        Returns:
+        int: Number of new rows ingested
+        """
+        delta = self.select_delta(chunk)
+        if delta.empty:
+            return 0
+        dataset = CovidDataset(delta)
+        self._update_latest(get_latest_data_by_country(dataset.countries))
+        self._update_pivot(dataset.continents(PIVOT_LOCATIONS))
+
+        newest = delta.groupby(delta['location'].astype(object))['date'].max()
+        self.watermarks.update(newest.to_dict())
+        self.rows_ingested += len(delta)
+        return len(delta)
+
+    def select_delta(self, chunk):
+        """
+        Get the rows of a chunk dated after the last processed date of their location.
+
+        Parameters:
+        chunk (pandas.DataFrame): Raw COVID-19 rows
+
+        Returns:
+        pandas.DataFrame: Rows not yet ingested
+        """
+        if chunk.empty:
+            return chunk
+        dates = pd.to_datetime(chunk['date'])
+        watermarks = pd.to_datetime(chunk['location'].astype(object).map(self.watermarks))
+        return chunk[watermarks.isna().to_numpy() | (dates > watermarks).to_numpy()]
+
+    def verify(self, df):
+        """
+        Compare the incremental aggregates with a full recompute over a complete dataset.
+
+        Parameters:
+        df (pandas.DataFrame): The complete raw COVID-19 data
+
+        Returns:
+        list: Descriptions of mismatches; empty when the results agree
+        """
+        dataset = CovidDataset(df)
+        expected_deaths = calculate_continent_deaths(get_latest_data_by_country(dataset.countries))
+        expected_pivot = pivot_continent_data(dataset.continents(PIVOT_LOCATIONS))
+
+        problems = []
+        checks = (
+            ('continent deaths', pd.testing.assert_series_equal, _by_label(self.continent_deaths),
+             _by_label(expected_deaths)),
+            ('Europe/Asia pivot', pd.testing.assert_frame_equal, _by_label(self.df_pivot),
+             _by_label(expected_pivot)),
+        )
+        for name, assert_equal, actual, expected in checks:
+            try:
+                assert_equal(actual, expected, check_dtype=False, check_names=False, rtol=1e-5)
+            except AssertionError as e:
+                problems.append(f"{name}: {e}")
+        return problems
+
+    def save(self, path=INCREMENTAL_STATE_PATH):
+        """Persist the state to a file."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path=INCREMENTAL_STATE_PATH):
+        """
+        Load a persisted state, or start an empty one if none exists.
+
+        Parameters:
+        path (str): Path of the state file
+
+        Returns:
+        IncrementalAggregates: The loaded state
+        """
+        if not os.path.exists(path):
+            return IncrementalAggregates()
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _update_latest(self, new_latest):
+        if new_latest.empty:
+            return
+        new_latest = new_latest.assign(location=new_latest['location'].astype(object),
+                                       continent=new_latest['continent'].astype(object))
+        if not self.latest_data.empty:
+            # Select by location: index labels are row positions of each run's file and repeat across runs
+            is_replaced = self.latest_data['location'].isin(new_latest['location'])
+            self._adjust_continent_sums(self.latest_data[is_replaced], sign=-1)
+            self.latest_data = pd.concat([self.latest_data[~is_replaced], new_latest], ignore_index=True)
+        else:
+            self.latest_data = new_latest.reset_index(drop=True)
+        self._adjust_continent_sums(new_latest, sign=1)
+
+    def _adjust_continent_sums(self, rows, sign):
+        values = rows['total_deaths_per_million'].astype('float64')
+        grouped = values.groupby(rows['continent'])
+        self.continent_sums = self.continent_sums.add(sign * grouped.sum(), fill_value=0)
+        self.continent_counts = self.continent_counts.add(sign * grouped.count(), fill_value=0).astype('int64')
+
+    def _update_pivot(self, df_continents):
+        if df_continents.empty:
+            return
+        new_rows = pivot_continent_data(df_continents)
+        new_rows.columns = new_rows.columns.astype(object)
+        self.df_pivot = new_rows.combine_first(self.df_pivot) if not self.df_pivot.empty else new_rows
+
+
+def _by_label(obj):
+    """Normalize categorical labels to plain strings for comparisons."""
+    obj = obj.copy()
+    obj.index = obj.index.astype(object)
+    if isinstance(obj, pd.DataFrame):
+        obj.columns = obj.columns.astype(object)
+        obj = obj[sorted(obj.columns)]
+    else:
+        obj = obj.sort_index()
+    return obj
+
+
+def ingest(url=DATA_URL, state=None, chunksize=STREAM_CHUNKSIZE):
+    """
+    Stream the source once and fold its new rows into the incremental state.
+
+    Parameters:
+    url (str): URL to the CSV file containing COVID-19 data
+    state (IncrementalAggregates): State to update; loaded from disk if None
+    chunksize (int): Number of rows per chunk
+
+    Returns:
+    IncrementalAggregates: The updated state
+    """
+    state = state if state is not None else IncrementalAggregates.load()
+    for chunk in iter_covid_data(url, chunksize):
+        state.apply(chunk)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=DATA_URL)
+    parser.add_argument('--state', default=INCREMENTAL_STATE_PATH)
+    parser.add_argument('--verify', action='store_true',
+                        help="Also run a full recompute and compare the results")
+    args = parser.parse_args()
+
+    state = IncrementalAggregates.load(args.state)
+    before = state.rows_ingested
+    state = ingest(args.url, state)
+    state.save(args.state)
+    print(f"Ingested {state.rows_ingested - before} new rows "
+          f"({len(state.watermarks)} locations, {len(state.df_pivot)} pivot dates).")
+
+    if args.verify:
+        problems = state.verify(fetch_covid_data(args.url, use_cache=False))
+        if problems:
+            print("Incremental and full results differ:")
+            for problem in problems:
+                print(f"  - {problem}")
+            raise SystemExit(1)
+        print("Incremental and full results match.")
+
+
+if __name__ == "__main__":
+    main()
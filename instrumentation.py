@@ -0,0 +1,351 @@
+"""
+Module for lightweight stage-level profiling of the visualization pipeline.
+
+Pipeline functions are wrapped with `traced`, and ad-hoc blocks can use
+`stage`. While no tracer is enabled, both reduce to a single context-variable
+lookup, so instrumentation can stay in place permanently. Enabling a tracer
+records, for every stage, its wall time, CPU time, peak traced memory and the
+number of rows it produced. The records can be exported as JSON or as a Chrome
+trace (chrome://tracing, Perfetto).
+
+The active tracer is held in a context variable, so concurrent dashboard
+sessions (one thread each) do not see each other's stages. Memory peaks are
+another matter: tracemalloc keeps a single process-wide peak, so a stage's
+peak is only reported when its tracer was the only one tracing memory for the
+whole stage; stages that overlapped another tracer get a peak_mb of None.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_active_tracer = contextvars.ContextVar('active_tracer', default=None)
+
+# tracemalloc is process-wide: tracers that overlap (one per dashboard session)
+# share it, and it is stopped only when the last of them exits
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+# Acquisitions so far; a stage during which the count changed overlapped another user
+_tracemalloc_acquisitions = 0
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned, _tracemalloc_acquisitions
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            # Tracing started by someone else is left running when the last tracer exits
+            _tracemalloc_owned = not tracemalloc.is_tracing()
+            if _tracemalloc_owned:
+                tracemalloc.start()
+        _tracemalloc_users += 1
+        _tracemalloc_acquisitions += 1
+
+
+def _tracemalloc_epoch():
+    """Get a token for _tracemalloc_exclusive, or None while tracemalloc has several users."""
+    with _tracemalloc_lock:
+        return _tracemalloc_acquisitions if _tracemalloc_users == 1 else None
+
+
+def _tracemalloc_exclusive(epoch):
+    """Tell whether tracemalloc kept a single user since _tracemalloc_epoch returned epoch."""
+    with _tracemalloc_lock:
+        return epoch is not None and _tracemalloc_users == 1 and _tracemalloc_acquisitions == epoch
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class _NullStage:
+    """Stage handle used while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.rows = None
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        self.tracer._enter(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer._exit(self)
+        return False
+
+
+class Tracer:
+    """
+    Collects stage records for one pipeline run.
+
+    Parameters:
+    trace_memory (bool): Track peak memory with tracemalloc (adds overhead while enabled);
+        peaks are only valid while one tracer at a time traces memory, see the module docstring
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+
+    def stage(self, name):
+        """
+        Create a context manager recording a stage.
+
+        Parameters:
+        name (str): Stage name
+
+        Returns:
+        context manager: Handle with a set_rows(n) method
+        """
+        return _Stage(self, name)
+
+    def _enter(self, stage):
+        if self.trace_memory:
+            stage.epoch = _tracemalloc_epoch()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # Fold the parent's peak so far before resetting it for the child
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            stage.base = stage.peak = current
+        stage.depth = len(self._stack)
+        self._stack.append(stage)
+        stage.wall = time.perf_counter()
+        stage.cpu = time.process_time()
+
+    def _exit(self, stage):
+        wall = time.perf_counter() - stage.wall
+        cpu = time.process_time() - stage.cpu
+        self._stack.pop()
+        record = {
+            'name': stage.name,
+            'start': stage.wall - self._origin,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'depth': stage.depth,
+            'rows': stage.rows,
+            'thread': threading.get_ident(),
+        }
+        if self.trace_memory:
+            stage.peak = max(stage.peak, tracemalloc.get_traced_memory()[1])
+            # Another tracer's reset_peak may have hidden part of this stage's peak
+            exclusive = _tracemalloc_exclusive(stage.epoch)
+            record['peak_mb'] = (stage.peak - stage.base) / 1e6 if exclusive else None
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, stage.peak)
+        self.records.append(record)
+
+    def summary(self):
+        """
+        Get the recorded stages in the order they started.
+
+        Returns:
+        list: One dict per stage
+        """
+        return sorted(self.records, key=lambda record: record['start'])
+
+    def export_json(self, path):
+        """Write the stage records as JSON."""
+        _write_json(path, {'stages': self.summary()})
+        return path
+
+    def export_chrome_trace(self, path):
+        """Write the stage records in the Chrome trace event format."""
+        _write_json(path, {'traceEvents': self.chrome_trace_events(), 'displayTimeUnit': 'ms'})
+        return path
+
+    def chrome_trace_events(self):
+        """
+        Convert the stage records to Chrome trace complete ('X') events.
+
+        Returns:
+        list: One event dict per stage, timestamps in microseconds
+        """
+        events = []
+        for record in self.summary():
+            args = {key: record[key] for key in ('cpu_seconds', 'rows', 'peak_mb') if record.get(key) is not None}
+            events.append({
+                'name': record['name'],
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall_seconds'] * 1e6,
+                'pid': os.getpid(),
+                'tid': record['thread'],
+                'args': args,
+            })
+        return events
+
+    def format_table(self):
+        """
+        Format the recorded stages as a plain-text table.
+
+        Returns:
+        str: One line per stage, indented by nesting depth
+        """
+        lines = []
+        for record in self.summary():
+            name = '  ' * record['depth'] + record['name']
+            line = f"{name:<40} wall={record['wall_seconds']:.3f}s cpu={record['cpu_seconds']:.3f}s"
+            if record.get('peak_mb') is not None:
+                line += f" peak={record['peak_mb']:.1f}MB"
+            if record['rows'] is not None:
+                line += f" rows={record['rows']}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        if self.trace_memory:
+            _acquire_tracemalloc()
+            self._started_tracemalloc = True
+        self._token = _active_tracer.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_tracer.reset(self._token)
+        if self._started_tracemalloc:
+            _release_tracemalloc()
+            self._started_tracemalloc = False
+        return False
+
+
+@contextlib.contextmanager
+def memory_tracing():
+    """
+    Trace memory for the enclosed block, sharing tracemalloc with any active tracers.
+
+    tracemalloc is only stopped afterwards if nothing else still uses it. As
+    with tracer stages, the peak is only known when nothing else traced memory
+    during the block.
+
+    Yields:
+    callable: Returns the peak traced bytes above the level at the start of
+        the block, or None when another tracer overlapped the block
+    """
+    _acquire_tracemalloc()
+    try:
+        epoch = _tracemalloc_epoch()
+        if epoch is not None and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+
+        def peak():
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            return traced_peak - base if _tracemalloc_exclusive(epoch) else None
+
+        yield peak
+    finally:
+        _release_tracemalloc()
+
+
+@contextlib.contextmanager
+def profile_run(json_path=None, chrome_trace_path=None):
+    """
+    Profile the enclosed block when an output path is given.
+
+    The stage table is printed at the end and the records are written to the
+    given paths. Without paths the block runs untraced.
+
+    Parameters:
+    json_path (str): Path for the JSON stage records
+    chrome_trace_path (str): Path for the Chrome trace
+
+    Yields:
+    Tracer: The active tracer, or None when profiling is off
+    """
+    if not (json_path or chrome_trace_path):
+        yield None
+        return
+    with Tracer() as tracer:
+        yield tracer
+    print(tracer.format_table())
+    if json_path:
+        print(f"Stage profile written to {tracer.export_json(json_path)}")
+    if chrome_trace_path:
+        print(f"Chrome trace written to {tracer.export_chrome_trace(chrome_trace_path)}")
+
+
+def add_profiling_arguments(parser):
+    """Add the --profile and --chrome-trace options to an argparse parser."""
+    parser.add_argument('--profile', metavar='PATH', help="Record stage timings and memory to a JSON file")
+    parser.add_argument('--chrome-trace', metavar='PATH', help="Record stages as a Chrome trace file")
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def stage(name):
+    """
+    Record a block as a stage of the active tracer, if any.
+
+    Parameters:
+    name (str): Stage name
+
+    Returns:
+    context manager: Handle with a set_rows(n) method
+    """
+    tracer = _active_tracer.get()
+    if tracer is None:
+        return _NULL_STAGE
+    return tracer.stage(name)
+
+
+def traced(name=None):
+    """
+    Decorate a function so each call is recorded as a stage of the active tracer.
+
+    The stage's row count is taken from the length of a returned DataFrame or Series.
+
+    Parameters:
+    name (str): Stage name; defaults to the function name
+
+    Returns:
+    callable: Decorator
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active_tracer.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.stage(stage_name) as handle:
+                result = func(*args, **kwargs)
+                if hasattr(result, 'shape'):
+                    handle.set_rows(result.shape[0])
+                return result
+        return wrapper
+    return decorator
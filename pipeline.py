@@ -0,0 +1,214 @@
+"""
+Module for running the visualization pipeline as a memoized dependency graph.
+
+Every step (fetching, partitioning, aggregating, each chart) is declared as a
+node naming the nodes it takes as inputs. A run computes only the nodes the
+requested outputs depend on, each at most once, so intermediates shared by
+several charts (such as the latest row per country) are built a single time.
+Chart nodes are rendered together through render_jobs, so they still run in
+parallel worker processes; their inputs are computed first in this process.
+
+Values known in advance can be supplied to a run instead of their nodes,
+e.g. data that was already loaded or filtered elsewhere.
+"""
+from collections import namedtuple
+from operator import attrgetter
+
+from data_fetcher import load_dataset
+from data_processor import calculate_continent_deaths, get_latest_data_by_country, pivot_continent_data
+from render_engine import ChartJob, render_jobs
+from visualizer import create_cases_comparison_chart, create_deaths_by_continent_chart
+
+Node = namedtuple('Node', ['name', 'func', 'inputs', 'chart'])
+
+
+class Pipeline:
+    """
+    Graph of named steps and the steps they depend on.
+
+    Nodes must be added after their inputs, so the graph cannot have cycles.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, name, func, inputs=()):
+        """
+        Declare a step computed in this process.
+
+        Parameters:
+        name (str): Node name
+        func (callable): Called with the values of the inputs, in order
+        inputs (sequence): Names of the nodes whose values func takes
+
+        Returns:
+        Pipeline: self, for chaining
+        """
+        return self._add(Node(name, func, tuple(inputs), False))
+
+    def chart(self, name, func, inputs=()):
+        """
+        Declare a chart, rendered in a worker process with the other requested charts.
+
+        Parameters:
+        name (str): Node name
+        func (callable): Module-level (picklable) chart function called with the input values
+        inputs (sequence): Names of the nodes whose values func takes
+
+        Returns:
+        Pipeline: self, for chaining
+        """
+        return self._add(Node(name, func, tuple(inputs), True))
+
+    def _add(self, node):
+        if node.name in self.nodes:
+            raise ValueError(f"Node {node.name!r} is already defined")
+        for dependency in node.inputs:
+            if dependency not in self.nodes:
+                raise ValueError(f"Node {node.name!r} depends on undefined node {dependency!r}")
+            if self.nodes[dependency].chart:
+                raise ValueError(f"Node {node.name!r} cannot depend on chart {dependency!r}")
+        self.nodes[node.name] = node
+        return self
+
+    @property
+    def charts(self):
+        """Names of the chart nodes, in declaration order."""
+        return [name for name, node in self.nodes.items() if node.chart]
+
+    def plan(self, targets, provided=()):
+        """
+        Get the nodes a set of outputs needs, in the order they run.
+
+        Parameters:
+        targets (sequence): Names of the requested nodes
+        provided (sequence): Names of nodes whose values are supplied, so their own inputs are not needed
+
+        Returns:
+        list: Node names in dependency (declaration) order
+        """
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.nodes:
+                raise KeyError(f"Unknown node {name!r}")
+            if name in needed:
+                continue
+            needed.add(name)
+            if name not in provided:
+                pending.extend(self.nodes[name].inputs)
+        return [name for name in self.nodes if name in needed]
+
+    def run(self, targets=None, values=None, processes=None):
+        """
+        Compute a set of outputs.
+
+        Parameters:
+        targets (sequence): Names of the requested nodes; None requests every chart
+        values (dict): Node name -> value supplied instead of computing the node
+        processes (int): Worker processes for rendering charts; None uses one per CPU
+            and 1 renders in this process
+
+        Returns:
+        dict: Node name -> value for every target
+        """
+        targets = self.charts if targets is None else list(targets)
+        run = PipelineRun(self, values)
+        return run.compute(targets, processes)
+
+    def start(self, values=None):
+        """
+        Begin a run whose values are computed on request and kept for its lifetime.
+
+        Parameters:
+        values (dict): Node name -> value supplied instead of computing the node
+
+        Returns:
+        PipelineRun: The run
+        """
+        return PipelineRun(self, values)
+
+
+class PipelineRun:
+    """
+    One execution of a Pipeline, memoizing every value it computes.
+
+    Parameters:
+    pipeline (Pipeline): Graph to execute
+    values (dict): Node name -> value supplied instead of computing the node
+    """
+
+    def __init__(self, pipeline, values=None):
+        self.pipeline = pipeline
+        self.values = dict(values or {})
+        # Nodes executed by this run, in order
+        self.executed = []
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        if self.pipeline.nodes[name].chart:
+            return self.compute([name])[name]
+        for step in self.pipeline.plan([name], self.values):
+            if step not in self.values:
+                node = self.pipeline.nodes[step]
+                self.values[step] = node.func(*(self.values[dependency] for dependency in node.inputs))
+                self.executed.append(step)
+        return self.values[name]
+
+    def compute(self, targets, processes=None):
+        """
+        Compute a set of outputs, rendering the requested charts in parallel.
+
+        Parameters:
+        targets (sequence): Names of the requested nodes
+        processes (int): Worker processes for rendering charts; None uses one per CPU
+            and 1 renders in this process
+
+        Returns:
+        dict: Node name -> value for every target
+        """
+        nodes = self.pipeline.nodes
+        charts = [name for name in targets if nodes[name].chart and name not in self.values]
+        for name in self.pipeline.plan(targets, self.values):
+            if not nodes[name].chart:
+                self[name]
+        if charts:
+            jobs = [ChartJob(nodes[name].func, tuple(self.values[dependency] for dependency in nodes[name].inputs))
+                    for name in charts]
+            self.values.update(zip(charts, render_jobs(jobs, processes)))
+            self.executed.extend(charts)
+        return {name: self.values[name] for name in targets}
+
+
+def build_covid_pipeline(engine=None):
+    """
+    Build the pipeline of the standard visualizations.
+
+    Nodes: dataset, countries, continents, latest_data, continent_deaths,
+    cases_pivot and the charts deaths_chart and cases_chart.
+
+    Parameters:
+    engine (query_backend.QueryBackend): Query engine answering latest_data,
+        continent_deaths and cases_pivot straight from the data file; None computes
+        them in pandas
+
+    Returns:
+    Pipeline: The graph
+    """
+    pipeline = (Pipeline()
+                .add('dataset', load_dataset)
+                .add('countries', attrgetter('countries'), ['dataset'])
+                .add('continents', lambda dataset: dataset.continents(), ['dataset']))
+    if engine is None:
+        pipeline.add('latest_data', get_latest_data_by_country, ['countries'])
+        pipeline.add('continent_deaths', calculate_continent_deaths, ['latest_data'])
+        pipeline.add('cases_pivot', pivot_continent_data, ['continents'])
+    else:
+        pipeline.add('latest_data', engine.latest_by_country)
+        pipeline.add('continent_deaths', engine.continent_means)
+        pipeline.add('cases_pivot', engine.continent_pivot)
+    return (pipeline
+            .chart('deaths_chart', create_deaths_by_continent_chart, ['continent_deaths'])
+            .chart('cases_chart', create_cases_comparison_chart, ['cases_pivot']))
@@ -0,0 +1,260 @@
+"""
+Module for running the pipeline's filters and aggregations in an embedded query engine.
+
+Instead of loading the whole dataset into pandas and filtering it there, the
+queries run directly over the Parquet snapshot (or a CSV file) in an embedded
+analytical engine. The engine reads only the columns a query uses (projection
+pushdown) and skips row groups its filters rule out (predicate pushdown), and
+it groups and aggregates on all cores. Results are returned as the same pandas
+objects the pandas pipeline produces, so they can be charted unchanged.
+
+Backends:
+
+- 'arrow': pyarrow datasets and the Acero execution engine
+- 'duckdb': DuckDB SQL (optional dependency: pip install duckdb)
+
+The 'pandas' choice of QUERY_BACKEND keeps the in-memory pandas pipeline.
+"""
+import os
+import re
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from config import DATA_URL, QUERY_THREADS
+from instrumentation import traced
+from schema import COVID_SCHEMA, read_csv_options
+from snapshot_cache import get_default_cache
+
+BACKENDS = ('pandas', 'arrow', 'duckdb')
+
+# Columns the latest-per-country query returns by default
+LATEST_COLUMNS = ['location', 'continent', 'date', 'total_deaths_per_million']
+
+
+class QueryBackend(ABC):
+    """
+    Queries of the visualization pipeline over a Parquet or CSV file.
+
+    Parameters:
+    source (str): Path of a Parquet snapshot or CSV file
+    threads (int): Worker threads of the engine; None uses every core (see config.QUERY_THREADS)
+    """
+
+    def __init__(self, source, threads=QUERY_THREADS):
+        self.source = source
+        self.threads = threads
+        self.format = 'parquet' if source.endswith('.parquet') else 'csv'
+
+    @abstractmethod
+    def latest_by_country(self, columns=LATEST_COLUMNS):
+        """
+        Get the latest row of each country (rows with a continent).
+
+        Parameters:
+        columns (list): Columns to read and return; None reads all of them
+
+        Returns:
+        pandas.DataFrame: One row per location, ordered by location
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def continent_means(self, column='total_deaths_per_million'):
+        """
+        Get the mean of a column over the latest row of each country, by continent.
+
+        Parameters:
+        column (str): Column to average
+
+        Returns:
+        pandas.Series: Means indexed by continent, sorted in descending order
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def continent_pivot(self, locations=('Europe', 'Asia'), values='new_cases_smoothed'):
+        """
+        Get a metric of continent aggregate rows by date, one column per continent.
+
+        Parameters:
+        locations (sequence): Continent names to select
+        values (str): Column to pivot
+
+        Returns:
+        pandas.DataFrame: Values with dates as index and continents as columns
+        """
+        raise NotImplementedError
+
+
+def _with_keys(columns, *keys):
+    """Add the key columns a query needs to a projection, keeping its order."""
+    return list(columns) + [key for key in keys if key not in columns]
+
+
+def _finish_latest(df, columns):
+    # Equal latest dates of one location are resolved like idxmax: the first row wins
+    df = df.drop_duplicates('location').sort_values('location', kind='stable').reset_index(drop=True)
+    return df[list(columns)] if columns is not None else df
+
+
+def _finish_means(means, column):
+    means = means.set_index('continent')[column].sort_values(ascending=False)
+    means.index.name = 'continent'
+    return means
+
+
+def _finish_pivot(rows, values):
+    if rows.empty:
+        return pd.DataFrame()
+    return rows.pivot(index='date', columns='location', values=values)
+
+
+class ArrowBackend(QueryBackend):
+    """
+    Queries run by pyarrow's dataset scanner and Acero engine.
+
+    Arrow only takes a per-call on/off switch for threading: threads=1 runs the
+    queries single-threaded, any other value uses Arrow's shared CPU pool.
+    """
+
+    def __init__(self, source, threads=QUERY_THREADS):
+        super().__init__(source, threads)
+        import pyarrow.dataset as ds
+
+        self._use_threads = threads != 1
+        self._dataset = ds.dataset(source, format=self.format)
+
+    def _scan(self, columns, predicate):
+        return self._dataset.to_table(columns=columns, filter=predicate, use_threads=self._use_threads)
+
+    def _latest_table(self, columns):
+        import pyarrow.compute as pc
+
+        columns = self._dataset.schema.names if columns is None else _with_keys(columns, 'location', 'date')
+        rows = self._scan(columns, pc.field('continent').is_valid() & pc.field('date').is_valid())
+        latest_dates = (rows.group_by('location', use_threads=self._use_threads)
+                        .aggregate([('date', 'max')]).rename_columns(['location', 'date']))
+        # Keep the rows that match their location's latest date
+        return rows.join(latest_dates, keys=['location', 'date'], join_type='left semi',
+                         use_threads=self._use_threads)
+
+    @traced('query_latest_by_country')
+    def latest_by_country(self, columns=LATEST_COLUMNS):
+        return _finish_latest(self._latest_table(columns).to_pandas(), columns)
+
+    @traced('query_continent_means')
+    def continent_means(self, column='total_deaths_per_million'):
+        import pyarrow.compute as pc
+
+        latest = self._latest_table(['location', 'continent', column])
+        # Equal latest dates of one location keep the first row, as _finish_latest; ordered
+        # aggregations only run single-threaded
+        first = pc.ScalarAggregateOptions(skip_nulls=False)
+        per_country = (latest.group_by(['location', 'continent'], use_threads=False)
+                       .aggregate([(column, 'first', first)]).rename_columns(['location', 'continent', column]))
+        means = (per_country.group_by('continent', use_threads=self._use_threads)
+                 .aggregate([(column, 'mean')]).rename_columns(['continent', column]))
+        return _finish_means(means.to_pandas(), column)
+
+    @traced('query_continent_pivot')
+    def continent_pivot(self, locations=('Europe', 'Asia'), values='new_cases_smoothed'):
+        import pyarrow.compute as pc
+
+        predicate = pc.field('continent').is_null() & pc.field('location').isin(list(locations))
+        return _finish_pivot(self._scan(['date', 'location', values], predicate).to_pandas(), values)
+
+
+class DuckDBBackend(QueryBackend):
+    """Queries run as DuckDB SQL; requires the duckdb package."""
+
+    def __init__(self, source, threads=QUERY_THREADS):
+        super().__init__(source, threads)
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("The 'duckdb' query backend needs the duckdb package (pip install duckdb)") from e
+        self._connection = duckdb.connect()
+        if threads:
+            self._connection.execute(f"SET threads = {int(threads)}")
+        reader = 'read_parquet' if self.format == 'parquet' else 'read_csv_auto'
+        self._relation = f"{reader}({_sql_string(source)})"
+
+    def _query(self, sql, parameters=()):
+        return self._connection.execute(sql, list(parameters)).df()
+
+    def _latest_sql(self, columns):
+        projection = '*' if columns is None else ', '.join(_sql_name(c) for c in _with_keys(columns, 'location'))
+        return (f"SELECT {projection} FROM {self._relation} "
+                f"WHERE continent IS NOT NULL AND date IS NOT NULL "
+                f"QUALIFY row_number() OVER (PARTITION BY location ORDER BY date DESC) = 1")
+
+    @traced('query_latest_by_country')
+    def latest_by_country(self, columns=LATEST_COLUMNS):
+        return _finish_latest(self._query(self._latest_sql(columns)), columns)
+
+    @traced('query_continent_means')
+    def continent_means(self, column='total_deaths_per_million'):
+        name = _sql_name(column)
+        latest = self._latest_sql(['location', 'continent', column])
+        means = self._query(f"SELECT continent, avg({name}) AS {name} FROM ({latest}) GROUP BY continent")
+        return _finish_means(means, column)
+
+    @traced('query_continent_pivot')
+    def continent_pivot(self, locations=('Europe', 'Asia'), values='new_cases_smoothed'):
+        placeholders = ', '.join('?' for _ in locations)
+        rows = self._query(f"SELECT date, location, {_sql_name(values)} FROM {self._relation} "
+                           f"WHERE continent IS NULL AND location IN ({placeholders})", locations)
+        return _finish_pivot(rows, values)
+
+
+def _sql_name(name):
+    if not re.fullmatch(r'\w+', name):
+        raise ValueError(f"Invalid column name {name!r}")
+    return f'"{name}"'
+
+
+def _sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def resolve_source(url=DATA_URL, use_cache=True, schema=COVID_SCHEMA):
+    """
+    Get the file a query backend should scan for a data source.
+
+    Parameters:
+    url (str): URL or path of the CSV source
+    use_cache (bool): Scan the (refreshed) Parquet snapshot of the source instead of the CSV
+    schema (dict): Schema of the snapshot, as used by fetch_covid_data
+
+    Returns:
+    str: Path of a Parquet snapshot or local CSV file
+    """
+    if use_cache:
+        path = get_default_cache().snapshot_path(url, read_csv_options(schema) if schema else {})
+        if path is not None:
+            return path
+    if os.path.exists(url):
+        return url
+    raise ValueError(f"{url} is neither cached as a snapshot nor a local file")
+
+
+def get_backend(name, source=None, threads=QUERY_THREADS):
+    """
+    Create a query backend.
+
+    Parameters:
+    name (str): 'arrow' or 'duckdb'
+    source (str): File to scan; None scans the snapshot of DATA_URL
+    threads (int): Worker threads of the engine; None uses every core
+
+    Returns:
+    QueryBackend: The backend
+
+    Raises:
+    ImportError: If the backend's engine is not installed
+    """
+    backends = {'arrow': ArrowBackend, 'duckdb': DuckDBBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown query backend {name!r}; expected one of {list(backends)}")
+    return backends[name](source or resolve_source(), threads)
@@ -0,0 +1,522 @@
+"""
+Module for serving the pipeline's aggregates as a read-only HTTP/JSON service.
+
+One asyncio process keeps the processed dataset resident: the partitioned
+CovidDataset, its LocationDateIndex and the latest row of every country are
+built once per snapshot, so a query is answered from memory instead of
+re-running the pipeline. The encoded body of every distinct query is kept in
+an LRU cache, so a repeated query is a dictionary lookup. Each response
+carries an ETag derived from its body; a client that sends it back in
+If-None-Match gets 304 Not Modified without a body.
+
+The source is checked every SERVICE_RELOAD_INTERVAL seconds. When a new
+snapshot lands (the local file changed, or the snapshot cache picked up a new
+version of the URL) the state is rebuilt in a worker thread and swapped in at
+once; requests are served from the previous snapshot in the meantime.
+
+Endpoints (GET or HEAD):
+
+- /health: snapshot version, load time, row counts and cache statistics
+- /latest?location=France&columns=date,total_cases&date=2021-06-30: latest row
+  of each country (optionally as of a date)
+- /continents?column=total_deaths_per_million&statistic=mean: a statistic of
+  the latest country values by continent (see compute_continent_statistics)
+- /series?location=Europe&location=Asia&values=new_cases_smoothed: a metric of
+  continent aggregate rows by date
+
+Usage:
+    python query_service.py [--source URL] [--host HOST] [--port PORT] [--reload SECONDS] [--no-cache]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import urllib.parse
+from collections import namedtuple
+from http import HTTPStatus
+
+from config import (DATA_URL, SERVICE_CACHE_SIZE, SERVICE_HOST, SERVICE_KEEPALIVE_TIMEOUT, SERVICE_PORT,
+                    SERVICE_RELOAD_INTERVAL, USE_SNAPSHOT_CACHE)
+from dashboard_state import LRUCache
+from data_fetcher import CovidDataset, fetch_covid_data
+from data_processor import LocationDateIndex, compute_continent_statistics, pivot_continent_data
+from instrumentation import traced
+from schema import COVID_SCHEMA, read_csv_options
+from snapshot_cache import get_default_cache
+
+MAX_HEADERS = 100
+
+Response = namedtuple('Response', ['status', 'body', 'etag'])
+Response.__new__.__defaults__ = (None,)
+
+
+class QueryError(Exception):
+    """
+    A request that cannot be answered.
+
+    Parameters:
+    status (int): HTTP status of the error response
+    message (str): Description sent to the client
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceState:
+    """
+    Processed dataset and indexes of one snapshot; read-only once built.
+
+    Parameters:
+    df (pandas.DataFrame): Raw COVID-19 data of the snapshot
+    version (str): Identifier of the snapshot
+    """
+
+    @traced('build_service_state')
+    def __init__(self, df, version):
+        self.version = version
+        self.loaded_at = time.time()
+        self.dataset = CovidDataset(df)
+        self.index = LocationDateIndex(self.dataset.countries)
+        self.latest = self.index.latest()
+
+    def latest_by_country(self, locations=None, columns=None, date=None):
+        """
+        Get the latest row of each country.
+
+        Parameters:
+        locations (list): Countries to return; None returns all of them
+        columns (list): Columns to return; None returns all of them
+        date (str): Cut-off date (inclusive); None uses each country's last row
+
+        Returns:
+        pandas.DataFrame: One row per country
+        """
+        latest = self.latest if date is None else self.index.as_of(date)
+        if locations:
+            latest = latest[latest['location'].isin(locations)]
+        if columns:
+            latest = latest[_with_location(columns)]
+        return latest
+
+    def continent_statistic(self, column='total_deaths_per_million', statistic='mean'):
+        """
+        Get a statistic of the latest country values of a column, by continent.
+
+        Returns:
+        pandas.Series: Values indexed by continent, in descending order
+        """
+        values = compute_continent_statistics(self.latest, [(column, statistic)])[(column, statistic)]
+        return values.rename(column).sort_values(ascending=False)
+
+    def continent_series(self, locations=('Europe', 'Asia'), values='new_cases_smoothed'):
+        """
+        Get a metric of continent aggregate rows by date, one column per continent.
+
+        Returns:
+        pandas.DataFrame: Values with dates as index and continents as columns
+        """
+        return pivot_continent_data(self.dataset.continents(locations), values)
+
+
+def _with_location(columns):
+    return (['location'] if 'location' not in columns else []) + list(columns)
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _list_param(params, name, sep=','):
+    """Collect a parameter given repeatedly (?x=a&x=b) or, unless sep is None, separated (?x=a,b)."""
+    values = params.get(name, [])
+    return [item for value in values for item in value.split(sep) if item] if sep else values
+
+
+def _check_columns(state, columns):
+    unknown = [column for column in columns if column not in state.dataset.frame.columns]
+    if unknown:
+        raise QueryError(HTTPStatus.BAD_REQUEST, f"Unknown columns: {', '.join(unknown)}")
+
+
+def _latest_endpoint(state, params):
+    columns = _list_param(params, 'columns')
+    _check_columns(state, columns)
+    date = _param(params, 'date')
+    try:
+        latest = state.latest_by_country(_list_param(params, 'location', None), columns, date)
+    except ValueError:
+        raise QueryError(HTTPStatus.BAD_REQUEST, f"Invalid date {date!r}") from None
+    return latest.to_json(orient='records', date_format='iso')
+
+
+def _continents_endpoint(state, params):
+    column = _param(params, 'column', 'total_deaths_per_million')
+    _check_columns(state, [column])
+    try:
+        values = state.continent_statistic(column, _param(params, 'statistic', 'mean'))
+    except ValueError as e:
+        raise QueryError(HTTPStatus.BAD_REQUEST, str(e)) from None
+    return values.to_json(orient='index')
+
+
+def _series_endpoint(state, params):
+    values = _param(params, 'values', 'new_cases_smoothed')
+    _check_columns(state, [values])
+    series = state.continent_series(_list_param(params, 'location', None) or ('Europe', 'Asia'), values)
+    return series.to_json(orient='split', date_format='iso')
+
+
+ENDPOINTS = {
+    '/latest': _latest_endpoint,
+    '/continents': _continents_endpoint,
+    '/series': _series_endpoint,
+}
+
+
+def _json_response(status, payload):
+    return Response(status, json.dumps(payload).encode('utf-8'))
+
+
+def _etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class QueryService:
+    """
+    Resident dataset and response cache behind the HTTP endpoints.
+
+    Parameters:
+    source (str): URL or path of the CSV source
+    use_cache (bool): Read the source through the on-disk snapshot cache
+    reload_interval (float): Seconds between checks for a new snapshot; None disables hot-reload
+    cache_size (int): Encoded responses kept
+    schema (dict): Columns to load and their dtypes, as used by fetch_covid_data
+    """
+
+    def __init__(self, source=DATA_URL, use_cache=USE_SNAPSHOT_CACHE, reload_interval=SERVICE_RELOAD_INTERVAL,
+                 cache_size=SERVICE_CACHE_SIZE, schema=COVID_SCHEMA):
+        self.source = source
+        self.use_cache = use_cache
+        self.reload_interval = reload_interval
+        self.schema = schema
+        self.responses = LRUCache(cache_size)
+        self.state = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'reloads': 0}
+        self._signature = None
+        self._watcher = None
+        self._pending = {}
+        self._reload_lock = asyncio.Lock()
+
+    def source_signature(self):
+        """
+        Identify the current snapshot of the source without reading it.
+
+        With the snapshot cache this refreshes the cached snapshot first (a
+        conditional request for HTTP sources).
+
+        Returns:
+        str: Modification time and size of the snapshot file, or None when it
+            cannot be determined (uncached HTTP sources are never reloaded)
+        """
+        if self.use_cache:
+            path = get_default_cache().snapshot_path(self.source, read_csv_options(self.schema) if self.schema else {})
+        else:
+            path = self.source if os.path.exists(self.source) else None
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def load(self, signature=None):
+        """
+        Load the source and build the state of its snapshot.
+
+        Parameters:
+        signature (str): Signature of the snapshot, from source_signature
+
+        Returns:
+        ServiceState: The new state
+
+        Raises:
+        RuntimeError: If the source could not be loaded
+        """
+        df = fetch_covid_data(self.source, use_cache=self.use_cache, schema=self.schema)
+        if df.empty:
+            raise RuntimeError(f"Could not load {self.source}")
+        version = signature or f"{time.time_ns():x}"
+        return ServiceState(df, version)
+
+    async def reload(self):
+        """
+        Rebuild the state if the source has a new snapshot.
+
+        The check and the rebuild run in worker threads; the event loop keeps
+        answering from the current state until the new one is swapped in.
+
+        Returns:
+        bool: True if a new snapshot was loaded
+        """
+        async with self._reload_lock:
+            signature = await asyncio.to_thread(self.source_signature)
+            if self.state is not None and (signature is None or signature == self._signature):
+                return False
+            state = await asyncio.to_thread(self.load, signature)
+            self.state, self._signature = state, signature
+            self.responses.clear()
+            self.stats['reloads'] += 1
+            return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                # Keep serving the current snapshot; the next check retries
+                print(f"Reload of {self.source} failed: {e}")
+
+    async def respond(self, target, if_none_match=None):
+        """
+        Answer a GET request.
+
+        Cached responses are returned from the event loop; on a miss the query
+        and its JSON encoding run in a worker thread, so a slow query does not
+        hold up the other connections. Concurrent misses of one query share a
+        single computation.
+
+        Parameters:
+        target (str): Request target (path and query string)
+        if_none_match (str): Value of the If-None-Match header
+
+        Returns:
+        Response: Status, JSON body and ETag
+        """
+        self.stats['requests'] += 1
+        url = urllib.parse.urlsplit(target)
+        if url.path == '/health':
+            return _json_response(HTTPStatus.OK, self.health())
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return _json_response(HTTPStatus.NOT_FOUND, {'error': f"No endpoint {url.path}"})
+        if self.state is None:
+            return _json_response(HTTPStatus.SERVICE_UNAVAILABLE, {'error': "No snapshot loaded yet"})
+
+        params = urllib.parse.parse_qs(url.query)
+        state = self.state
+        # The snapshot version keeps a query that finishes after a reload from being cached for the new snapshot
+        key = (state.version, url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        try:
+            if key in self.responses:
+                response = self.responses.get_or_compute(key, None)
+            else:
+                response = await self._render_once(key, endpoint, state, params)
+        except QueryError as e:
+            return _json_response(e.status, {'error': str(e)})
+        except Exception as e:
+            return _json_response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"})
+        if if_none_match is not None and response.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.stats['not_modified'] += 1
+            return Response(HTTPStatus.NOT_MODIFIED, b'', response.etag)
+        return response
+
+    async def _render_once(self, key, endpoint, state, params):
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(
+                asyncio.to_thread(self._render, endpoint, state, params))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        response = await asyncio.shield(pending)
+        return self.responses.get_or_compute(key, lambda: response)
+
+    @staticmethod
+    def _render(endpoint, state, params):
+        body = endpoint(state, params).encode('utf-8')
+        return Response(HTTPStatus.OK, body, _etag(body))
+
+    def health(self):
+        """Describe the loaded snapshot and the cache statistics."""
+        state = self.state
+        return {
+            'source': self.source,
+            'version': state.version if state else None,
+            'loaded_at': state.loaded_at if state else None,
+            'countries': len(state.latest) if state else 0,
+            'rows': len(state.dataset.frame) if state else 0,
+            'cache': {'entries': len(self.responses), 'hits': self.responses.hits, 'misses': self.responses.misses},
+            **self.stats,
+        }
+
+    async def handle_connection(self, reader, writer):
+        """Serve the requests of one (keep-alive) connection."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), SERVICE_KEEPALIVE_TIMEOUT)
+                except QueryError as e:
+                    writer.write(_encode(_json_response(e.status, {'error': str(e)}), keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                if method in ('GET', 'HEAD'):
+                    response = await self.respond(target, headers.get('if-none-match'))
+                else:
+                    response = _json_response(HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} is not supported"})
+                writer.write(_encode(response, keep_alive, head=method == 'HEAD'))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        """
+        Load the first snapshot and start listening.
+
+        Parameters:
+        host (str): Interface to bind
+        port (int): Port to bind; 0 picks a free one
+
+        Returns:
+        asyncio.Server: The listening server (see its sockets for the bound port)
+        """
+        await self.reload()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if self.reload_interval:
+            self._watcher = asyncio.create_task(self._watch())
+        return server
+
+
+async def _read_request(reader):
+    """Read a request line and headers; None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise QueryError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise QueryError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'transfer-encoding' in headers:
+        raise QueryError(HTTPStatus.NOT_IMPLEMENTED, "Request bodies are not supported")
+    length = int(headers.get('content-length') or 0)
+    if length:
+        # Discard a body so the next request on the connection starts at the right place
+        await reader.readexactly(length)
+    return method, target, version, headers
+
+
+def _encode(response, keep_alive, head=False):
+    status = HTTPStatus(response.status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+             "Content-Type: application/json",
+             f"Content-Length: {len(response.body)}",
+             "Cache-Control: no-cache",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if response.etag:
+        lines.append(f"ETag: {response.etag}")
+    head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head_bytes if head or status == HTTPStatus.NOT_MODIFIED else head_bytes + response.body
+
+
+class ServiceClient:
+    """
+    Minimal keep-alive HTTP/1.1 client for the service, used by tests and the load test.
+
+    Parameters:
+    host (str): Host of the service
+    port (int): Port of the service
+    """
+
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def get(self, target, headers=None):
+        """
+        Send a GET request over the connection, opening it if needed.
+
+        Returns:
+        tuple: (status, headers with lower-case names, body bytes)
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        self._writer.write(f"GET {target} HTTP/1.1\r\nHost: {self.host}\r\n{extra}\r\n".encode('latin-1'))
+        await self._writer.drain()
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the service")
+        response_headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        status = int(status_line.split()[1])
+        body = b''
+        if status != HTTPStatus.NOT_MODIFIED:
+            body = await self._reader.readexactly(int(response_headers.get('content-length', 0)))
+        if response_headers.get('connection') == 'close':
+            await self.close()
+        return status, response_headers, body
+
+    async def close(self):
+        """Close the connection."""
+        if self._writer is not None:
+            writer, self._reader, self._writer = self._writer, None, None
+            writer.close()
+            await writer.wait_closed()
+
+
+async def serve(service, host=SERVICE_HOST, port=SERVICE_PORT):
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving {service.source} (snapshot {service.state.version}) on http://{address[0]}:{address[1]}",
+          flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default=DATA_URL, help="URL or path of the CSV source")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--reload', type=float, default=SERVICE_RELOAD_INTERVAL,
+                        help="Seconds between checks for a new snapshot; 0 disables hot-reload")
+    parser.add_argument('--no-cache', action='store_true', help="Read the source directly, not through the snapshot cache")
+    args = parser.parse_args()
+
+    service = QueryService(args.source, use_cache=not args.no_cache, reload_interval=args.reload or None)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Module for caching rendered chart files by the content of their inputs.
+
+A chart is keyed on a hash of its input data, its style configuration, the
+drawing code (including the helper modules it draws with), the config values
+those modules read and Matplotlib's rcParams. When a chart with
+the same key was rendered before, the stored artifact is copied to the
+requested path instead of drawing it again; a copy rather than a hard link, so
+editing an output file cannot change the cached artifact. The artifact
+directory is bounded in size; the least recently used artifacts are evicted
+first.
+"""
+import functools
+import hashlib
+import importlib.util
+import inspect
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+import config
+from config import CHART_COLORS, CHART_SIZES, RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, RENDER_CACHE_ENABLED
+
+# Modules whose code shapes every cached chart; a change to any of them invalidates the cache
+RENDER_MODULES = ('render_engine', 'downsampling', 'render_cache')
+
+
+def hash_value(value, digest=None):
+    """
+    Hash chart input data into a digest.
+
+    Parameters:
+    value (object): pandas object, or any value with a stable repr
+    digest (hashlib object): Digest to update; a new SHA-256 digest if None
+
+    Returns:
+    hashlib object: The updated digest
+    """
+    digest = digest or hashlib.sha256()
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        digest.update(repr(value.index.dtype).encode('utf-8'))
+        digest.update(repr(value.index.name).encode('utf-8'))
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr([(str(col), str(dtype)) for col, dtype in value.dtypes.items()]).encode('utf-8'))
+        else:
+            digest.update(repr((value.name, str(value.dtype))).encode('utf-8'))
+    else:
+        digest.update(repr(value).encode('utf-8'))
+    return digest
+
+
+class RenderCache:
+    """
+    Size-bounded store of rendered chart artifacts keyed by content hash.
+
+    Parameters:
+    directory (str): Directory holding the artifacts
+    max_bytes (int): Total artifact size above which old artifacts are evicted
+    """
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def render(self, key, filename, draw):
+        """
+        Produce `filename` from the cached artifact for `key`, drawing it only on a miss.
+
+        Parameters:
+        key (str): Content hash of the chart
+        filename (str): Path the chart should be available at
+        draw (callable): Function drawing the chart to the path it is given
+
+        Returns:
+        str: filename
+        """
+        # Without an extension Matplotlib saves in rcParams['savefig.format'], so the artifact does too
+        extension = os.path.splitext(filename)[1] or f".{_matplotlib_rc()['savefig.format']}"
+        artifact = os.path.join(self.directory, key + extension)
+        if os.path.exists(artifact):
+            self.stats['hits'] += 1
+            os.utime(artifact)
+            _place(artifact, filename)
+            return filename
+
+        self.stats['misses'] += 1
+        os.makedirs(self.directory, exist_ok=True)
+        root, ext = os.path.splitext(artifact)
+        tmp = f"{root}.{os.getpid()}.tmp{ext}"
+        try:
+            draw(tmp)
+            os.replace(tmp, artifact)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _place(artifact, filename)
+        self.evict()
+        return filename
+
+    def evict(self):
+        """Remove the least recently used artifacts until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if '.tmp' not in name and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.stats['evictions'] += 1
+
+
+def _place(artifact, filename):
+    """Copy the artifact to filename; the output never shares storage with the cache."""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    shutil.copyfile(artifact, tmp)
+    os.replace(tmp, filename)
+
+
+_UNSET = object()
+_default_cache = _UNSET
+
+
+def get_render_cache():
+    """
+    Get the process-wide render cache.
+
+    Returns:
+    RenderCache: The shared cache instance, or None when caching is disabled
+    """
+    global _default_cache
+    if _default_cache is _UNSET:
+        _default_cache = RenderCache() if RENDER_CACHE_ENABLED else None
+    return _default_cache
+
+
+def set_render_cache(cache):
+    """
+    Replace the process-wide render cache.
+
+    Parameters:
+    cache (RenderCache): Cache to use, or None to disable caching
+    """
+    global _default_cache
+    _default_cache = cache
+
+
+def _code_fingerprint(code):
+    """Describe a code object without the memory addresses in nested code reprs."""
+    consts = tuple(_code_fingerprint(c) if inspect.iscode(c) else c for c in code.co_consts)
+    return code.co_code, consts, code.co_names
+
+
+@functools.lru_cache(maxsize=None)
+def _module_fingerprint(name):
+    """Hash the source file of a module, so any edit to it (including helpers the chart calls) changes the key."""
+    module = sys.modules.get(name)
+    path = getattr(module, '__file__', None) if module is not None else None
+    if path is None:
+        spec = importlib.util.find_spec(name)
+        path = spec.origin if spec is not None else None
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _module_settings(name):
+    """Get the config values a module imported, as they stand in that module."""
+    module = sys.modules.get(name)
+    if module is None:
+        return None
+    return tuple(sorted((key, repr(value)) for key, value in vars(module).items()
+                        if key.isupper() and hasattr(config, key)))
+
+
+def _matplotlib_rc():
+    """Get Matplotlib's current rcParams, without resolving the backend."""
+    import matplotlib
+
+    # Reading 'backend' through rcParams would resolve (and import) a backend; it does not affect saved files
+    return {key: value for key, value in dict.items(matplotlib.rcParams) if key != 'backend'}
+
+
+def _matplotlib_fingerprint():
+    """Describe the Matplotlib version and rcParams a chart is drawn with."""
+    import matplotlib
+
+    return matplotlib.__version__, sorted(_matplotlib_rc().items())
+
+
+def cached_render(chart):
+    """
+    Decorate a chart function so identical inputs reuse the previously rendered file.
+
+    The key covers every argument except `filename`, the CHART_COLORS and
+    CHART_SIZES entries of `chart`, the bytecode of the chart function, the
+    source of its module and of RENDER_MODULES, which hold the helpers charts
+    are drawn with, the config values those modules imported, and the
+    Matplotlib version and rcParams.
+    Calls whose filename is not a path are rendered without the cache, as are
+    all calls while caching is disabled.
+
+    Parameters:
+    chart (str): Chart name in CHART_COLORS / CHART_SIZES
+
+    Returns:
+    callable: Decorator
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        code_digest = hash_value(_code_fingerprint(func.__code__)).hexdigest()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            filename = bound.arguments['filename']
+            cache = get_render_cache()
+            if cache is None or not isinstance(filename, str):
+                return func(*args, **kwargs)
+
+            digest = hashlib.sha256()
+            for name, value in bound.arguments.items():
+                if name != 'filename':
+                    digest.update(name.encode('utf-8'))
+                    hash_value(value, digest)
+            modules = (func.__module__,) + RENDER_MODULES
+            sources = tuple(_module_fingerprint(name) for name in modules)
+            settings = tuple(_module_settings(name) for name in modules)
+            hash_value((chart, CHART_COLORS.get(chart), CHART_SIZES.get(chart), code_digest, sources, settings,
+                        _matplotlib_fingerprint()), digest)
+
+            def draw(path):
+                bound.arguments['filename'] = path
+                func(*bound.args, **bound.kwargs)
+
+            return cache.render(digest.hexdigest()[:32], filename, draw)
+        return wrapper
+    return decorator
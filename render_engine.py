@@ -0,0 +1,148 @@
+"""
+Module for rendering charts on standalone Matplotlib figures.
+
+Charts are drawn on their own Figure with an Agg canvas instead of through the
+global pyplot state machine, so several charts can be rendered at once. A batch
+of chart jobs can be spread across a process pool; each job writes to the file
+named in its arguments and results come back in job order, so the output does
+not depend on scheduling.
+
+One chart call can write several targets: file paths, in-memory buffers, or
+both, in any mix of formats and resolutions. The chart's data preparation,
+artists and tight layout are built once; Matplotlib still draws the whole
+figure again for each target it saves.
+"""
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from instrumentation import traced
+
+
+ChartJob = namedtuple('ChartJob', ['func', 'args', 'kwargs'])
+ChartJob.__new__.__defaults__ = ((), {})
+
+# One output of a chart: a path or writable binary file, its format (None: from the
+# path's extension, PNG for files) and resolution (None: the figure's DPI)
+RenderTarget = namedtuple('RenderTarget', ['target', 'format', 'dpi'])
+RenderTarget.__new__.__defaults__ = (None, None)
+
+
+def new_figure(figsize):
+    """
+    Create a standalone figure with a single axes.
+
+    Parameters:
+    figsize (tuple): Figure size in inches
+
+    Returns:
+    tuple: (matplotlib.figure.Figure, matplotlib.axes.Axes)
+    """
+    # Matplotlib is imported on first use, so modules that only declare charts start fast;
+    # the Agg canvas renders off-screen and never touches an interactive backend
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _write(fig, target):
+    if isinstance(target.target, (str, os.PathLike)):
+        directory = os.path.dirname(target.target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    fig.savefig(target.target, format=target.format, dpi=target.dpi if target.dpi is not None else 'figure')
+
+
+def save_figure(fig, filename):
+    """
+    Lay out a figure created with new_figure and write it to one or more targets.
+
+    The artists and tight layout are set up once and shared by every target,
+    but each target is a separate savefig call, which draws the full figure
+    again in its own format and resolution.
+
+    Parameters:
+    fig (matplotlib.figure.Figure): Figure to save
+    filename (str, file object, RenderTarget or list): Path or writable binary
+        file to save to, or a list of them to write several outputs at once
+
+    Returns:
+    object: filename, unchanged
+    """
+    targets = filename if isinstance(filename, list) else [filename]
+    fig.tight_layout()
+    for target in targets:
+        _write(fig, target if isinstance(target, RenderTarget) else RenderTarget(target))
+    return filename
+
+
+def render_bytes(func, *args, formats=('png',), dpi=None, **kwargs):
+    """
+    Build a chart once and return it encoded in several formats, without touching the disk.
+
+    Parameters:
+    func (callable): Chart function taking a `filename` argument, like those in visualizer
+    *args: Positional arguments of the chart function
+    formats (sequence): Output formats ('png', 'svg', 'pdf', ...)
+    dpi (float): Resolution of raster formats; None uses the figure's DPI
+    **kwargs: Keyword arguments of the chart function
+
+    Returns:
+    dict: format -> encoded chart bytes
+    """
+    buffers = {fmt: io.BytesIO() for fmt in formats}
+    func(*args, filename=[RenderTarget(buffer, fmt, dpi) for fmt, buffer in buffers.items()], **kwargs)
+    return {fmt: buffer.getvalue() for fmt, buffer in buffers.items()}
+
+
+def render_job(job):
+    """
+    Render a single chart job.
+
+    Parameters:
+    job (ChartJob): Module-level chart function and its arguments
+
+    Returns:
+    object: Whatever the chart function returns, usually the output path
+    """
+    return job.func(*job.args, **job.kwargs)
+
+
+@traced()
+def render_jobs(jobs, processes=None, progress=None):
+    """
+    Render a batch of chart jobs, in parallel when there is more than one.
+
+    Job functions and arguments must be picklable: use module-level functions
+    and pass the (small) chart inputs rather than whole datasets.
+
+    Parameters:
+    jobs (list): ChartJob instances
+    processes (int): Number of worker processes; None uses one per CPU and
+        1 renders in the calling process
+    progress (callable): Called as progress(done, total, result) after each
+        job finishes, in completion order
+
+    Returns:
+    list: Results of the jobs, in job order
+    """
+    jobs = list(jobs)
+    results = [None] * len(jobs)
+    if processes == 1 or len(jobs) <= 1:
+        for i, job in enumerate(jobs):
+            results[i] = render_job(job)
+            if progress is not None:
+                progress(i + 1, len(jobs), results[i])
+        return results
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(render_job, job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i] = future.result()
+            if progress is not None:
+                progress(done, len(jobs), results[i])
+    return results
@@ -0,0 +1,47 @@
+"""
+Declared schema of the Our World in Data columns used by the pipeline.
+
+Only the columns listed here are read from the source file. Identifier columns
+are loaded as categoricals, the date is parsed at read time and metrics use
+float32 unless they are large absolute counts that are summed downstream
+(population, totals), which keep float64.
+"""
+
+COVID_SCHEMA = {
+    'iso_code': 'category',
+    'continent': 'category',
+    'location': 'category',
+    'date': 'datetime64[ns]',
+    'population': 'float64',
+    'total_cases': 'float64',
+    'total_deaths': 'float64',
+    'new_cases': 'float32',
+    'new_deaths': 'float32',
+    'new_cases_smoothed': 'float32',
+    'new_deaths_smoothed': 'float32',
+    'total_cases_per_million': 'float32',
+    'total_deaths_per_million': 'float32',
+    'people_fully_vaccinated_per_hundred': 'float32',
+    'gdp_per_capita': 'float32',
+}
+
+
+def read_csv_options(schema=COVID_SCHEMA):
+    """
+    Build the pandas.read_csv keyword arguments implementing a schema.
+
+    Parameters:
+    schema (dict): Mapping of column name to dtype; datetime columns are parsed as dates
+
+    Returns:
+    dict: Keyword arguments for pandas.read_csv
+    """
+    date_columns = [col for col, dtype in schema.items() if dtype.startswith('datetime')]
+    return {
+        'usecols': sorted(schema),
+        'dtype': {col: dtype for col, dtype in schema.items() if col not in date_columns},
+        'parse_dates': date_columns,
+        # Parsing in one block keeps categories consistent; with internal chunking a
+        # block of aggregate rows would infer float categories for the empty continent
+        'low_memory': False,
+    }
@@ -0,0 +1,181 @@
+"""
+Module for sharing one memory-mapped copy of the dataset between processes.
+
+A snapshot is written once as an uncompressed Arrow IPC (Feather v2) file and
+every reader maps it with mmap, so all dashboard workers and sessions on a host
+read the same page-cache pages instead of each holding a private copy. Float
+columns are stored with NaN as a value rather than as Arrow nulls, which lets
+pandas wrap them as read-only NumPy views of the mapping with no copy.
+Categorical columns only copy their small integer codes.
+
+Snapshots are immutable and versioned. Publishing writes a new file, then
+atomically replaces the CURRENT pointer, so readers see either the old or the
+new snapshot and never a partial one. Processes that still map an older
+snapshot keep using it until they reload; only the most recent snapshots are
+kept on disk.
+
+Usage:
+    python shared_dataset.py publish [--url URL]
+    python shared_dataset.py status
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_URL, SHARED_DATASET_DIR, SHARED_DATASET_KEEP
+from instrumentation import traced
+
+CURRENT_POINTER = 'CURRENT'
+
+
+class SharedDatasetStore:
+    """
+    Directory of versioned, memory-mappable dataset snapshots.
+
+    Parameters:
+    directory (str): Directory holding the snapshots and the CURRENT pointer
+    keep (int): Number of most recent snapshots kept when publishing
+    """
+
+    def __init__(self, directory=SHARED_DATASET_DIR, keep=SHARED_DATASET_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def current_version(self):
+        """
+        Get the version of the published snapshot.
+
+        Returns:
+        str: Snapshot version, or None when nothing was published yet
+        """
+        try:
+            with open(os.path.join(self.directory, CURRENT_POINTER), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @traced('publish_shared_dataset')
+    def publish(self, df):
+        """
+        Write a DataFrame as a new snapshot and make it the current one.
+
+        Parameters:
+        df (pandas.DataFrame): Data to publish; the index is not stored
+
+        Returns:
+        str: Version of the new snapshot
+        """
+        import pyarrow as pa
+
+        os.makedirs(self.directory, exist_ok=True)
+        version = f"{time.time_ns()}-{os.getpid()}"
+        table = pa.table({column: _to_arrow(df[column]) for column in df.columns})
+        path = self._path(version)
+        _atomic_write(path, lambda tmp: _write_ipc(tmp, table))
+        _atomic_write(os.path.join(self.directory, CURRENT_POINTER), lambda tmp: _write_text(tmp, version))
+        self._prune()
+        return version
+
+    @traced('open_shared_dataset')
+    def open(self, version=None):
+        """
+        Map a snapshot into memory as a DataFrame.
+
+        Numeric and date columns are read-only views of the mapped file.
+
+        Parameters:
+        version (str): Snapshot to open; None opens the current one
+
+        Returns:
+        pandas.DataFrame: The mapped data
+
+        Raises:
+        FileNotFoundError: If there is no such snapshot
+        """
+        import pyarrow as pa
+
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No dataset has been published to {self.directory}")
+        source = pa.memory_map(self._path(version), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks keeps one block per column so pandas does not consolidate (copy) them
+        return table.to_pandas(split_blocks=True)
+
+    def _path(self, version):
+        return os.path.join(self.directory, f"dataset-{version}.arrow")
+
+    def _prune(self):
+        snapshots = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith('dataset-') and name.endswith('.arrow'))
+        for name in snapshots[:-self.keep]:
+            try:
+                # Readers that still map the file keep their pages (on Windows removal fails; retry next time)
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+def _to_arrow(series):
+    import pyarrow as pa
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pa.array(np.asarray(series.cat.categories, dtype=object))
+        return pa.DictionaryArray.from_arrays(pa.array(series.cat.codes.to_numpy(), mask=series.isna().to_numpy()),
+                                              categories)
+    if pd.api.types.is_float_dtype(series.dtype):
+        # Keep NaN as a value: arrays without a validity bitmap convert back zero-copy
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.array(series, from_pandas=True)
+
+
+def _write_ipc(path, table):
+    import pyarrow as pa
+
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['publish', 'status'])
+    parser.add_argument('--url', default=DATA_URL, help="Source to publish (default: the OWID data file)")
+    parser.add_argument('--dir', default=SHARED_DATASET_DIR)
+    args = parser.parse_args()
+
+    store = SharedDatasetStore(args.dir)
+    if args.command == 'publish':
+        # Imported here so `status` stays cheap
+        from dashboard_state import prepare_dashboard_frame
+        from data_fetcher import load_dataset
+
+        dataset = load_dataset(args.url)
+        if dataset.empty:
+            parser.exit(1, "Could not load data; the current snapshot is unchanged.\n")
+        version = store.publish(prepare_dashboard_frame(dataset.countries))
+        print(f"Published snapshot {version} to {args.dir}")
+    else:
+        print(f"Current snapshot: {store.current_version() or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Module for caching COVID-19 data snapshots on disk.
+
+Snapshots are stored in a columnar format (Parquet) next to a small JSON
+metadata file holding the validators (ETag / Last-Modified for HTTP sources,
+modification time and size for local files) of the source they were read
+from. A snapshot is only re-read from the source when the source changes.
+
+Snapshot rows are clustered with the countries first, then by location and
+date, and written in bounded row groups of plain (not dictionary-encoded)
+strings, so the min/max and null statistics of each row group let query
+engines skip the groups a filter rules out. Categorical columns are restored
+when a snapshot is read back into pandas.
+"""
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+from config import CACHE_DIR, FETCH_TIMEOUT, SNAPSHOT_ROW_GROUP_SIZE
+
+
+class SnapshotCache:
+    """
+    On-disk snapshot cache for CSV sources.
+
+    Parameters:
+    cache_dir (str): Directory where snapshots and their metadata are stored
+    timeout (float): Timeout in seconds for HTTP requests
+    row_group_size (int): Rows per Parquet row group of a snapshot
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, timeout=FETCH_TIMEOUT, row_group_size=SNAPSHOT_ROW_GROUP_SIZE):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.row_group_size = row_group_size
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'errors': 0}
+
+    def load(self, url, read_options=None):
+        """
+        Load the CSV at `url`, using the cached snapshot when it is still current.
+
+        Parameters:
+        url (str): HTTP(S) URL, file:// URL or local path of the CSV file
+        read_options (dict): Keyword arguments passed to pandas.read_csv; they
+            are part of the cache key, so different options get separate snapshots
+
+        Returns:
+        pandas.DataFrame: DataFrame containing the data, in snapshot row order
+        """
+        return self._load(url, read_options or {}, read=True)
+
+    def snapshot_path(self, url, read_options=None):
+        """
+        Bring the snapshot of `url` up to date and get its Parquet file, without reading it.
+
+        Query engines scan this file directly, reading only the columns and row
+        groups a query needs.
+
+        Parameters:
+        url (str): HTTP(S) URL, file:// URL or local path of the CSV file
+        read_options (dict): Keyword arguments passed to pandas.read_csv on a miss
+
+        Returns:
+        str: Path of the Parquet snapshot, or None when snapshots cannot be written
+        """
+        read_options = read_options or {}
+        self._load(url, read_options, read=False)
+        data_path, _ = self._entry_paths(url, read_options)
+        return data_path if os.path.exists(data_path) else None
+
+    def _load(self, url, read_options, read):
+        # With read=False a current snapshot is left on disk and None is returned
+        data_path, meta_path = self._entry_paths(url, read_options)
+        meta = self._read_meta(meta_path) if os.path.exists(data_path) else None
+
+        scheme = urllib.parse.urlparse(url).scheme
+        if scheme in ('http', 'https'):
+            return self._load_http(url, read_options, data_path, meta_path, meta, read)
+        return self._load_local(_local_path(url), read_options, data_path, meta_path, meta, read)
+
+    def clear(self):
+        """Remove every snapshot stored in the cache directory."""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(('.parquet', '.json')):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _load_http(self, url, read_options, data_path, meta_path, meta, read=True):
+        request = urllib.request.Request(url)
+        if meta:
+            if meta.get('etag'):
+                request.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                request.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                df = pd.read_csv(response, **read_options)
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                self.stats['hits'] += 1
+                return _read_snapshot(data_path, meta, read)
+            return self._load_stale(data_path, meta, e, read)
+        except (urllib.error.URLError, OSError) as e:
+            return self._load_stale(data_path, meta, e, read)
+
+        self.stats['misses'] += 1
+        return self._write_snapshot(df, data_path, meta_path, url, validators)
+
+    def _load_local(self, path, read_options, data_path, meta_path, meta, read=True):
+        stat = os.stat(path)
+        validators = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        if meta and all(meta.get(k) == v for k, v in validators.items()):
+            self.stats['hits'] += 1
+            return _read_snapshot(data_path, meta, read)
+
+        self.stats['misses'] += 1
+        df = pd.read_csv(path, **read_options)
+        return self._write_snapshot(df, data_path, meta_path, path, validators)
+
+    def _load_stale(self, data_path, meta, error, read=True):
+        """Serve the last snapshot when the source cannot be reached."""
+        if meta is None:
+            self.stats['errors'] += 1
+            raise error
+        print(f"Could not revalidate snapshot ({error}); using cached copy.")
+        self.stats['stale'] += 1
+        return _read_snapshot(data_path, meta, read)
+
+    def _write_snapshot(self, df, data_path, meta_path, source, validators):
+        """Store a snapshot of a freshly read source and get its rows in snapshot order."""
+        df = _cluster(df)
+        categorical = [name for name, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        # Row group statistics are not used to skip groups of dictionary-encoded columns
+        plain = df.astype({name: df[name].cat.categories.dtype for name in categorical})
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            _atomic_write(data_path, lambda tmp: plain.to_parquet(tmp, index=False,
+                                                                  row_group_size=self.row_group_size))
+        except ImportError as e:
+            print(f"Snapshot cache disabled: {e}")
+            return df
+        meta = dict(validators, source=source, stored_at=time.time(), categorical=categorical)
+        _atomic_write(meta_path, lambda tmp: _write_json(tmp, meta))
+        return df
+
+    def _entry_paths(self, url, read_options):
+        key_source = json.dumps([url, read_options], sort_keys=True, default=str)
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:20]
+        base = os.path.join(self.cache_dir, key)
+        return base + '.parquet', base + '.json'
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _read_snapshot(data_path, meta, read):
+    if not read:
+        return None
+    df = pd.read_parquet(data_path)
+    categorical = [name for name in meta.get('categorical', []) if name in df.columns]
+    return df.astype({name: 'category' for name in categorical}) if categorical else df
+
+
+def _cluster(df):
+    """Order rows with the countries first, then by location and date, so row groups cover narrow ranges."""
+    keys = [name for name in ('location', 'date') if name in df.columns]
+    if 'continent' in df.columns:
+        df = df.assign(_aggregate=df['continent'].isna())
+        keys.insert(0, '_aggregate')
+    if not keys:
+        return df
+    df = df.sort_values(keys, kind='stable', ignore_index=True)
+    return df.drop(columns='_aggregate', errors='ignore')
+
+
+def _local_path(url):
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == 'file':
+        return urllib.request.url2pathname(parsed.path)
+    return url
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """
+    Get the process-wide snapshot cache used by fetch_covid_data.
+
+    Returns:
+    SnapshotCache: The shared cache instance
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SnapshotCache()
+    return _default_cache
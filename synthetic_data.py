@@ -0,0 +1,253 @@
+"""
+Module for generating synthetic data shaped like the Our World in Data file.
+
+The generated frame has the same columns, identifier conventions and row order
+as owid-covid-data.csv: country rows with a continent, plus aggregate rows
+(continents, World, income groups) whose continent is empty. Core metrics follow
+plausible curves (case waves, cumulative totals, per-capita rates, vaccination
+ramps); every other metric is random. Output is deterministic for a given seed,
+so benchmarks and tests can run offline and reproducibly.
+
+Usage:
+    python synthetic_data.py OUTPUT.csv [--locations N] [--days N] [--columns N] [--nan-fraction F]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+OWID_COLUMNS = [
+    'iso_code', 'continent', 'location', 'date', 'total_cases', 'new_cases', 'new_cases_smoothed',
+    'total_deaths', 'new_deaths', 'new_deaths_smoothed', 'total_cases_per_million',
+    'new_cases_per_million', 'new_cases_smoothed_per_million', 'total_deaths_per_million',
+    'new_deaths_per_million', 'new_deaths_smoothed_per_million', 'reproduction_rate', 'icu_patients',
+    'icu_patients_per_million', 'hosp_patients', 'hosp_patients_per_million', 'weekly_icu_admissions',
+    'weekly_icu_admissions_per_million', 'weekly_hosp_admissions', 'weekly_hosp_admissions_per_million',
+    'total_tests', 'new_tests', 'total_tests_per_thousand', 'new_tests_per_thousand', 'new_tests_smoothed',
+    'new_tests_smoothed_per_thousand', 'positive_rate', 'tests_per_case', 'tests_units',
+    'total_vaccinations', 'people_vaccinated', 'people_fully_vaccinated', 'total_boosters',
+    'new_vaccinations', 'new_vaccinations_smoothed', 'total_vaccinations_per_hundred',
+    'people_vaccinated_per_hundred', 'people_fully_vaccinated_per_hundred', 'total_boosters_per_hundred',
+    'new_vaccinations_smoothed_per_million', 'new_people_vaccinated_smoothed',
+    'new_people_vaccinated_smoothed_per_hundred', 'stringency_index', 'population_density', 'median_age',
+    'aged_65_older', 'aged_70_older', 'gdp_per_capita', 'extreme_poverty', 'cardiovasc_death_rate',
+    'diabetes_prevalence', 'female_smokers', 'male_smokers', 'handwashing_facilities',
+    'hospital_beds_per_thousand', 'life_expectancy', 'human_development_index', 'population',
+    'excess_mortality_cumulative_absolute', 'excess_mortality_cumulative', 'excess_mortality',
+    'excess_mortality_cumulative_per_million',
+]
+
+CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+OTHER_AGGREGATES = ['World', 'European Union', 'High income', 'Upper middle income',
+                    'Lower middle income', 'Low income']
+
+# Columns that are never blanked out, as in the real file
+_NEVER_MISSING = {'iso_code', 'location', 'date', 'population'}
+
+
+def generate_owid_data(n_locations=250, n_days=1000, n_columns=None, nan_fraction=0.3, seed=0,
+                       start_date='2020-01-01'):
+    """
+    Generate an OWID-shaped DataFrame.
+
+    Parameters:
+    n_locations (int): Number of countries (aggregate locations are added on top)
+    n_days (int): Number of consecutive days per location
+    n_columns (int): Number of columns; None gives the full OWID width, fewer keeps the
+        leading columns of OWID_COLUMNS and more appends extra random metrics
+    nan_fraction (float): Fraction of metric values blanked out at random
+    seed (int): Random seed
+    start_date (str): First date of the series
+
+    Returns:
+    pandas.DataFrame: Data with dates as 'YYYY-MM-DD' strings, as read from the CSV
+    """
+    rng = np.random.default_rng(seed)
+    countries = _generate_countries(rng, n_locations, n_days)
+    aggregates = _generate_aggregates(rng, countries, n_locations, n_days)
+
+    columns = _select_columns(n_columns)
+    frames = []
+    for frame in (countries, aggregates):
+        n_rows = len(frame['location'])
+        for column in columns:
+            if column not in frame:
+                frame[column] = _random_metric(rng, column, n_rows)
+        frames.append(pd.DataFrame({column: frame[column] for column in columns}))
+
+    df = pd.concat(frames, ignore_index=True)
+    _blank_out(rng, df, nan_fraction)
+    dates = pd.date_range(start_date, periods=n_days).strftime('%Y-%m-%d')
+    df['date'] = np.asarray(dates)[df['date'].to_numpy()]
+    # The published file is ordered by location, then date
+    return df.sort_values(['location', 'date'], kind='stable', ignore_index=True)
+
+
+def write_owid_csv(path, **kwargs):
+    """
+    Generate OWID-shaped data and write it as CSV.
+
+    Parameters:
+    path (str): Output path
+    **kwargs: Arguments passed to generate_owid_data
+
+    Returns:
+    str: The output path
+    """
+    df = generate_owid_data(**kwargs)
+    numeric = df.select_dtypes('number').columns
+    df[numeric] = df[numeric].round(3)
+    try:
+        # pyarrow's writer is an order of magnitude faster than DataFrame.to_csv
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        options = pa_csv.WriteOptions(quoting_style='needed')
+    except (ImportError, TypeError):
+        df.to_csv(path, index=False)
+    else:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path, options)
+    return path
+
+
+def generate_country_sample(n_rows=400, seed=0):
+    """
+    Generate a small frame of country rows in random order, for tests of the dashboard structures.
+
+    Unlike generate_owid_data, rows are not sorted and a location can repeat a
+    date, as in the filtered frames the dashboard works on.
+
+    Parameters:
+    n_rows (int): Number of rows
+    seed (int): Random seed
+
+    Returns:
+    pandas.DataFrame: continent and location (categorical), date and float32 daily metrics
+    """
+    rng = np.random.default_rng(seed)
+    locations = rng.choice(['France', 'Japan', 'Spain', 'India'], n_rows)
+    continents = {'France': 'Europe', 'Spain': 'Europe', 'Japan': 'Asia', 'India': 'Asia'}
+    return pd.DataFrame({
+        'continent': pd.Categorical([continents[loc] for loc in locations]),
+        'location': pd.Categorical(locations),
+        'date': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 90, n_rows), unit='D'),
+        'new_cases': rng.random(n_rows).astype('float32'),
+        'new_deaths': rng.random(n_rows).astype('float32'),
+        'new_cases_smoothed': rng.random(n_rows).astype('float32'),
+        'new_deaths_smoothed': rng.random(n_rows).astype('float32'),
+        'total_deaths_per_million': rng.random(n_rows).astype('float32'),
+    })
+
+
+def _select_columns(n_columns):
+    if n_columns is None:
+        return list(OWID_COLUMNS)
+    n_columns = max(n_columns, 4)
+    extra = [f'extra_metric_{i}' for i in range(max(n_columns - len(OWID_COLUMNS), 0))]
+    return OWID_COLUMNS[:n_columns] + extra
+
+
+def _generate_countries(rng, n_locations, n_days):
+    day = np.arange(n_days)
+    population = np.exp(rng.uniform(np.log(1e5), np.log(1.4e9), n_locations))
+    gdp_per_capita = np.exp(rng.uniform(np.log(700), np.log(100000), n_locations))
+
+    # Case waves: a few sine bumps per location with random period, phase and size
+    period = rng.uniform(120, 365, (n_locations, 1))
+    phase = rng.uniform(0, 2 * np.pi, (n_locations, 1))
+    attack_rate = rng.uniform(1e-5, 2e-3, (n_locations, 1))
+    waves = np.clip(np.sin(2 * np.pi * day / period + phase), 0, None) ** 2
+    new_cases_smoothed = attack_rate * population[:, None] * waves
+    new_cases = np.round(new_cases_smoothed * rng.uniform(0.6, 1.4, new_cases_smoothed.shape))
+    fatality = rng.uniform(0.002, 0.03, (n_locations, 1))
+    new_deaths_smoothed = new_cases_smoothed * fatality
+    new_deaths = np.round(new_cases * fatality)
+
+    # Vaccination ramps up from roughly a third of the way into the series
+    coverage = rng.uniform(5, 95, (n_locations, 1))
+    midpoint = rng.uniform(n_days / 3, n_days / 2, (n_locations, 1))
+    fully_vaccinated = coverage / (1 + np.exp(-(day - midpoint) / 30))
+
+    per_million = 1e6 / population[:, None]
+    index = np.arange(n_locations)
+    return {
+        'iso_code': np.repeat([f'S{i:03d}' for i in index], n_days),
+        'continent': np.repeat([CONTINENTS[i % len(CONTINENTS)] for i in index], n_days),
+        'location': np.repeat([f'Country {i:04d}' for i in index], n_days),
+        'date': np.tile(day, n_locations),
+        'population': np.repeat(population.round(), n_days),
+        'gdp_per_capita': np.repeat(gdp_per_capita, n_days),
+        'new_cases': new_cases.ravel(),
+        'new_cases_smoothed': new_cases_smoothed.ravel(),
+        'total_cases': np.cumsum(new_cases, axis=1).ravel(),
+        'new_deaths': new_deaths.ravel(),
+        'new_deaths_smoothed': new_deaths_smoothed.ravel(),
+        'total_deaths': np.cumsum(new_deaths, axis=1).ravel(),
+        'new_cases_per_million': (new_cases * per_million).ravel(),
+        'new_cases_smoothed_per_million': (new_cases_smoothed * per_million).ravel(),
+        'total_cases_per_million': (np.cumsum(new_cases, axis=1) * per_million).ravel(),
+        'new_deaths_per_million': (new_deaths * per_million).ravel(),
+        'new_deaths_smoothed_per_million': (new_deaths_smoothed * per_million).ravel(),
+        'total_deaths_per_million': (np.cumsum(new_deaths, axis=1) * per_million).ravel(),
+        'people_fully_vaccinated_per_hundred': fully_vaccinated.ravel(),
+        'people_fully_vaccinated': (fully_vaccinated * population[:, None] / 100).ravel(),
+    }
+
+
+def _generate_aggregates(rng, countries, n_locations, n_days):
+    """Build continent rows as sums of their countries, plus other random aggregates."""
+    n_aggregates = len(CONTINENTS) + len(OTHER_AGGREGATES)
+    continent_of = np.array([i % len(CONTINENTS) for i in range(n_locations)])
+    summed = {}
+    for column in ('new_cases', 'new_cases_smoothed', 'new_deaths', 'new_deaths_smoothed', 'population'):
+        values = countries[column].reshape(n_locations, n_days)
+        by_continent = np.zeros((len(CONTINENTS), n_days))
+        np.add.at(by_continent, continent_of, values)
+        world = values.sum(axis=0, keepdims=True)
+        others = rng.uniform(0.1, 0.6, (len(OTHER_AGGREGATES) - 1, 1)) * world
+        summed[column] = np.vstack([by_continent, world, others]).ravel()
+
+    names = CONTINENTS + OTHER_AGGREGATES
+    return dict(summed, **{
+        'iso_code': np.repeat([f'OWID_{name[:3].upper()}{i}' for i, name in enumerate(names)], n_days),
+        'continent': np.full(n_aggregates * n_days, None, dtype=object),
+        'location': np.repeat(names, n_days),
+        'date': np.tile(np.arange(n_days), n_aggregates),
+    })
+
+
+def _random_metric(rng, column, n_rows):
+    if column == 'tests_units':
+        return rng.choice(['tests performed', 'people tested', 'samples tested'], n_rows)
+    return rng.uniform(0, 100, n_rows)
+
+
+def _blank_out(rng, df, nan_fraction):
+    if nan_fraction <= 0:
+        return
+    for column in df.columns:
+        if column in _NEVER_MISSING or column == 'continent':
+            continue
+        mask = rng.random(len(df)) < nan_fraction
+        if pd.api.types.is_numeric_dtype(df[column]):
+            df.loc[mask, column] = np.nan
+        else:
+            df[column] = df[column].where(~mask, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output')
+    parser.add_argument('--locations', type=int, default=250)
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--columns', type=int, default=None)
+    parser.add_argument('--nan-fraction', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_owid_csv(args.output, n_locations=args.locations, n_days=args.days, n_columns=args.columns,
+                   nan_fraction=args.nan_fraction, seed=args.seed)
+    print(f"Synthetic data written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Test the continent x date aggregate cube against direct groupby results.
+"""
+import numpy as np
+import pandas as pd
+
+from data_processor import MONTH_END_FREQ, ContinentDateCube
+from synthetic_data import generate_country_sample
+
+
+def test_cube_matches_groupby():
+    """Test daily, rolled-up and global sums against the ad-hoc computations."""
+    print("Testing aggregate cube sums...")
+    df = generate_country_sample()
+    df['new_cases_smoothed'] = df['new_cases_smoothed'].astype('float64')
+    cube = ContinentDateCube(df)
+
+    expected = (df.groupby(['continent', 'date'], observed=True)['new_cases_smoothed'].sum().reset_index()
+                .pivot(index='date', columns='continent', values='new_cases_smoothed').fillna(0))
+    expected.columns = expected.columns.astype(str)
+    monthly = cube.by_continent('new_cases_smoothed', 'M')
+    pd.testing.assert_frame_equal(monthly, expected.resample(MONTH_END_FREQ).sum(), check_names=False,
+                                  check_freq=False)
+
+    weekly_total = cube.total('new_cases_smoothed', 'W')
+    assert np.isclose(weekly_total.sum(), df['new_cases_smoothed'].sum())
+    assert (weekly_total.index.dayofweek == 6).all()
+
+    daily = df.groupby('date')['new_cases_smoothed'].sum()
+    np.testing.assert_allclose(cube.total('new_cases_smoothed').to_numpy(), daily.to_numpy())
+    print("✓ Aggregate cube matches groupby.")
+
+
+def test_cube_totals_for_a_selection():
+    """Test range and continent selections, skipping dates a continent has no rows for."""
+    print("Testing aggregate cube selections...")
+    df = generate_country_sample()
+    cube = ContinentDateCube(df)
+    start, end = pd.Timestamp('2021-01-10'), pd.Timestamp('2021-02-10')
+
+    totals = cube.totals(start, end, 'Asia')
+    rows = df[(df['date'] >= start) & (df['date'] <= end) & (df['continent'] == 'Asia')]
+    expected = rows.groupby('date')[['new_cases_smoothed', 'new_deaths_smoothed']].sum()
+    assert totals['date'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(totals['new_deaths_smoothed'], expected['new_deaths_smoothed'], rtol=1e-6)
+
+    monthly = cube.totals(start, end, 'All', 'M')
+    assert monthly['date'].tolist() == [pd.Timestamp('2021-01-31'), pd.Timestamp('2021-02-28')]
+    assert cube.totals(start, end, 'Oceania').empty
+    print("✓ Aggregate cube totals follow the selection.")
+
+
+def main():
+    """Run all tests."""
+    test_cube_matches_groupby()
+    test_cube_totals_for_a_selection()
+
+
+if __name__ == "__main__":
+    main()
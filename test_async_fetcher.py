@@ -0,0 +1,188 @@
+"""
+Test the concurrent fetcher against a local HTTP server.
+"""
+import contextlib
+import pathlib
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_fetcher import (ConnectionPool, FetchConnectionError, FetchTimeoutError, HTTPStatusError, ParseError,
+                           Source, fetch_sources)
+from schema import COVID_SCHEMA
+
+CSV_BODY = "location,date,value\nFrance,2021-01-01,1.5\nJapan,2021-01-01,2.5\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve CSV files over keep-alive HTTP/1.1, with a few failure modes."""
+    protocol_version = 'HTTP/1.1'
+    requests = {}
+    disconnected = threading.Event()
+
+    def do_GET(self):
+        count = _Handler.requests[self.path] = _Handler.requests.get(self.path, 0) + 1
+        if self.path == '/flaky.csv' and count == 1:
+            return self._send(503, b'busy')
+        if self.path == '/missing.csv':
+            return self._send(404, b'not found')
+        if self.path == '/slow.csv':
+            time.sleep(1)
+        if self.path == '/moved.csv':
+            self.send_response(302)
+            self.send_header('Location', '/a.csv')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/trickle.csv':
+            return self._trickle()
+        if self.path == '/garbage.csv':
+            return self._send(200, b'\xff\xfe\x00bad\n\x81\x82')
+        self._send(200, CSV_BODY.encode('utf-8'))
+
+    def _trickle(self):
+        """Send a row every 50 ms for 10 s, so no single read ever times out."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            self.wfile.write(b"location,date,value\n")
+            for _ in range(200):
+                self.wfile.write(b"France,2021-01-01,1.5\n")
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            _Handler.disconnected.set()
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning the slow response on timeout are expected
+        pass
+
+
+@contextlib.contextmanager
+def _local_server():
+    """Serve _Handler on a free local port and yield its base URL."""
+    server = _QuietServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Handler.requests = {}
+    _Handler.disconnected = threading.Event()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_sources_share_one_keep_alive_connection():
+    """Test that sources fetched one at a time reuse a single keep-alive connection."""
+    print("Testing connection reuse...")
+    with _local_server() as base_url:
+        pool = ConnectionPool()
+        sources = {name: f"{base_url}/{name}.csv" for name in ('a', 'b', 'c')}
+        results = fetch_sources(sources, max_connections=1, pool=pool)
+    assert list(results) == ['a', 'b', 'c']
+    for result in results.values():
+        assert result.error is None and result.attempts == 1
+        assert result.data['value'].tolist() == [1.5, 2.5]
+    assert pool.stats == {'created': 1, 'reused': 2}
+    print("✓ Sources share one keep-alive connection.")
+
+
+def test_transient_failures_are_retried():
+    """Test that a 503 is retried and a redirect is followed."""
+    print("Testing retries...")
+    with _local_server() as base_url:
+        results = fetch_sources({'flaky': f"{base_url}/flaky.csv", 'moved': f"{base_url}/moved.csv"}, backoff=0)
+    assert results['flaky'].error is None and results['flaky'].attempts == 2
+    assert len(results['moved'].data) == 2
+    print("✓ Transient failures are retried.")
+
+
+def test_failures_are_typed():
+    """Test that HTTP, timeout, parse and connection failures get their own error types."""
+    print("Testing fetch errors...")
+    with _local_server() as base_url:
+        sources = [
+            Source('missing', f"{base_url}/missing.csv"),
+            Source('slow', f"{base_url}/slow.csv", timeout=0.2),
+            Source('garbage', f"{base_url}/garbage.csv"),
+            Source('closed', "http://127.0.0.1:9/unused.csv", timeout=1),
+        ]
+        results = fetch_sources(sources, retries=1, backoff=0)
+
+        missing = results['missing'].error
+        assert isinstance(missing, HTTPStatusError) and missing.status == 404
+        assert results['missing'].attempts == 1
+        assert isinstance(results['slow'].error, FetchTimeoutError) and results['slow'].attempts == 2
+        assert isinstance(results['garbage'].error, ParseError) and results['garbage'].attempts == 1
+        assert isinstance(results['closed'].error, FetchConnectionError)
+        assert all(result.data is None for result in results.values())
+
+        with pytest.raises(HTTPStatusError):
+            fetch_sources(sources[:1], raise_errors=True)
+    print("✓ Fetch failures are typed.")
+
+
+def test_timed_out_download_stops_its_worker():
+    """Test that a download over its total timeout is abandoned and its connection closed."""
+    print("Testing download timeouts...")
+    with _local_server() as base_url:
+        start = time.perf_counter()
+        results = fetch_sources([Source('trickle', f"{base_url}/trickle.csv", 0.5)], retries=0)
+        assert isinstance(results['trickle'].error, FetchTimeoutError)
+        # The worker closes the connection right away instead of reading the 10 s response to the end
+        assert _Handler.disconnected.wait(2)
+        assert time.perf_counter() - start < 3
+    print("✓ Timed-out downloads stop their worker.")
+
+
+def test_covid_source_uses_schema(tmp_path):
+    """Test that the covid source is read with COVID_SCHEMA unless read_options are given."""
+    print("Testing the covid source schema...")
+    columns = sorted(COVID_SCHEMA) + ['extra']
+    row = {col: '1.5' for col in columns}
+    row.update(iso_code='FRA', continent='Europe', location='France', date='2021-01-01')
+    path = tmp_path / 'owid.csv'
+    path.write_text(','.join(columns) + '\n' + ','.join(row[col] for col in columns) + '\n')
+
+    results = fetch_sources({'covid': str(path), 'other': str(path)})
+    covid, other = results['covid'].data, results['other'].data
+    assert sorted(covid.columns) == sorted(COVID_SCHEMA)
+    assert covid['location'].dtype == 'category' and covid['new_cases'].dtype == 'float32'
+    assert 'extra' in other.columns and other['new_cases'].dtype == 'float64'
+    # Explicit Source tuples keep their own read options
+    plain = fetch_sources([Source('covid', str(path))])['covid'].data
+    assert 'extra' in plain.columns
+    print("✓ The covid source is read with its schema.")
+
+
+def main():
+    """Run all tests."""
+    test_sources_share_one_keep_alive_connection()
+    test_transient_failures_are_retried()
+    test_failures_are_typed()
+    test_timed_out_download_stops_its_worker()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_covid_source_uses_schema(pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Test the per-location chart pack generator.
+"""
+import os
+import tempfile
+
+from chart_pack import build_chart_pack, chart_path, location_slug
+from data_fetcher import CovidDataset
+from synthetic_data import generate_owid_data
+
+
+def _frame():
+    raw = generate_owid_data(n_locations=3, n_days=60, n_columns=None, nan_fraction=0.2, seed=1)
+    return CovidDataset(raw).frame
+
+
+def test_location_slug():
+    """Test that location names become lowercase, filesystem-safe slugs."""
+    print("Testing location slugs...")
+    assert location_slug("Cote d'Ivoire") == 'cote_d_ivoire'
+    assert location_slug('North America') == 'north_america'
+    print("✓ Location slugs are filesystem-safe.")
+
+
+def test_chart_pack_renders_every_location_and_resumes(tmp_path):
+    """Test that every location gets its charts and completed charts are skipped."""
+    print("Testing chart pack...")
+    frame = _frame()
+    output_dir = str(tmp_path)
+    locations = ['Country 0000', 'Europe', 'World']
+    progress = []
+
+    summary = build_chart_pack(frame, output_dir, locations=locations, processes=1,
+                               progress=lambda *args: progress.append(args))
+    assert summary == {'locations_rendered': len(locations), 'locations_skipped': 0,
+                       'charts_written': 3 * len(locations)}
+    assert [done for done, _, _ in progress] == list(range(1, len(locations) + 1))
+    for location in locations:
+        for chart in ('cases', 'deaths', 'vaccination'):
+            assert os.path.getsize(chart_path(output_dir, location, chart)) > 0
+    assert not [name for _, _, names in os.walk(output_dir) for name in names if '.tmp' in name]
+
+    os.remove(chart_path(output_dir, 'Europe', 'deaths'))
+    summary = build_chart_pack(frame, output_dir, locations=locations, processes=1)
+    assert summary == {'locations_rendered': 1, 'locations_skipped': len(locations) - 1, 'charts_written': 1}
+    print("✓ Chart pack renders every location and resumes.")
+
+
+def main():
+    """Run all tests."""
+    test_location_slug()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_chart_pack_renders_every_location_and_resumes(tmp)
+
+
+if __name__ == "__main__":
+    main()
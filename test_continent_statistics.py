@@ -0,0 +1,81 @@
+"""
+Test the per-continent statistics engine against pandas groupby.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor import calculate_continent_deaths, compute_continent_statistics
+
+
+def _latest(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'continent': rng.choice(['Africa', 'Asia', 'Europe', 'Oceania'], n),
+        'population': rng.uniform(1e5, 1e8, n),
+        'cases': rng.uniform(0, 5e5, n),
+        'deaths': rng.uniform(0, 5e3, n),
+    })
+    df.loc[rng.random(n) < 0.2, 'cases'] = np.nan
+    df.loc[rng.random(n) < 0.1, 'population'] = np.nan
+    df.loc[df['continent'] == 'Oceania', 'deaths'] = np.nan
+    df.loc[rng.random(n) < 0.05, 'continent'] = None
+    df['continent'] = df['continent'].astype('category')
+    return df
+
+
+def test_statistics_match_pandas():
+    """Test means, medians, quantiles, sums and weighted means against pandas groupby."""
+    print("Testing continent statistics...")
+    df = _latest()
+    specs = [('cases', 'mean'), ('cases', 'median'), ('cases', 'q0.9'), ('cases', 'q0.25'), ('cases', 'sum'),
+             ('cases', 'weighted_mean'), ('deaths', 'mean'), ('deaths', 'q0.1')]
+    result = compute_continent_statistics(df, specs)
+
+    grouped = df.groupby('continent', observed=True)
+    assert list(result.index) == sorted(grouped.groups)
+    pd.testing.assert_series_equal(result[('cases', 'mean')], grouped['cases'].mean(), check_names=False)
+    pd.testing.assert_series_equal(result[('cases', 'median')], grouped['cases'].median(), check_names=False)
+    pd.testing.assert_series_equal(result[('cases', 'q0.9')], grouped['cases'].quantile(0.9), check_names=False)
+    pd.testing.assert_series_equal(result[('cases', 'q0.25')], grouped['cases'].quantile(0.25), check_names=False)
+    pd.testing.assert_series_equal(result[('cases', 'sum')], grouped['cases'].sum(), check_names=False)
+    pd.testing.assert_series_equal(result[('deaths', 'q0.1')], grouped['deaths'].quantile(0.1), check_names=False)
+    assert np.isnan(result.loc['Oceania', ('deaths', 'mean')])
+
+    both = df.dropna(subset=['cases', 'population'])
+    weighted = (both['cases'] * both['population']).groupby(both['continent'], observed=True).sum() \
+        / both.groupby('continent', observed=True)['population'].sum()
+    pd.testing.assert_series_equal(result[('cases', 'weighted_mean')], weighted, check_names=False)
+    print("✓ Continent statistics match pandas.")
+
+
+def test_continent_deaths_uses_engine():
+    """Test that calculate_continent_deaths gives the groupby mean, sorted descending."""
+    print("Testing continent deaths...")
+    df = _latest().rename(columns={'deaths': 'total_deaths_per_million'})
+    expected = df.groupby('continent', observed=True)['total_deaths_per_million'].mean().sort_values(ascending=False)
+    pd.testing.assert_series_equal(calculate_continent_deaths(df), expected, check_names=False)
+    print("✓ Continent deaths use the statistics engine.")
+
+
+def test_empty_input_and_unknown_statistic():
+    """Test that empty input gives an empty frame and unknown statistics are rejected."""
+    print("Testing statistics edge cases...")
+    df = _latest().iloc[:0]
+    result = compute_continent_statistics(df, [('cases', 'mean'), ('cases', 'q0.5')])
+    assert result.empty
+    assert list(result.columns) == [('cases', 'mean'), ('cases', 'q0.5')]
+    with pytest.raises(ValueError):
+        compute_continent_statistics(_latest(), [('cases', 'mode')])
+    print("✓ Empty input and unknown statistics are handled.")
+
+
+def main():
+    """Run all tests."""
+    test_statistics_match_pandas()
+    test_continent_deaths_uses_engine()
+    test_empty_input_and_unknown_statistic()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Test the single-pass country/aggregate partitioning of CovidDataset.
+"""
+import numpy as np
+import pandas as pd
+
+from data_fetcher import CovidDataset
+from synthetic_data import generate_owid_data
+
+
+def _raw():
+    # Interleave aggregate and country rows so the partitioning has to reorder them
+    df = generate_owid_data(8, 20, nan_fraction=0.2)
+    df = df.sample(frac=1, random_state=0).reset_index(drop=True)
+    df['date'] = df['date'].astype(str)
+    return df
+
+
+def test_partitions_match_row_filters_in_order():
+    """Test that each partition holds the rows of its boolean filter, in file order."""
+    print("Testing dataset partitions...")
+    df = _raw()
+    dataset = CovidDataset(df)
+    for partition, mask in [(dataset.countries, df['continent'].notna()), (dataset.aggregates, df['continent'].isna())]:
+        expected = df[mask].assign(date=pd.to_datetime(df.loc[mask, 'date']))
+        pd.testing.assert_frame_equal(partition, expected)
+    assert len(dataset.countries) + len(dataset.aggregates) == len(df)
+    print("✓ Partitions match the row filters.")
+
+
+def test_input_frame_is_not_modified():
+    """Test that building a dataset leaves the caller's frame unchanged."""
+    print("Testing input frame...")
+    df = _raw()
+    before = df.copy()
+    CovidDataset(df)
+    pd.testing.assert_frame_equal(df, before)
+    print("✓ The input frame is not modified.")
+
+
+def test_partitions_are_views_of_the_frame():
+    """Test that the partitions share memory with the partitioned frame."""
+    print("Testing partition views...")
+    dataset = CovidDataset(_raw())
+    frame_values = dataset.frame['new_cases_smoothed'].to_numpy()
+    for partition in (dataset.countries, dataset.aggregates):
+        assert np.shares_memory(partition['new_cases_smoothed'].to_numpy(), frame_values)
+    print("✓ Partitions are views of the frame.")
+
+
+def main():
+    """Run all tests."""
+    test_partitions_match_row_filters_in_order()
+    test_input_frame_is_not_modified()
+    test_partitions_are_views_of_the_frame()
+
+
+if __name__ == "__main__":
+    main()
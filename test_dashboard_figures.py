@@ -0,0 +1,114 @@
+"""
+Test the dashboard figures and their cache.
+"""
+import pathlib
+import tempfile
+import threading
+
+import pandas as pd
+import pytest
+
+from config import DASHBOARD_WEBGL_MIN_POINTS
+from dashboard_figures import FigureCache, time_series_figure, use_webgl
+from dashboard_state import TIME_SERIES_METRICS, DashboardData, smoothed_column
+from data_fetcher import CovidDataset, fetch_covid_data
+from schema import COVID_SCHEMA
+from synthetic_data import write_owid_csv
+
+
+def _daily(n_days):
+    dates = pd.date_range('2021-01-01', periods=n_days, freq='D')
+    return pd.DataFrame({'new_cases_smoothed': range(n_days), 'new_deaths_smoothed': range(n_days)}, index=dates)
+
+
+def test_use_webgl_modes():
+    """Test when the auto, webgl and svg render modes choose WebGL."""
+    print("Testing render modes...")
+    assert not use_webgl(DASHBOARD_WEBGL_MIN_POINTS - 1)
+    assert use_webgl(DASHBOARD_WEBGL_MIN_POINTS)
+    assert use_webgl(1, 'webgl') and not use_webgl(10 ** 6, 'svg')
+    with pytest.raises(ValueError):
+        use_webgl(1, 'canvas')
+    print("✓ Render modes choose WebGL as configured.")
+
+
+def test_time_series_figure_trace_type():
+    """Test that the time series uses WebGL traces only when asked to."""
+    print("Testing time-series traces...")
+    columns = {'new_cases': 'new_cases_smoothed', 'new_deaths': 'new_deaths_smoothed'}
+    fig, points_in, points_out = time_series_figure(_daily(30), columns, '7-day (OWID)', 'webgl')
+    assert [trace.type for trace in fig.data] == ['scattergl', 'scattergl']
+    assert points_in == points_out == 60
+    fig, _, _ = time_series_figure(_daily(30), columns, '7-day (OWID)', 'auto')
+    assert [trace.type for trace in fig.data] == ['scatter', 'scatter']
+    print("✓ Time-series traces follow the render mode.")
+
+
+def test_figure_cache_is_keyed_by_version_and_filter_state():
+    """Test that figures are reused for equal keys and rebuilt when the version or options change."""
+    print("Testing figure cache keys...")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return object()
+
+    cache = FigureCache(maxsize=4)
+    key = DashboardData.filter_key('2021-01-01', '2021-02-01', 'All')
+    fig = cache.get('chart', 'v1', key, build, 'svg')
+    assert cache.get('chart', 'v1', DashboardData.filter_key(pd.Timestamp('2021-01-01'), '2021-02-01'), build,
+                     'svg') is fig
+    assert len(builds) == 1
+    assert cache.get('chart', 'v2', key, build, 'svg') is not fig
+    assert cache.get('chart', 'v1', key, build, 'webgl') is not fig
+    assert len(builds) == 3
+    print("✓ Figure cache is keyed by version, filter state and options.")
+
+
+def test_smoothing_windows_on_schema_loaded_data(tmp_path):
+    """Test that the loader keeps the daily columns the custom smoothing windows are computed from."""
+    print("Testing smoothing on schema-loaded data...")
+    csv_path = write_owid_csv(str(tmp_path / 'owid.csv'), n_locations=10, n_days=60)
+    dataset = CovidDataset(fetch_covid_data(csv_path, use_cache=False, schema=COVID_SCHEMA))
+    data = DashboardData(dataset.countries)
+    columns = {metric: smoothed_column(metric, 14) for metric in TIME_SERIES_METRICS}
+    assert set(columns.values()) <= set(data.frame.columns)
+
+    daily = data.cube.totals(data.min_date, data.max_date, 'All')
+    fig, _, _ = time_series_figure(daily.set_index('date'), columns, '14-day')
+    assert len(fig.data) == 2
+    print("✓ Custom smoothing windows work on schema-loaded data.")
+
+
+def test_figure_cache_shared_between_threads():
+    """Test that sessions sharing a figure cache from several threads get their own figures."""
+    print("Testing shared figure cache...")
+    cache = FigureCache(maxsize=2)
+    built = []
+
+    def session(figure_id):
+        for version in range(50):
+            figure = cache.get(figure_id, str(version % 3), (), lambda: built.append(figure_id) or figure_id)
+            assert figure == figure_id
+
+    threads = [threading.Thread(target=session, args=(figure_id,)) for figure_id in ('deaths', 'cases', 'map')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache.cache) <= 2 and len(built) == cache.cache.misses
+    print("✓ Figure cache is safe to share between threads.")
+
+
+def main():
+    """Run all tests."""
+    test_use_webgl_modes()
+    test_time_series_figure_trace_type()
+    test_figure_cache_is_keyed_by_version_and_filter_state()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_smoothing_windows_on_schema_loaded_data(pathlib.Path(tmp))
+    test_figure_cache_shared_between_threads()
+
+
+if __name__ == "__main__":
+    main()
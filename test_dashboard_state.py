@@ -0,0 +1,140 @@
+"""
+Test the dashboard filter-state computation and its LRU cache.
+"""
+import datetime
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dashboard_state import DashboardData, LRUCache, get_page, page_count
+from data_processor import get_latest_data_by_country
+from synthetic_data import generate_country_sample
+
+
+def test_filter_state_matches_row_filter():
+    """Test that binary-search slicing matches the per-row date filter."""
+    print("Testing dashboard filter state...")
+    df = generate_country_sample()
+    data = DashboardData(df)
+    start, end = datetime.date(2021, 1, 15), datetime.date(2021, 2, 20)
+
+    expected = df[(df['date'].dt.date >= start) & (df['date'].dt.date <= end)]
+    expected = expected[expected['continent'] == 'Asia']
+    state = data.filter_state(start, end, 'Asia')
+
+    assert sorted(state.df_countries.index) == sorted(expected.index)
+    expected_latest = get_latest_data_by_country(state.df_countries)
+    assert sorted(state.latest_data.index) == sorted(expected_latest.index)
+    # Sums come from the continent x date cube, so float32 rounding can differ in the last digits
+    assert np.isclose(state.daily_data['new_cases_smoothed'].sum(), expected['new_cases_smoothed'].sum(), rtol=1e-5)
+    assert state.daily_data['date'].tolist() == sorted(expected['date'].unique())
+    print("✓ Filter state matches the row-wise filter.")
+
+
+def test_filter_state_is_cached():
+    """Test that re-selecting a filter state is served from the cache."""
+    print("Testing dashboard filter cache...")
+    data = DashboardData(generate_country_sample(), cache_size=2)
+    start, end = datetime.date(2021, 1, 1), datetime.date(2021, 3, 1)
+    first = data.filter_state(start, end, 'All')
+    data.filter_state(start, end, 'Europe')
+    assert data.filter_state(start, end, 'All') is first
+    assert data.cache.hits == 1 and data.cache.misses == 2
+    print("✓ Filter states are cached.")
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    print("Testing LRU eviction...")
+    cache = LRUCache(2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('c', lambda: 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    print("✓ Least recently used entry is evicted first.")
+
+
+def test_lru_shared_between_threads():
+    """Test that concurrent lookups and evictions neither fail nor mix up values."""
+    print("Testing LRU cache across threads...")
+    cache = LRUCache(4)
+    errors = []
+
+    def compute(key):
+        time.sleep(0.0001)
+        return key * 10
+
+    def session(offset):
+        try:
+            for i in range(200):
+                key = (i + offset) % 7
+                assert cache.get_or_compute(key, lambda: compute(key)) == key * 10
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(offset,)) for offset in range(8)]
+    # Switch threads as often as possible so unsynchronized accesses would interleave
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == [] and len(cache) <= 4
+    assert cache.hits + cache.misses == 8 * 200
+    print("✓ Concurrent lookups keep values consistent.")
+
+
+def test_lru_concurrent_miss_returns_stored_value():
+    """Test that a miss computed while another thread stored the key returns the stored value."""
+    print("Testing concurrent LRU misses...")
+    cache = LRUCache(2)
+    computing, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        computing.set()
+        release.wait(5)
+        return ['slow']
+
+    thread = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+    thread.start()
+    computing.wait(5)
+    # The slow computation does not hold up the cache meanwhile
+    stored = cache.get_or_compute('k', lambda: ['fast'])
+    release.set()
+    thread.join()
+    assert results[0] is stored and cache.get_or_compute('k', list) is stored
+    print("✓ Concurrent misses return the stored value.")
+
+
+def test_pagination():
+    """Test that pages cover the rows once, in order, with the chosen columns."""
+    print("Testing pagination...")
+    df = generate_country_sample()
+    assert page_count(len(df), 150) == 3 and page_count(0, 150) == 1
+    pages = [get_page(df, page, 150, ['location', 'date']) for page in range(1, 4)]
+    assert pd.concat(pages).equals(df[['location', 'date']])
+    assert get_page(df, 99, 150).equals(df.iloc[300:])
+    print("✓ Pages cover all rows in order.")
+
+
+def main():
+    """Run all tests."""
+    test_filter_state_matches_row_filter()
+    test_filter_state_is_cached()
+    test_lru_eviction()
+    test_lru_shared_between_threads()
+    test_lru_concurrent_miss_returns_stored_value()
+    test_pagination()
+
+
+if __name__ == "__main__":
+    main()
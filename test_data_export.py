@@ -0,0 +1,95 @@
+"""
+Test the chunked CSV and Parquet exports.
+"""
+import gzip
+import io
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_export import export_bytes, export_file, write_export
+
+
+def _sample_frame(n=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'location': pd.Categorical(rng.choice(['France', 'Japan', 'Côte d\'Ivoire'], n)),
+        'date': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'new_cases_smoothed': rng.random(n).astype('float32'),
+    })
+
+
+def test_csv_gz_export_round_trips_across_chunks():
+    """Test that a gzip CSV written in chunks reads back as the selected columns."""
+    print("Testing csv.gz export...")
+    df = _sample_frame()
+    data = export_bytes(df, 'csv.gz', columns=['location', 'new_cases_smoothed'], chunksize=128)
+    result = pd.read_csv(io.BytesIO(gzip.decompress(data)))
+    assert list(result.columns) == ['location', 'new_cases_smoothed']
+    assert len(result) == len(df)
+    assert result['location'].tolist() == df['location'].astype(str).tolist()
+    np.testing.assert_allclose(result['new_cases_smoothed'], df['new_cases_smoothed'], rtol=1e-6)
+    print("✓ csv.gz exports round-trip across chunks.")
+
+
+def test_csv_export_matches_compressed_export():
+    """Test that plain CSV matches the decompressed csv.gz and DataFrame.to_csv."""
+    print("Testing CSV export...")
+    df = _sample_frame()
+    data = export_bytes(df, 'csv', chunksize=128)
+    assert data == gzip.decompress(export_bytes(df, 'csv.gz', chunksize=128))
+    assert data == df.to_csv(index=False).encode('utf-8')
+    print("✓ CSV export matches the compressed export.")
+
+
+def test_parquet_export_writes_one_row_group_per_chunk():
+    """Test that Parquet exports get one row group per chunk and read back unchanged."""
+    print("Testing Parquet export...")
+    import pyarrow.parquet as pq
+
+    df = _sample_frame()
+    buffer = write_export(df, io.BytesIO(), 'parquet', chunksize=300)
+    buffer.seek(0)
+    assert pq.ParquetFile(buffer).metadata.num_row_groups == 4
+    buffer.seek(0)
+    pd.testing.assert_frame_equal(pd.read_parquet(buffer), df, check_dtype=False, check_categorical=False)
+    print("✓ Parquet export writes one row group per chunk.")
+
+
+def test_unknown_format_is_rejected():
+    """Test that an unknown export format raises ValueError."""
+    print("Testing unknown export formats...")
+    with pytest.raises(ValueError):
+        export_bytes(_sample_frame(10), 'xlsx')
+    print("✓ Unknown export formats are rejected.")
+
+
+def test_export_file_matches_in_memory_export(tmp_path):
+    """Test that a file export matches the in-memory one and a failed export leaves no file."""
+    print("Testing file exports...")
+    df = _sample_frame()
+    path = export_file(df, 'csv.gz', chunksize=128, directory=str(tmp_path))
+    assert path.endswith('.csv.gz') and os.path.dirname(path) == str(tmp_path)
+    with open(path, 'rb') as f:
+        assert gzip.decompress(f.read()) == gzip.decompress(export_bytes(df, 'csv.gz', chunksize=128))
+    with pytest.raises(ValueError):
+        export_file(df, 'xlsx', directory=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    print("✓ File exports match in-memory exports.")
+
+
+def main():
+    """Run all tests."""
+    test_csv_gz_export_round_trips_across_chunks()
+    test_csv_export_matches_compressed_export()
+    test_parquet_export_writes_one_row_group_per_chunk()
+    test_unknown_format_is_rejected()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_export_file_matches_in_memory_export(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Test the LTTB and min/max downsampling of chart series.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsampling import downsample_series, lttb_indices, minmax_indices, reduction_ratio
+
+
+def _series(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.abs(rng.normal(size=n).cumsum())
+    values[n // 4] = values.max() * 10  # a one-day spike
+    values[10:20] = np.nan
+    return pd.Series(values, index=pd.date_range('2020-01-01', periods=n))
+
+
+def test_downsampling_keeps_endpoints_and_peak():
+    """Test that both methods keep the first and last points and a one-day spike."""
+    print("Testing downsampling...")
+    series = _series()
+    for method in ('lttb', 'minmax'):
+        reduced = downsample_series(series, 500, method)
+        assert len(reduced) <= 500
+        assert reduced.index.is_monotonic_increasing
+        assert reduced.notna().all()
+        assert reduced.index[0] == series.index[0] and reduced.index[-1] == series.index[-1]
+        assert series.idxmax() in reduced.index
+        assert (reduced == series.loc[reduced.index]).all()
+    print("✓ Downsampling keeps endpoints and peaks.")
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    """Test that min/max downsampling keeps the extremes of every bucket."""
+    print("Testing min/max buckets...")
+    y = np.random.default_rng(1).normal(size=1000)
+    kept = minmax_indices(y, 102)
+    for bucket in np.array_split(np.arange(1000), 50):
+        assert y[bucket].argmax() + bucket[0] in kept
+        assert y[bucket].argmin() + bucket[0] in kept
+    print("✓ Min/max keeps every bucket extreme.")
+
+
+def test_short_series_and_disabled_method_are_untouched():
+    """Test that short series and a disabled method are returned as they are."""
+    print("Testing downsampling pass-through...")
+    series = _series(100)
+    assert downsample_series(series, 500, 'lttb') is series
+    assert downsample_series(_series(), 500, None).equals(_series())
+    assert len(lttb_indices(np.arange(10.0), np.ones(10), 20)) == 10
+    with pytest.raises(ValueError):
+        downsample_series(_series(), 500, 'mean')
+    print("✓ Short series and disabled downsampling are untouched.")
+
+
+def test_reduction_ratio():
+    """Test the fraction of points removed."""
+    print("Testing reduction ratio...")
+    assert reduction_ratio(1000, 250) == 0.75
+    assert reduction_ratio(0, 0) == 0.0
+    print("✓ Reduction ratio is correct.")
+
+
+def main():
+    """Run all tests."""
+    test_downsampling_keeps_endpoints_and_peak()
+    test_minmax_keeps_every_bucket_extreme()
+    test_short_series_and_disabled_method_are_untouched()
+    test_reduction_ratio()
+
+
+if __name__ == "__main__":
+    main()
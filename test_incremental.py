@@ -0,0 +1,78 @@
+"""
+Test that incremental ingestion matches a full recompute.
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalAggregates
+
+
+def _sample_data(n_days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = [('France', 'Europe'), ('Spain', 'Europe'), ('Japan', 'Asia'), ('Chad', 'Africa')]
+    rows = []
+    for day in pd.date_range('2021-01-01', periods=n_days):
+        for location, continent in countries:
+            rows.append((continent, location, day, rng.random() * 1000, np.nan))
+        for location in ('Europe', 'Asia', 'World'):
+            rows.append((np.nan, location, day, np.nan, rng.random() * 1e5))
+    df = pd.DataFrame(rows, columns=['continent', 'location', 'date',
+                                     'total_deaths_per_million', 'new_cases_smoothed'])
+    # A country whose latest value is missing must not count towards the mean
+    df.loc[(df['location'] == 'Chad') & (df['date'] == df['date'].max()), 'total_deaths_per_million'] = np.nan
+    return df
+
+
+def test_incremental_matches_full():
+    """Test that applying daily deltas gives the same aggregates as a full recompute."""
+    print("Testing incremental ingestion...")
+    df = _sample_data()
+    state = IncrementalAggregates()
+    for cutoff in pd.date_range('2021-01-10', periods=21):
+        # Each run sees the whole file as of that day, like the nightly job
+        state.apply(df[df['date'] <= cutoff])
+        assert state.verify(df[df['date'] <= cutoff]) == []
+    assert state.rows_ingested == len(df)
+    assert state.apply(df) == 0
+    print("✓ Incremental ingestion matches the full recompute.")
+
+
+def _nightly_file(path, days_per_country):
+    """Write a file sorted by location like the OWID export, with the given number of days per country."""
+    rows = []
+    for (location, continent), n_days in days_per_country.items():
+        for i, day in enumerate(pd.date_range('2021-01-01', periods=n_days)):
+            rows.append((continent, location, day.date(), 10.0 * (i + 1) + len(location), np.nan))
+    for day in pd.date_range('2021-01-01', periods=max(days_per_country.values())):
+        rows.append((np.nan, 'Europe', day.date(), np.nan, float(day.day)))
+    pd.DataFrame(rows, columns=['continent', 'location', 'date', 'total_deaths_per_million',
+                                'new_cases_smoothed']).to_csv(path, index=False)
+
+
+def test_incremental_rereads_growing_file(tmp_path):
+    """Test that runs over freshly read files, whose row labels repeat across runs, stay correct."""
+    print("Testing incremental ingestion over re-read files...")
+    path = tmp_path / 'owid.csv'
+    state = IncrementalAggregates()
+    # Countries grow unevenly, so one country's stale row label is reused by another's new row
+    for aland, bhutan in ((10, 3), (13, 3), (15, 3), (16, 4), (17, 5)):
+        _nightly_file(path, {('Aland', 'Europe'): aland, ('Bhutan', 'Asia'): bhutan})
+        df = pd.read_csv(path, parse_dates=['date'])
+        state.apply(df)
+        assert state.verify(df) == []
+        assert sorted(state.latest_data['location']) == ['Aland', 'Bhutan']
+    print("✓ Re-read files give the same aggregates as a full recompute.")
+
+
+def main():
+    """Run all tests."""
+    test_incremental_matches_full()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incremental_rereads_growing_file(Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Test the stage tracer, its exports and its memory tracing.
+"""
+import json
+import pathlib
+import tempfile
+import threading
+import tracemalloc
+
+import pandas as pd
+
+from instrumentation import Tracer, memory_tracing, stage, traced
+
+
+@traced()
+def _make_frame(n):
+    with stage('inner'):
+        return pd.DataFrame({'x': range(n)})
+
+
+def test_disabled_tracing_is_a_no_op():
+    """Test that traced functions and stages run normally without a tracer."""
+    print("Testing disabled tracing...")
+    result = _make_frame(3)
+    assert len(result) == 3
+    with stage('unused') as handle:
+        handle.set_rows(1)
+    print("✓ Disabled tracing is a no-op.")
+
+
+def test_nested_stages_are_recorded_with_rows():
+    """Test that nested stages are recorded with their depth, rows, time and memory."""
+    print("Testing nested stages...")
+    with Tracer() as tracer:
+        _make_frame(5)
+    records = {record['name']: record for record in tracer.summary()}
+    assert [record['name'] for record in tracer.summary()] == ['_make_frame', 'inner']
+    assert records['_make_frame']['depth'] == 0
+    assert records['inner']['depth'] == 1
+    assert records['_make_frame']['rows'] == 5
+    assert records['inner']['rows'] is None
+    assert records['_make_frame']['wall_seconds'] >= records['inner']['wall_seconds']
+    assert records['_make_frame']['peak_mb'] >= 0
+    print("✓ Nested stages are recorded with rows.")
+
+
+def test_tracer_only_sees_its_own_block():
+    """Test that a tracer records only the stages run inside its block."""
+    print("Testing tracer scope...")
+    with Tracer(trace_memory=False) as tracer:
+        _make_frame(1)
+    _make_frame(1)
+    assert len(tracer.records) == 2
+    assert 'peak_mb' not in tracer.records[0]
+    print("✓ A tracer only sees its own block.")
+
+
+def test_exports(tmp_path):
+    """Test the JSON and Chrome trace exports."""
+    print("Testing profile exports...")
+    with Tracer() as tracer:
+        _make_frame(2)
+    stages = json.loads(open(tracer.export_json(tmp_path / 'profile.json')).read())['stages']
+    assert len(stages) == 2
+    trace = json.loads(open(tracer.export_chrome_trace(tmp_path / 'trace.json')).read())
+    events = trace['traceEvents']
+    assert {event['ph'] for event in events} == {'X'}
+    assert events[0]['name'] == '_make_frame'
+    assert events[0]['args']['rows'] == 2
+    assert events[0]['dur'] >= events[1]['dur']
+    print("✓ Profiles export as JSON and Chrome traces.")
+
+
+def test_overlapping_tracers_share_tracemalloc():
+    """Test that a session finishing first does not stop memory tracing under another one still running."""
+    print("Testing overlapping tracers...")
+    first_entered, second_entered, first_exited = threading.Event(), threading.Event(), threading.Event()
+
+    def first_session():
+        with Tracer():
+            first_entered.set()
+            second_entered.wait(5)
+        first_exited.set()
+
+    was_tracing = tracemalloc.is_tracing()
+    thread = threading.Thread(target=first_session)
+    thread.start()
+    first_entered.wait(5)
+    with Tracer() as tracer:
+        second_entered.set()
+        first_exited.wait(5)
+        tracing = tracemalloc.is_tracing()
+        _make_frame(3)
+    thread.join()
+    assert tracing and tracer.records[0]['peak_mb'] > 0
+    assert tracemalloc.is_tracing() == was_tracing
+    print("✓ Overlapping tracers share tracemalloc.")
+
+
+def test_overlapped_stages_report_no_peak():
+    """Test that stages overlapping another tracer report no peak, as tracemalloc has one process-wide peak."""
+    print("Testing overlapped memory peaks...")
+    entered, release = threading.Event(), threading.Event()
+
+    def other_session():
+        with Tracer():
+            entered.set()
+            release.wait(5)
+
+    with Tracer() as tracer:
+        with stage('overlapped'):
+            thread = threading.Thread(target=other_session)
+            thread.start()
+            entered.wait(5)
+            _make_frame(2)
+            release.set()
+            thread.join()
+        with stage('alone'):
+            _make_frame(2)
+    records = tracer.summary()
+    alone = next(i for i, record in enumerate(records) if record['name'] == 'alone')
+    assert records[0]['name'] == 'overlapped'
+    assert all(record['peak_mb'] is None for record in records[:alone])
+    assert all(record['peak_mb'] is not None for record in records[alone:])
+    assert records[alone]['peak_mb'] > 0
+    assert 'peak=' not in tracer.format_table().splitlines()[0]
+    print("✓ Overlapped stages report no memory peak.")
+
+
+def test_memory_tracing_shares_tracemalloc_with_tracers():
+    """Test that memory_tracing leaves an active tracer's memory tracing running."""
+    print("Testing memory_tracing...")
+    with Tracer() as tracer:
+        with memory_tracing() as peak:
+            _make_frame(2)
+            assert peak() is None
+        assert tracemalloc.is_tracing()
+        _make_frame(2)
+    assert tracer.records[-1]['peak_mb'] is not None
+
+    with memory_tracing() as peak:
+        data = list(range(100000))
+        assert peak() > 0
+    del data
+    print("✓ memory_tracing shares tracemalloc with tracers.")
+
+
+def main():
+    """Run all tests."""
+    test_disabled_tracing_is_a_no_op()
+    test_nested_stages_are_recorded_with_rows()
+    test_tracer_only_sees_its_own_block()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_exports(pathlib.Path(tmp))
+    test_overlapping_tracers_share_tracemalloc()
+    test_overlapped_stages_report_no_peak()
+    test_memory_tracing_shares_tracemalloc_with_tracers()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Test the (location, date) index against the groupby implementation.
+"""
+import numpy as np
+import pandas as pd
+
+from data_processor import LocationDateIndex, get_latest_data_by_country
+
+
+def _sample_countries(seed=0):
+    rng = np.random.default_rng(seed)
+    n = 500
+    df = pd.DataFrame({
+        'location': rng.choice(['France', 'Japan', 'Peru', 'Chad', 'Fiji'], n),
+        'date': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D'),
+        'total_deaths_per_million': rng.random(n),
+    })
+    df['location'] = df['location'].astype('category')
+    df.index = rng.permutation(n) + 1000
+    return df
+
+
+def test_latest_matches_groupby():
+    """Test that latest() returns the same rows as groupby().idxmax()."""
+    print("Testing LocationDateIndex.latest...")
+    df = _sample_countries()
+    expected = df.loc[df.groupby('location', observed=True)['date'].idxmax()]
+    index = LocationDateIndex(df)
+    pd.testing.assert_frame_equal(index.latest(), expected)
+    pd.testing.assert_frame_equal(get_latest_data_by_country(df, index=index), expected)
+    print("✓ latest() matches groupby.")
+
+
+def test_as_of_matches_filtered_groupby():
+    """Test that as_of() matches filtering by date before the groupby."""
+    print("Testing LocationDateIndex.as_of...")
+    df = _sample_countries(seed=1)
+    index = LocationDateIndex(df)
+    for date in ['2020-12-01', '2021-01-01', '2021-01-20', '2021-02-15', '2022-01-01']:
+        subset = df[df['date'] <= date]
+        expected = subset.loc[subset.groupby('location', observed=True)['date'].idxmax()]
+        pd.testing.assert_frame_equal(index.as_of(date), expected)
+    print("✓ as_of() matches filtered groupby.")
+
+
+def main():
+    """Run all tests."""
+    test_latest_matches_groupby()
+    test_as_of_matches_filtered_groupby()
+
+
+if __name__ == "__main__":
+    main()
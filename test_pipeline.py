@@ -0,0 +1,97 @@
+"""
+Test the dependency graph of the visualization pipeline.
+"""
+import pytest
+
+from pipeline import Pipeline, build_covid_pipeline
+from query_backend import QueryBackend
+
+
+def _counting_pipeline(calls):
+    def step(name, func):
+        def run(*args):
+            calls.append(name)
+            return func(*args)
+        return run
+
+    return (Pipeline()
+            .add('raw', step('raw', lambda: [3, 1, 2]))
+            .add('sorted', step('sorted', sorted), ['raw'])
+            .add('total', step('total', sum), ['sorted'])
+            .add('largest', step('largest', max), ['sorted'])
+            .add('unused', step('unused', len), ['raw'])
+            .chart('total_chart', str, ['total'])
+            .chart('largest_chart', repr, ['largest']))
+
+
+def test_shared_intermediates_run_once():
+    """Test that an intermediate shared by two charts runs once and unused nodes never run."""
+    print("Testing shared intermediates...")
+    calls = []
+    run = _counting_pipeline(calls).start()
+    results = run.compute(['total_chart', 'largest_chart'], processes=1)
+    assert results == {'total_chart': '6', 'largest_chart': '3'}
+    # 'sorted' feeds both charts but runs once; 'unused' is never needed
+    assert calls == ['raw', 'sorted', 'total', 'largest']
+    assert run.executed == ['raw', 'sorted', 'total', 'largest', 'total_chart', 'largest_chart']
+    assert run['total'] == 6 and calls.count('total') == 1
+    print("✓ Shared intermediates run once.")
+
+
+def test_supplied_values_replace_their_nodes():
+    """Test that supplied values replace their nodes and everything upstream of them."""
+    print("Testing supplied values...")
+    calls = []
+    pipeline = _counting_pipeline(calls)
+    assert pipeline.plan(['total_chart'], provided={'sorted'}) == ['sorted', 'total', 'total_chart']
+    assert pipeline.run(['total_chart'], values={'sorted': [10, 20]}, processes=1) == {'total_chart': '30'}
+    assert calls == ['total']
+    print("✓ Supplied values replace their nodes.")
+
+
+def test_graph_is_validated():
+    """Test that duplicate names, unknown inputs, chart inputs and unknown targets are rejected."""
+    print("Testing graph validation...")
+    pipeline = Pipeline().add('a', lambda: 1).chart('a_chart', str, ['a'])
+    with pytest.raises(ValueError):
+        pipeline.add('a', lambda: 2)
+    with pytest.raises(ValueError):
+        pipeline.add('b', len, ['missing'])
+    with pytest.raises(ValueError):
+        pipeline.add('c', len, ['a_chart'])
+    with pytest.raises(KeyError):
+        pipeline.plan(['missing'])
+    print("✓ The graph is validated.")
+
+
+def test_engine_answers_aggregates_without_loading_dataset():
+    """Test that with a query engine the aggregates come from it, without loading the dataset."""
+    print("Testing engine-backed pipeline...")
+    class Engine(QueryBackend):
+        def latest_by_country(self, columns=None):
+            return 'latest'
+
+        def continent_means(self, column='total_deaths_per_million'):
+            return 'means'
+
+        def continent_pivot(self, locations=('Europe', 'Asia'), values='new_cases_smoothed'):
+            return 'pivot'
+
+    pipeline = build_covid_pipeline(Engine('owid.parquet'))
+    assert set(pipeline.plan(['continent_deaths', 'cases_pivot'])) == {'continent_deaths', 'cases_pivot'}
+    run = pipeline.start()
+    assert run['continent_deaths'] == 'means' and run['cases_pivot'] == 'pivot'
+    assert 'dataset' not in run.executed
+    print("✓ The engine answers the aggregates without loading the dataset.")
+
+
+def main():
+    """Run all tests."""
+    test_shared_intermediates_run_once()
+    test_supplied_values_replace_their_nodes()
+    test_graph_is_validated()
+    test_engine_answers_aggregates_without_loading_dataset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Test the embedded query engines against the pandas pipeline.
+"""
+import pathlib
+import tempfile
+
+import pandas as pd
+import pytest
+
+from data_fetcher import CovidDataset
+from data_processor import calculate_continent_deaths, get_latest_data_by_country, pivot_continent_data
+from query_backend import QueryBackend, get_backend
+from schema import read_csv_options
+from snapshot_cache import SnapshotCache
+from synthetic_data import write_owid_csv
+
+
+def _snapshot(directory):
+    csv_path = write_owid_csv(str(directory / 'owid.csv'), n_locations=30, n_days=60)
+    return SnapshotCache(str(directory)).snapshot_path(csv_path, read_csv_options())
+
+
+def test_backend_matches_pandas(tmp_path):
+    """Test that every installed backend gives the pandas pipeline's latest rows, means and pivot."""
+    print("Testing query backends...")
+    snapshot = _snapshot(tmp_path)
+    dataset = CovidDataset(pd.read_parquet(snapshot))
+    latest_data = get_latest_data_by_country(dataset.countries)
+    loose = dict(check_dtype=False, check_categorical=False, check_index_type=False)
+
+    for name in ('arrow', 'duckdb'):
+        try:
+            engine = get_backend(name, snapshot)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        result = engine.latest_by_country()
+        expected = latest_data[result.columns].sort_values('location').reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, **loose)
+        pd.testing.assert_series_equal(engine.continent_means(), calculate_continent_deaths(latest_data),
+                                       check_names=False, **loose)
+        pd.testing.assert_frame_equal(engine.continent_pivot(), pivot_continent_data(dataset.continents()),
+                                      check_column_type=False, check_names=False, **loose)
+    print("✓ Query backends match pandas.")
+
+
+def test_snapshot_path_does_not_reread_current_snapshot(tmp_path):
+    """Test that a current snapshot is handed to the engines without reading it."""
+    print("Testing snapshot paths...")
+    csv_path = write_owid_csv(str(tmp_path / 'owid.csv'), n_locations=3, n_days=5)
+    cache = SnapshotCache(str(tmp_path / 'cache'))
+    path = cache.snapshot_path(csv_path, read_csv_options())
+    assert path.endswith('.parquet') and cache.stats == {'hits': 0, 'misses': 1, 'stale': 0, 'errors': 0}
+    assert cache.snapshot_path(csv_path, read_csv_options()) == path
+    assert cache.stats['hits'] == 1
+    print("✓ Current snapshots are not re-read.")
+
+
+def test_query_backend_is_abstract():
+    """Test that the QueryBackend base class cannot be instantiated."""
+    print("Testing the abstract backend...")
+    with pytest.raises(TypeError):
+        QueryBackend('owid.parquet')
+    print("✓ QueryBackend is abstract.")
+
+
+def test_arrow_threads_do_not_resize_process_pool(tmp_path):
+    """Test that an Arrow backend's thread setting leaves Arrow's process-wide pool alone."""
+    print("Testing Arrow threads...")
+    import pyarrow as pa
+
+    snapshot = _snapshot(tmp_path)
+    cpu_count = pa.cpu_count()
+    backend = get_backend('arrow', snapshot, threads=cpu_count + 1)
+    backend.latest_by_country()
+    assert pa.cpu_count() == cpu_count
+    print("✓ Arrow threads do not resize the process pool.")
+
+
+def main():
+    """Run all tests."""
+    with tempfile.TemporaryDirectory() as tmp:
+        test_backend_matches_pandas(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_snapshot_path_does_not_reread_current_snapshot(pathlib.Path(tmp))
+    test_query_backend_is_abstract()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_arrow_threads_do_not_resize_process_pool(pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
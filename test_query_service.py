@@ -0,0 +1,133 @@
+"""
+Test the asyncio query service over a local socket.
+"""
+import asyncio
+import json
+import os
+import pathlib
+import tempfile
+import time
+import urllib.parse
+
+import pandas as pd
+
+from data_fetcher import CovidDataset
+from data_processor import calculate_continent_deaths, get_latest_data_by_country
+import query_service
+from query_service import QueryService, ServiceClient
+from schema import read_csv_options
+from synthetic_data import write_owid_csv
+
+
+def _serve(source, scenario):
+    async def run():
+        service = QueryService(source, use_cache=False, reload_interval=None)
+        server = await service.start('127.0.0.1', 0)
+        client = ServiceClient('127.0.0.1', server.sockets[0].getsockname()[1])
+        try:
+            return await scenario(service, client)
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(run())
+
+
+def test_queries_match_pipeline_and_revalidate(tmp_path):
+    """Test that responses match the pandas pipeline, revalidate with ETags and reject bad queries."""
+    print("Testing query service responses...")
+    csv_path = write_owid_csv(str(tmp_path / 'owid.csv'), n_locations=20, n_days=40)
+    latest_data = get_latest_data_by_country(CovidDataset(pd.read_csv(csv_path, **read_csv_options())).countries)
+    locations = list(latest_data['location'].iloc[:2])
+    target = '/latest?' + urllib.parse.urlencode({'location': locations, 'columns': 'date,total_cases'}, doseq=True)
+
+    async def scenario(service, client):
+        status, headers, body = await client.get(target)
+        expected = latest_data[latest_data['location'].isin(locations)][['location', 'date', 'total_cases']]
+        assert status == 200 and json.loads(body) == json.loads(expected.to_json(orient='records', date_format='iso'))
+        assert (await client.get(target, {'If-None-Match': headers['etag']}))[0] == 304
+
+        status, _, body = await client.get('/continents')
+        assert status == 200
+        assert json.loads(body) == json.loads(calculate_continent_deaths(latest_data).to_json(orient='index'))
+        assert (await client.get('/latest?columns=nope'))[0] == 400
+        assert (await client.get('/continents?statistic=mode'))[0] == 400
+        assert (await client.get('/missing'))[0] == 404
+        await client.get('/continents')
+        return service.responses.hits
+
+    # The revalidation and the repeated /continents query are answered from the response cache
+    assert _serve(csv_path, scenario) == 2
+    print("✓ Query service responses match the pipeline.")
+
+
+def test_new_snapshot_is_hot_reloaded(tmp_path):
+    """Test that a changed source is reloaded and served under a new ETag."""
+    print("Testing hot reload...")
+    csv_path = str(tmp_path / 'owid.csv')
+    write_owid_csv(csv_path, n_locations=5, n_days=10)
+
+    async def scenario(service, client):
+        _, before, body = await client.get('/series')
+        version = service.state.version
+        assert not await service.reload()
+
+        write_owid_csv(csv_path, n_locations=5, n_days=20)
+        os.utime(csv_path, ns=(1, 1))
+        assert await service.reload() and service.state.version != version
+        _, after, reloaded = await client.get('/series', {'If-None-Match': before['etag']})
+        assert len(json.loads(reloaded)['index']) == 2 * len(json.loads(body)['index'])
+        return after['etag'] != before['etag']
+
+    assert _serve(csv_path, scenario)
+    print("✓ New snapshots are hot-reloaded.")
+
+
+def test_slow_query_does_not_block_other_connections(tmp_path):
+    """Test that a slow uncached query leaves other connections responsive and runs once."""
+    print("Testing slow queries...")
+    csv_path = write_owid_csv(str(tmp_path / 'owid.csv'), n_locations=3, n_days=5)
+
+    def slow_endpoint(state, params):
+        time.sleep(0.5)
+        return '[]'
+
+    async def scenario(service, client):
+        second = ServiceClient(client.host, client.port)
+        other = ServiceClient(client.host, client.port)
+        try:
+            slow = asyncio.ensure_future(
+                asyncio.gather(client.get('/slow'), second.get('/slow')))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            status, _, _ = await other.get('/continents')
+            fast_seconds = time.perf_counter() - start
+            statuses = [status for status, _, _ in await slow]
+        finally:
+            await second.close()
+            await other.close()
+        return status, fast_seconds, statuses, service.responses.misses
+
+    query_service.ENDPOINTS['/slow'] = slow_endpoint
+    try:
+        status, fast_seconds, statuses, misses = _serve(csv_path, scenario)
+    finally:
+        del query_service.ENDPOINTS['/slow']
+    assert status == 200 and fast_seconds < 0.4
+    # Both slow requests were answered by one computation
+    assert statuses == [200, 200] and misses == 2
+    print("✓ Slow queries do not block other connections.")
+
+
+def main():
+    """Run all tests."""
+    with tempfile.TemporaryDirectory() as tmp:
+        test_queries_match_pipeline_and_revalidate(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_new_snapshot_is_hot_reloaded(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_slow_query_does_not_block_other_connections(pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Test chart rendering through the render engine.
+"""
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+import render_cache
+from render_cache import RenderCache, get_render_cache, set_render_cache
+from render_engine import ChartJob, RenderTarget, render_bytes, render_jobs
+from visualizer import create_deaths_by_continent_chart, create_cases_comparison_chart
+
+
+def _jobs(directory):
+    continent_deaths = pd.Series({'Europe': 3000.0, 'Asia': 500.0, 'Africa': 200.0})
+    df_pivot = pd.DataFrame({'Europe': [1.0, 2.0, 3.0], 'Asia': [3.0, 2.0, 1.0]},
+                            index=pd.date_range('2021-01-01', periods=3))
+    return [
+        ChartJob(create_deaths_by_continent_chart, (continent_deaths, os.path.join(directory, 'deaths.png'))),
+        ChartJob(create_cases_comparison_chart, (df_pivot,), {'filename': os.path.join(directory, 'cases.png')}),
+    ]
+
+
+def _read_all(paths):
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+
+def test_parallel_output_matches_sequential():
+    """Test that a process pool renders the same files as rendering in-process."""
+    print("Testing parallel rendering...")
+    previous_cache = get_render_cache()
+    set_render_cache(None)
+    try:
+        with tempfile.TemporaryDirectory() as sequential_dir, tempfile.TemporaryDirectory() as parallel_dir:
+            sequential = render_jobs(_jobs(sequential_dir), processes=1)
+            parallel = render_jobs(_jobs(parallel_dir), processes=2)
+            assert [os.path.basename(p) for p in parallel] == ['deaths.png', 'cases.png']
+            assert _read_all(sequential) == _read_all(parallel)
+    finally:
+        set_render_cache(previous_cache)
+    print("✓ Parallel rendering is deterministic.")
+
+
+def test_render_cache_skips_identical_charts():
+    """Test that unchanged inputs reuse the rendered file and changed inputs do not."""
+    print("Testing render cache...")
+    previous_cache = get_render_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RenderCache(os.path.join(tmp, 'cache'))
+        set_render_cache(cache)
+        try:
+            continent_deaths = pd.Series({'Europe': 3000.0, 'Asia': 500.0})
+            first = os.path.join(tmp, 'first.png')
+            second = os.path.join(tmp, 'second.png')
+            create_deaths_by_continent_chart(continent_deaths, first)
+            create_deaths_by_continent_chart(continent_deaths, second)
+            assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+            assert _read_all([first]) == _read_all([second])
+
+            create_deaths_by_continent_chart(continent_deaths * 2, second)
+            assert cache.stats['misses'] == 2
+            assert _read_all([first]) != _read_all([second])
+
+            cache.max_bytes = 0
+            cache.evict()
+            assert os.listdir(cache.directory) == [] and os.path.exists(second)
+        finally:
+            set_render_cache(previous_cache)
+    print("✓ Render cache reuses identical charts.")
+
+
+def test_render_cache_outputs_are_independent_copies():
+    """Test that editing an output leaves the cache intact and helper-module changes miss."""
+    print("Testing render cache isolation...")
+    previous_cache = get_render_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RenderCache(os.path.join(tmp, 'cache'))
+        set_render_cache(cache)
+        try:
+            continent_deaths = pd.Series({'Europe': 3000.0, 'Asia': 500.0})
+            first = os.path.join(tmp, 'first.png')
+            second = os.path.join(tmp, 'second.png')
+            create_deaths_by_continent_chart(continent_deaths, first)
+            original = _read_all([first])
+            with open(first, 'r+b') as f:
+                f.write(b'edited')
+            create_deaths_by_continent_chart(continent_deaths, second)
+            assert cache.stats['hits'] == 1 and _read_all([second]) == original
+
+            # A changed helper module (e.g. downsampling) gives a new key
+            fingerprint = render_cache._module_fingerprint
+            render_cache._module_fingerprint = lambda name: 'changed' if name == 'downsampling' else fingerprint(name)
+            try:
+                create_deaths_by_continent_chart(continent_deaths, second)
+            finally:
+                render_cache._module_fingerprint = fingerprint
+            assert cache.stats['misses'] == 2
+        finally:
+            set_render_cache(previous_cache)
+    print("✓ Render cache outputs are independent copies.")
+
+
+def test_render_cache_follows_settings_and_default_format():
+    """Test that config values, rcParams and extension-less filenames are handled like uncached renders."""
+    print("Testing render cache settings...")
+    import matplotlib
+
+    import downsampling
+
+    previous_cache = get_render_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RenderCache(os.path.join(tmp, 'cache'))
+        set_render_cache(cache)
+        try:
+            continent_deaths = pd.Series({'Europe': 3000.0, 'Asia': 500.0})
+            plain = os.path.join(tmp, 'deaths')
+            create_deaths_by_continent_chart(continent_deaths, plain)
+            with open(plain, 'rb') as f:
+                assert f.read().startswith(b'\x89PNG')
+
+            with matplotlib.rc_context({'lines.linewidth': 5}):
+                create_deaths_by_continent_chart(continent_deaths, plain)
+            assert cache.stats['misses'] == 2
+
+            points_per_pixel = downsampling.DOWNSAMPLE_POINTS_PER_PIXEL
+            downsampling.DOWNSAMPLE_POINTS_PER_PIXEL = points_per_pixel * 2
+            try:
+                create_deaths_by_continent_chart(continent_deaths, plain)
+            finally:
+                downsampling.DOWNSAMPLE_POINTS_PER_PIXEL = points_per_pixel
+            assert cache.stats['misses'] == 3
+
+            create_deaths_by_continent_chart(continent_deaths, plain)
+            assert cache.stats['hits'] == 1
+        finally:
+            set_render_cache(previous_cache)
+    print("✓ Render cache keys follow settings and default to PNG.")
+
+
+def test_one_draw_renders_several_formats():
+    """Test that one chart call fills in-memory buffers and files in several formats."""
+    print("Testing multi-format rendering...")
+    continent_deaths = pd.Series({'Europe': 3000.0, 'Asia': 500.0})
+    images = render_bytes(create_deaths_by_continent_chart, continent_deaths, formats=('png', 'svg', 'pdf'))
+    assert images['png'].startswith(b'\x89PNG') and images['pdf'].startswith(b'%PDF')
+    assert b'<svg' in images['svg']
+
+    hires = render_bytes(create_deaths_by_continent_chart, continent_deaths, dpi=200)['png']
+    assert len(hires) > len(images['png'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'charts', 'deaths.svg')
+        buffer = io.BytesIO()
+        create_deaths_by_continent_chart(continent_deaths, [path, RenderTarget(buffer, 'png')])
+        assert os.path.getsize(path) > 0 and buffer.getvalue() == images['png']
+    print("✓ One draw renders several formats.")
+
+
+def main():
+    """Run all tests."""
+    test_parallel_output_matches_sequential()
+    test_render_cache_skips_identical_charts()
+    test_render_cache_outputs_are_independent_copies()
+    test_render_cache_follows_settings_and_default_format()
+    test_one_draw_renders_several_formats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Test publishing and memory-mapping shared dataset snapshots.
+"""
+import pathlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dashboard_state import DashboardData, prepare_dashboard_frame
+from shared_dataset import SharedDatasetStore
+from synthetic_data import generate_country_sample
+
+
+def test_snapshot_round_trips_zero_copy(tmp_path):
+    """Test that a published frame maps back unchanged, with float columns as views."""
+    print("Testing shared dataset mapping...")
+    df = prepare_dashboard_frame(generate_country_sample())
+    df.loc[::7, 'new_cases_smoothed'] = np.nan
+    store = SharedDatasetStore(str(tmp_path))
+    assert store.current_version() is None
+
+    version = store.publish(df)
+    mapped = store.open()
+    assert store.current_version() == version
+    pd.testing.assert_frame_equal(mapped, df, check_dtype=False, check_categorical=False)
+    assert isinstance(mapped['location'].dtype, pd.CategoricalDtype)
+
+    values = mapped['new_cases_smoothed'].to_numpy()
+    assert not values.flags.writeable and not values.flags.owndata
+    assert np.isnan(values[::7]).all()
+
+    # Already date-sorted and holding the smoothed columns, so the dashboard uses the mapping without a copy
+    assert 'new_cases_rolling_14' in mapped.columns
+    assert DashboardData(mapped).frame is mapped
+    print("✓ Shared snapshots map back without copies.")
+
+
+def test_publish_swaps_atomically_and_prunes(tmp_path):
+    """Test that readers keep their snapshot while new ones replace it."""
+    print("Testing shared dataset publishing...")
+    store = SharedDatasetStore(str(tmp_path), keep=2)
+    df = prepare_dashboard_frame(generate_country_sample())
+    first = store.publish(df)
+    old = store.open(first)
+
+    second = store.publish(df.assign(new_deaths_smoothed=df['new_deaths_smoothed'] * 2))
+    third = store.publish(df)
+    assert store.current_version() == third
+    assert sorted(path.name for path in tmp_path.glob('dataset-*.arrow')) == [
+        f"dataset-{second}.arrow", f"dataset-{third}.arrow"]
+    # The pruned snapshot is still readable through the existing mapping
+    assert old['new_deaths_smoothed'].sum() == df['new_deaths_smoothed'].sum()
+    assert not list(tmp_path.glob('*.tmp'))
+    print("✓ Publishing swaps snapshots atomically and prunes old ones.")
+
+
+def main():
+    """Run all tests."""
+    with tempfile.TemporaryDirectory() as tmp:
+        test_snapshot_round_trips_zero_copy(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_publish_swaps_atomically_and_prunes(pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
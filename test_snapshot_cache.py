@@ -0,0 +1,125 @@
+"""
+Test the on-disk snapshot cache against local sources.
+"""
+import hashlib
+import os
+import pathlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from schema import read_csv_options
+from snapshot_cache import SnapshotCache
+from synthetic_data import write_owid_csv
+
+SAMPLE_CSV = (
+    "iso_code,continent,location,date,total_deaths_per_million\n"
+    "FRA,Europe,France,2021-01-01,1000.5\n"
+    "JPN,Asia,Japan,2021-01-01,50.25\n"
+)
+
+
+class _CSVHandler(BaseHTTPRequestHandler):
+    """Serve a single CSV body with ETag support."""
+    body = SAMPLE_CSV.encode('utf-8')
+
+    def do_GET(self):
+        etag = '"%s"' % hashlib.md5(self.body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_conditional_refresh():
+    """Test that an HTTP source is only re-downloaded when its ETag changes."""
+    print("Testing HTTP snapshot cache...")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CSVHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/owid.csv"
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = SnapshotCache(cache_dir)
+            first = cache.load(url)
+            second = cache.load(url)
+            assert first.equals(second)
+            assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+
+            _CSVHandler.body = SAMPLE_CSV.replace('1000.5', '1001.5').encode('utf-8')
+            third = cache.load(url)
+            assert third['total_deaths_per_million'].iloc[0] == 1001.5
+            assert cache.stats['misses'] == 2
+    finally:
+        _CSVHandler.body = SAMPLE_CSV.encode('utf-8')
+        server.shutdown()
+        server.server_close()
+    print("✓ HTTP snapshot cache revalidates with ETag.")
+
+
+def test_file_source_refresh():
+    """Test that a file:// source is re-read only when the file changes."""
+    print("Testing file snapshot cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'owid.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_CSV)
+        url = pathlib.Path(path).as_uri()
+        cache = SnapshotCache(os.path.join(tmp, 'cache'))
+
+        cache.load(url)
+        cache.load(url)
+        assert cache.stats == {'hits': 1, 'misses': 1, 'stale': 0, 'errors': 0}
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("DEU,Europe,Germany,2021-01-01,900.0\n")
+        df = cache.load(url)
+        assert len(df) == 3 and cache.stats['misses'] == 2
+    print("✓ File snapshot cache refreshes on change.")
+
+
+def test_snapshot_row_groups_prune():
+    """Test that snapshot row group statistics let the query filters skip groups."""
+    print("Testing snapshot row group pruning...")
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_owid_csv(os.path.join(tmp, 'owid.csv'), n_locations=40, n_days=50)
+        cache = SnapshotCache(os.path.join(tmp, 'cache'), row_group_size=200)
+        missed = cache.load(csv_path, read_csv_options())
+        hit = cache.load(csv_path, read_csv_options())
+        # A hit returns the rows, dtypes and categories of the miss that wrote the snapshot
+        pd.testing.assert_frame_equal(hit, missed)
+        assert isinstance(hit['location'].dtype, pd.CategoricalDtype)
+
+        fragment = next(ds.dataset(cache.snapshot_path(csv_path, read_csv_options())).get_fragments())
+        n_groups = fragment.metadata.num_row_groups
+        pivot = pc.field('continent').is_null() & pc.field('location').isin(['Europe', 'Asia'])
+        countries = pc.field('continent').is_valid()
+        assert n_groups > 10
+        assert len(fragment.split_by_row_group(pivot)) <= 2
+        assert len(fragment.split_by_row_group(countries)) < n_groups
+    print("✓ Snapshot row groups are skipped by query filters.")
+
+
+def main():
+    """Run all tests."""
+    test_http_conditional_refresh()
+    test_file_source_refresh()
+    test_snapshot_row_groups_prune()
+
+
+if __name__ == "__main__":
+    main()
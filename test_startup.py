@@ -0,0 +1,59 @@
+"""
+Test that start-up stays light: deferred imports and no filesystem side effects.
+"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+from config import STARTUP_DEFERRED_MODULES, STARTUP_MODULES
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run(code, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=cwd,
+                          env=env).stdout
+
+
+def test_entry_points_defer_plotting_libraries():
+    """Test that importing the command-line entry points does not load Matplotlib, Plotly or Streamlit."""
+    print("Testing deferred imports...")
+    code = (f"import sys, json\nimport {', '.join(STARTUP_MODULES)}\n"
+            f"print(json.dumps([name for name in {STARTUP_DEFERRED_MODULES!r} if name in sys.modules]))")
+    assert json.loads(_run(code, REPO_DIR).strip().splitlines()[-1]) == []
+    print("✓ Entry points defer the plotting libraries.")
+
+
+def test_import_has_no_filesystem_side_effects(tmp_path):
+    """Test that importing the modules creates no files or directories."""
+    print("Testing import side effects...")
+    _run("import config, visualizer, covid_visualization", str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+    print("✓ Imports have no filesystem side effects.")
+
+
+def test_first_chart_creates_output_directory(tmp_path):
+    """Test that saving a chart creates its output directory on demand."""
+    print("Testing output directory creation...")
+    target = tmp_path / 'nested' / 'chart.png'
+    _run(f"from render_engine import new_figure, save_figure\n"
+         f"fig, ax = new_figure((2, 2))\nsave_figure(fig, {str(target)!r})", str(tmp_path))
+    assert target.exists()
+    print("✓ The first chart creates its output directory.")
+
+
+def main():
+    """Run all tests."""
+    test_entry_points_defer_plotting_libraries()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_import_has_no_filesystem_side_effects(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_first_chart_creates_output_directory(pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Test that streaming ingestion matches the in-memory pipeline.
+"""
+import os
+import tempfile
+
+import pandas as pd
+
+from data_fetcher import fetch_covid_data, filter_country_data, filter_continent_data, stream_covid_partitions
+from data_processor import (get_latest_data_by_country, calculate_continent_deaths, pivot_continent_data,
+                            reduce_streamed_partitions)
+
+SAMPLE_CSV = """iso_code,continent,location,date,total_deaths_per_million,new_cases_smoothed,population
+FRA,Europe,France,2021-01-01,1000.0,10.0,67000000
+FRA,Europe,France,2021-01-02,1010.0,11.0,67000000
+JPN,Asia,Japan,2021-01-01,50.0,20.0,125000000
+OWID_EUR,,Europe,2021-01-01,,100.0,748000000
+OWID_ASI,,Asia,2021-01-01,,200.0,4700000000
+JPN,Asia,Japan,2021-01-02,51.0,21.0,125000000
+OWID_EUR,,Europe,2021-01-02,,110.0,748000000
+OWID_ASI,,Asia,2021-01-02,,210.0,4700000000
+OWID_WRL,,World,2021-01-02,,900.0,7900000000
+"""
+
+SCHEMA = {
+    'iso_code': 'category',
+    'continent': 'category',
+    'location': 'category',
+    'date': 'datetime64[ns]',
+    'total_deaths_per_million': 'float32',
+    'new_cases_smoothed': 'float32',
+    'population': 'float64',
+}
+
+
+def test_streaming_matches_in_memory():
+    """Test that small chunks produce the same charts inputs as a full load."""
+    print("Testing streaming ingestion...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'owid.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_CSV)
+
+        df = fetch_covid_data(path, use_cache=False, schema=SCHEMA)
+        expected_deaths = calculate_continent_deaths(get_latest_data_by_country(filter_country_data(df)))
+        expected_pivot = pivot_continent_data(filter_continent_data(df))
+
+        latest_data, df_continents = reduce_streamed_partitions(
+            stream_covid_partitions(path, chunksize=2, schema=SCHEMA))
+
+    pd.testing.assert_series_equal(calculate_continent_deaths(latest_data), expected_deaths)
+    streamed_pivot = pivot_continent_data(df_continents)
+    for pivot in (streamed_pivot, expected_pivot):
+        pivot.columns = pivot.columns.astype(str)
+    pd.testing.assert_frame_equal(streamed_pivot, expected_pivot, check_like=True)
+    assert sorted(latest_data['location'].astype(str)) == ['France', 'Japan']
+    print("✓ Streaming ingestion matches the in-memory pipeline.")
+
+
+def main():
+    """Run all tests."""
+    test_streaming_matches_in_memory()
+
+
+if __name__ == "__main__":
+    main()
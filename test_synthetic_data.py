@@ -0,0 +1,49 @@
+"""
+Test the synthetic OWID-shaped data generator and the pipeline on top of it, offline.
+"""
+import os
+import tempfile
+
+from data_fetcher import load_dataset
+from data_processor import get_latest_data_by_country, calculate_continent_deaths, pivot_continent_data
+from synthetic_data import OWID_COLUMNS, CONTINENTS, generate_owid_data, write_owid_csv
+
+
+def test_generated_shape():
+    """Test that the generated frame has the OWID layout and is reproducible."""
+    print("Testing synthetic data shape...")
+    df = generate_owid_data(n_locations=12, n_days=30, seed=3)
+    assert list(df.columns) == OWID_COLUMNS
+    assert df['continent'].notna().sum() == 12 * 30
+    assert set(CONTINENTS + ['World']) <= set(df.loc[df['continent'].isna(), 'location'])
+    assert df.equals(generate_owid_data(n_locations=12, n_days=30, seed=3))
+
+    narrow = generate_owid_data(n_locations=2, n_days=5, n_columns=8, nan_fraction=0)
+    wide = generate_owid_data(n_locations=2, n_days=5, n_columns=len(OWID_COLUMNS) + 3)
+    assert narrow.shape[1] == 8 and narrow.notna().sum().sum() == narrow.size - narrow['continent'].isna().sum()
+    assert wide.shape[1] == len(OWID_COLUMNS) + 3
+    print("✓ Synthetic data has the OWID shape.")
+
+
+def test_pipeline_offline():
+    """Test the fetch and processing stages on a generated CSV file."""
+    print("Testing the pipeline on synthetic data...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_owid_csv(os.path.join(tmp, 'owid.csv'), n_locations=18, n_days=40)
+        dataset = load_dataset(path, use_cache=False)
+
+    latest_data = get_latest_data_by_country(dataset.countries)
+    assert len(latest_data) == 18
+    assert sorted(calculate_continent_deaths(latest_data).index) == CONTINENTS
+    assert set(pivot_continent_data(dataset.continents()).columns) == {'Europe', 'Asia'}
+    print("✓ Pipeline runs offline on synthetic data.")
+
+
+def main():
+    """Run all tests."""
+    test_generated_shape()
+    test_pipeline_offline()
+
+
+if __name__ == "__main__":
+    main()
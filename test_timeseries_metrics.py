@@ -0,0 +1,109 @@
+"""
+Test the per-location rolling, growth and per-capita metrics.
+"""
+import numpy as np
+import pandas as pd
+
+from data_processor import pivot_continent_data
+from timeseries_metrics import METRICS, LocationTimeSeries, add_derived_metrics, metric_name
+
+
+def _locations(seed=0):
+    """Shuffled daily rows of three locations, with missing days and values."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for location in ['Spain', 'Chile', 'Kenya']:
+        dates = pd.date_range('2021-01-01', periods=60)
+        dates = dates[rng.random(len(dates)) > 0.1]
+        frames.append(pd.DataFrame({
+            'location': location,
+            'date': dates,
+            'new_cases': rng.uniform(0, 100, len(dates)),
+            'total_cases': np.cumsum(rng.uniform(0, 100, len(dates))) + 10,
+            'population': rng.uniform(1e6, 1e7),
+        }))
+    df = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=1)
+    df.loc[df.sample(10, random_state=2).index, 'new_cases'] = np.nan
+    return df
+
+
+def _expected(df, compute):
+    """Apply a per-location reference computation on a date index and realign it with df."""
+    results = []
+    for location, group in df.groupby('location'):
+        series = compute(group.set_index('date').sort_index())
+        results.append(series.set_axis(pd.MultiIndex.from_product([[location], series.index])))
+    expected = pd.concat(results)
+    return expected.reindex(pd.MultiIndex.from_frame(df[['location', 'date']])).to_numpy()
+
+
+def test_rolling_and_growth_match_pandas():
+    """Test rolling windows, growth rates and doubling times against per-location pandas."""
+    print("Testing time-series metrics...")
+    df = _locations()
+    series = LocationTimeSeries(df)
+
+    expected = _expected(df, lambda g: g['new_cases'].rolling('14D').mean())
+    assert np.allclose(series.rolling_mean('new_cases', 14), expected, equal_nan=True)
+    expected = _expected(df, lambda g: g['new_cases'].rolling('7D', min_periods=3).sum())
+    assert np.allclose(series.rolling_sum('new_cases', 7, min_periods=3), expected, equal_nan=True)
+
+    # Lags are calendar days: a missing earlier day gives NaN, not the previous row
+    earlier = _expected(df, lambda g: g['total_cases'].reindex(g.index - pd.Timedelta(days=7))
+                        .set_axis(g.index))
+    growth = series.growth_rate('total_cases', 7)
+    assert np.allclose(growth, df['total_cases'].to_numpy() / earlier - 1, equal_nan=True)
+    doubling = series.doubling_time('total_cases', 7)
+    assert np.allclose(doubling, 7 * np.log(2) / np.log(df['total_cases'].to_numpy() / earlier), equal_nan=True)
+    print("✓ Rolling windows and growth rates match pandas.")
+
+
+def test_windows_stay_within_a_location():
+    """Test that a window never reaches into another location's rows."""
+    print("Testing window boundaries...")
+    df = _locations()
+    totals = LocationTimeSeries(df).rolling_sum('new_cases', 1000)
+    assert np.allclose(totals.groupby(df['location']).max(), df.groupby('location')['new_cases'].sum())
+    print("✓ Windows stay within a location.")
+
+
+def test_add_derived_metrics_feeds_pivot():
+    """Test that derived columns are added and can be pivoted like OWID's own."""
+    print("Testing derived metrics...")
+    df = _locations()
+    derived = add_derived_metrics(df, [('rolling_mean', 'new_cases', 14), ('per_capita', 'new_cases'),
+                                       ('week_over_week', 'new_cases')])
+    assert {'new_cases_rolling_14', 'new_cases_per_million', 'new_cases_week_over_week'} <= set(derived.columns)
+    assert np.allclose(derived['new_cases_per_million'], df['new_cases'] / df['population'] * 1e6, equal_nan=True)
+
+    pivot = pivot_continent_data(derived, values='new_cases_rolling_14')
+    assert sorted(pivot.columns) == ['Chile', 'Kenya', 'Spain']
+    assert pivot.loc[df['date'].iloc[0], df['location'].iloc[0]] == derived['new_cases_rolling_14'].iloc[0]
+    print("✓ Derived metrics feed the pivot.")
+
+
+def test_metric_names_match_results_and_existing_columns_are_kept():
+    """Test that metric_name predicts result names and present columns are not recomputed."""
+    print("Testing metric names...")
+    df = _locations()
+    series = LocationTimeSeries(df)
+    specs = [('rolling_mean', 'new_cases', 14), ('rolling_sum', 'new_cases'), ('growth_rate', 'new_cases', 3),
+             ('week_over_week', 'new_cases'), ('doubling_time', 'total_cases'), ('per_capita', 'new_cases', 100)]
+    for metric, column, *parameters in specs:
+        assert metric_name(metric, column, *parameters) == METRICS[metric](series, column, *parameters).name
+
+    derived = add_derived_metrics(df, specs)
+    assert add_derived_metrics(derived, specs) is derived
+    print("✓ Metric names match and existing columns are kept.")
+
+
+def main():
+    """Run all tests."""
+    test_rolling_and_growth_match_pandas()
+    test_windows_stay_within_a_location()
+    test_add_derived_metrics_feeds_pivot()
+    test_metric_names_match_results_and_existing_columns_are_kept()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Module for deriving time series metrics for every location at once.
+
+Rows are ordered by (location, day) once; every metric is then computed on the
+resulting contiguous arrays with grouped NumPy operations, without a Python
+loop over locations or groupby().apply. Windows and lags are measured in
+calendar days, so a location with missing days is handled like pandas'
+time-based rolling('7D') rather than by counting rows.
+
+Available metrics:
+
+- rolling_mean / rolling_sum: trailing window of any length
+- growth_rate: relative change against the value a number of days earlier
+- week_over_week: growth of the trailing 7-day sum against the 7 days before
+- doubling_time: days for a cumulative metric to double at its recent growth
+- per_capita: a metric per `per` people of the location's population
+
+Results are Series aligned with the input rows; add_derived_metrics appends
+them as columns, so they can be pivoted by pivot_continent_data or aggregated
+by ContinentDateCube like any OWID column.
+"""
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+
+class LocationTimeSeries:
+    """
+    Country rows ordered by location and day, for grouped window computations.
+
+    Rows without a location or date are ignored (their results are NaN).
+
+    Parameters:
+    df (pandas.DataFrame): Rows with 'location' and 'date' columns; it is
+        referenced, not copied, and must not be modified afterwards
+    """
+
+    def __init__(self, df):
+        self.frame = df
+        codes, _ = pd.factorize(df['location'], sort=True)
+        days = df['date'].to_numpy(dtype='datetime64[D]')
+        valid = (codes >= 0) & ~np.isnat(days)
+        days = days[valid].astype(np.int64)
+        codes = codes[valid].astype(np.int64)
+        first_day = days.min() if len(days) else 0
+        span = days.max() - first_day + 1 if len(days) else 1
+        keys = codes * span + (days - first_day)
+        order = np.argsort(keys, kind='stable')
+        self._positions = np.flatnonzero(valid)[order]
+        self._keys = keys[order]
+        # Smallest key of each row's location; lookbacks never reach past it
+        self._floor = self._keys - self._keys % span
+
+    def values(self, column):
+        """Get a column as float64 in (location, day) order."""
+        return self.frame[column].to_numpy(dtype=np.float64, na_value=np.nan)[self._positions]
+
+    def _lookback(self, days):
+        # Sorted position of the first row at most `days` days before each row, within its location
+        return np.searchsorted(self._keys, np.maximum(self._keys - days, self._floor), side='left')
+
+    def _lag(self, values, days):
+        # Value exactly `days` days earlier in the same location, NaN when that day has no row
+        if not len(values):
+            return values.copy()
+        target = self._keys - days
+        before = np.minimum(self._lookback(days), len(values) - 1)
+        found = (target >= self._floor) & (self._keys[before] == target)
+        return np.where(found, values[before], np.nan)
+
+    def _rolling(self, values, window, min_periods):
+        # Trailing window of `window` days via prefix sums; NaN values are skipped
+        valid = ~np.isnan(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(valid)])
+        start = self._lookback(window - 1)
+        end = np.arange(1, len(values) + 1)
+        total = sums[end] - sums[start]
+        count = counts[end] - counts[start]
+        return total, count, count >= max(min_periods, 1)
+
+    def _series(self, sorted_values, name):
+        result = np.full(len(self.frame), np.nan)
+        result[self._positions] = sorted_values
+        return pd.Series(result, index=self.frame.index, name=name)
+
+    def rolling_sum(self, column, window=7, min_periods=1):
+        """
+        Sum of a metric over a trailing window of days in each location.
+
+        Parameters:
+        column (str): Metric to sum
+        window (int): Window length in days, including the current day
+        min_periods (int): Values needed in a window for a result
+
+        Returns:
+        pandas.Series: Window sums aligned with the input rows
+        """
+        total, _, enough = self._rolling(self.values(column), window, min_periods)
+        return self._series(np.where(enough, total, np.nan), f"{column}_sum_{window}")
+
+    def rolling_mean(self, column, window=7, min_periods=1):
+        """
+        Mean of a metric over a trailing window of days in each location.
+
+        Parameters:
+        column (str): Metric to average
+        window (int): Window length in days, including the current day
+        min_periods (int): Values needed in a window for a result
+
+        Returns:
+        pandas.Series: Window means aligned with the input rows
+        """
+        total, count, enough = self._rolling(self.values(column), window, min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._series(np.where(enough, total / count, np.nan), f"{column}_rolling_{window}")
+
+    def growth_rate(self, column, days=7):
+        """
+        Relative change of a metric against its value `days` days earlier.
+
+        Parameters:
+        column (str): Metric to compare, e.g. a smoothed daily series
+        days (int): Lag in days
+
+        Returns:
+        pandas.Series: value / earlier value - 1, NaN when the earlier value is missing or zero
+        """
+        values = self.values(column)
+        earlier = self._lag(values, days)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            growth = np.where(earlier != 0, values / earlier - 1, np.nan)
+        return self._series(growth, f"{column}_growth_{days}")
+
+    def week_over_week(self, column):
+        """
+        Growth of the trailing 7-day sum of a daily metric against the previous 7 days.
+
+        Parameters:
+        column (str): Daily metric, e.g. 'new_cases'
+
+        Returns:
+        pandas.Series: This week's sum / last week's sum - 1, NaN when either week has no data
+        """
+        total, _, enough = self._rolling(self.values(column), 7, 1)
+        weekly = np.where(enough, total, np.nan)
+        previous = self._lag(weekly, 7)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            growth = np.where(previous != 0, weekly / previous - 1, np.nan)
+        return self._series(growth, f"{column}_week_over_week")
+
+    def doubling_time(self, column, days=7):
+        """
+        Days a cumulative metric takes to double at its growth over the last `days` days.
+
+        Parameters:
+        column (str): Cumulative metric, e.g. 'total_cases'
+        days (int): Period the growth is measured over
+
+        Returns:
+        pandas.Series: days * ln 2 / ln(value / earlier value); NaN when the metric did not grow
+        """
+        values = self.values(column)
+        earlier = self._lag(values, days)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = values / earlier
+            doubling = np.where((earlier > 0) & (ratio > 1), days * np.log(2) / np.log(ratio), np.nan)
+        return self._series(doubling, f"{column}_doubling_time")
+
+    def per_capita(self, column, per=1_000_000, population='population'):
+        """
+        A metric per `per` people of each location's population.
+
+        Parameters:
+        column (str): Metric to scale
+        per (int): Number of people the rate is expressed per
+        population (str): Population column
+
+        Returns:
+        pandas.Series: Rates aligned with the input rows
+        """
+        values = self.frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        people = self.frame[population].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = np.where(people > 0, values / people * per, np.nan)
+        suffix = 'per_million' if per == 1_000_000 else f"per_{per}"
+        return pd.Series(rates, index=self.frame.index, name=f"{column}_{suffix}")
+
+
+# Metric name -> method of LocationTimeSeries; parameters follow in the spec
+METRICS = {
+    'rolling_mean': LocationTimeSeries.rolling_mean,
+    'rolling_sum': LocationTimeSeries.rolling_sum,
+    'growth_rate': LocationTimeSeries.growth_rate,
+    'week_over_week': LocationTimeSeries.week_over_week,
+    'doubling_time': LocationTimeSeries.doubling_time,
+    'per_capita': LocationTimeSeries.per_capita,
+}
+
+# Metric name -> name of its result column, formatted with the bound arguments of the method
+METRIC_NAMES = {
+    'rolling_mean': '{column}_rolling_{window}',
+    'rolling_sum': '{column}_sum_{window}',
+    'growth_rate': '{column}_growth_{days}',
+    'week_over_week': '{column}_week_over_week',
+    'doubling_time': '{column}_doubling_time',
+    'per_capita': '{column}_{suffix}',
+}
+
+
+def metric_name(metric, column, *parameters):
+    """
+    Get the name of the column a metric spec produces, without computing it.
+
+    Parameters:
+    metric (str): Metric name in METRICS
+    column (str): Input column
+    *parameters: Parameters of the metric, as in the spec
+
+    Returns:
+    str: Result column name, e.g. 'new_cases_rolling_14'
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {list(METRICS)}")
+    bound = inspect.signature(METRICS[metric]).bind(None, column, *parameters)
+    bound.apply_defaults()
+    arguments = bound.arguments
+    if metric == 'per_capita':
+        arguments['suffix'] = 'per_million' if arguments['per'] == 1_000_000 else f"per_{arguments['per']}"
+    return METRIC_NAMES[metric].format(**arguments)
+
+
+@traced()
+def add_derived_metrics(df, specs, series=None):
+    """
+    Append derived metrics to country rows as new columns.
+
+    Parameters:
+    df (pandas.DataFrame): Rows with 'location' and 'date' columns
+    specs (list): (metric, column, *parameters) tuples, e.g.
+        ('rolling_mean', 'new_cases', 14) or ('doubling_time', 'total_cases')
+    series (LocationTimeSeries): Prebuilt ordering of df; None builds one
+
+    Returns:
+    pandas.DataFrame: df with one more column per spec, named after the result
+        (e.g. 'new_cases_rolling_14'); specs whose column already exists are not
+        computed, and df itself is returned when every column exists
+    """
+    missing = [spec for spec in specs if metric_name(*spec) not in df.columns]
+    if not missing:
+        return df
+    series = series if series is not None else LocationTimeSeries(df)
+    columns = {}
+    for metric, column, *parameters in missing:
+        result = METRICS[metric](series, column, *parameters)
+        columns[result.name] = result
+    return df.assign(**columns)
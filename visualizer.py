@@ -1,55 +1,92 @@
 """
 Module for generating visualizations of COVID-19 data.
 """
-import matplotlib.pyplot as plt
-from config import CHART_COLORS, CHART_SIZES, DEATHS_CHART_FILENAME, CASES_CHART_FILENAME
+from config import CHART_COLORS, CHART_SIZES, DEATHS_CHART_FILENAME, CASES_CHART_FILENAME, DOWNSAMPLE_METHOD
+from downsampling import axes_points, downsample_series
+from instrumentation import traced
+from render_cache import cached_render
+from render_engine import new_figure, save_figure
 
 
+@traced('create_deaths_by_continent_chart')
+@cached_render('deaths_by_continent')
 def create_deaths_by_continent_chart(continent_deaths, filename=DEATHS_CHART_FILENAME):
     """
     Create a bar chart showing average deaths per million by continent.
-    
+
     Parameters:
     continent_deaths (pandas.Series): Series with continents as index and mean deaths per million as values
-    filename (str): Name of the file to save the chart to
-    
+    filename (str, file object or list): Where to save the chart; see render_engine.save_figure
+
     Returns:
-    str: Path to the saved chart
+    object: filename, usually the path of the saved chart
     """
-    plt.figure(figsize=CHART_SIZES['deaths_by_continent'])
-    continent_deaths.plot(kind='bar', color=CHART_COLORS['deaths_by_continent'])
-    plt.title('Average Deaths per Million by Continent')
-    plt.xlabel('Continent')
-    plt.ylabel('Deaths per Million')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
-    
-    return filename
-
-
-def create_cases_comparison_chart(df_pivot, filename=CASES_CHART_FILENAME):
+    fig, ax = new_figure(CHART_SIZES['deaths_by_continent'])
+    positions = range(len(continent_deaths))
+    ax.bar(positions, continent_deaths.values, width=0.5, color=CHART_COLORS['deaths_by_continent'])
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(label) for label in continent_deaths.index], rotation=45)
+    ax.set_title('Average Deaths per Million by Continent')
+    ax.set_xlabel('Continent')
+    ax.set_ylabel('Deaths per Million')
+
+    return save_figure(fig, filename)
+
+
+@traced('create_cases_comparison_chart')
+@cached_render('cases_comparison')
+def create_cases_comparison_chart(df_pivot, filename=CASES_CHART_FILENAME, downsample=DOWNSAMPLE_METHOD,
+                                  max_points=None):
     """
     Create a line chart comparing smoothed new cases between Europe and Asia.
-    
+
     Parameters:
     df_pivot (pandas.DataFrame): Pivoted DataFrame with dates as index and continents as columns
-    filename (str): Name of the file to save the chart to
-    
+    filename (str, file object or list): Where to save the chart; see render_engine.save_figure
+    downsample (str): Downsampling method ('lttb' or 'minmax'), or None to plot every point
+    max_points (int): Points kept per series; None uses the pixel width of the axes
+
     Returns:
-    str: Path to the saved chart
+    object: filename, usually the path of the saved chart
     """
-    plt.figure(figsize=CHART_SIZES['cases_comparison'])
-    df_pivot['Europe'].plot(label='Europe')
-    df_pivot['Asia'].plot(label='Asia')
-    plt.title('Smoothed New Cases in Europe and Asia')
-    plt.xlabel('Date')
-    plt.ylabel('Smoothed New Cases')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
-    
-    return filename
\ No newline at end of file
+    fig, ax = new_figure(CHART_SIZES['cases_comparison'])
+    if max_points is None:
+        max_points = axes_points(ax)
+    for continent in ('Europe', 'Asia'):
+        series = downsample_series(df_pivot[continent], max_points, downsample)
+        ax.plot(series.index, series.values, label=continent)
+    ax.set_title('Smoothed New Cases in Europe and Asia')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Smoothed New Cases')
+    ax.legend()
+    ax.grid(True)
+
+    return save_figure(fig, filename)
+
+
+def create_location_trend_chart(series, title, ylabel, filename, downsample=DOWNSAMPLE_METHOD):
+    """
+    Create a line chart of one metric over time for a single location.
+
+    Parameters:
+    series (pandas.Series): Metric values indexed by date
+    title (str): Chart title
+    ylabel (str): Label of the y axis
+    filename (str, file object or list): Where to save the chart; see render_engine.save_figure
+    downsample (str): Downsampling method ('lttb' or 'minmax'), or None to plot every point
+
+    Returns:
+    object: filename, usually the path of the saved chart
+    """
+    fig, ax = new_figure(CHART_SIZES['location_trend'])
+    series = downsample_series(series.dropna(), axes_points(ax), downsample)
+    if series.empty:
+        ax.text(0.5, 0.5, 'No data available', ha='center', va='center', transform=ax.transAxes)
+    else:
+        ax.plot(series.index, series.values, color=CHART_COLORS['location_trend'])
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+
+    return save_figure(fig, filename)